@@ -2,6 +2,7 @@
 Run the code in this file
 """
 
+from contextlib import asynccontextmanager
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -9,8 +10,34 @@ from fastapi.middleware.cors import CORSMiddleware
 from src.api.routers import chat_router
 from src.api.routers import file_router
 from src.api.routers import suggestion_router
+from src.api.dependencies.dependency import service
+from src.storage.mongodb import CRUDDocuments
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    """
+    Checks the MongoDB connection, ensures its indexes and starts the chat log
+    writer, the ingestion workers and the model artifact watcher at startup, then
+    stops them and any rebuild, drains the queued chat logs and closes the MongoDB
+    pool at shutdown.
+    """
+    if await CRUDDocuments.connection.ping():
+        await service.ensure_indexes()
+    if service.chat_log_writer is not None:
+        service.chat_log_writer.start()
+    service.ingestion_manager.start()
+    service.artifact_watcher.start()
+    yield
+    await service.artifact_watcher.close()
+    await service.collection_rebuilder.close()
+    await service.ingestion_manager.close()
+    if service.chat_log_writer is not None:
+        await service.chat_log_writer.close()
+    CRUDDocuments.connection.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # app.include_router(root_router)
 app.include_router(chat_router)
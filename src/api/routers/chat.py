@@ -2,15 +2,19 @@
 This module defines FastAPI endpoints for chat.
 """
 
+import json
+from typing import AsyncIterator
 from fastapi import (status,
                      Depends,
                      APIRouter,
                      HTTPException)
+from fastapi.responses import StreamingResponse
 
 from src.services.service import Service
 from src.api.dependencies.dependency import get_service
 from src.api.schemas.chat import (RequestChat,
                                   ResponseChat)
+from src.models.chat import Chat
 
 
 chat_router = APIRouter(
@@ -63,3 +67,92 @@ async def chat_domain(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)) from e
+
+
+def format_event(event: str, data: dict) -> str:
+    """
+    Formats a server-sent event.
+
+    Args:
+        event (str): The event name.
+        data (dict): The JSON payload of the event.
+
+    Returns:
+        str: The encoded event.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def stream_chat_events(
+    query: str,
+    service: Service
+) -> AsyncIterator[str]:
+    """
+    Streams the answer to a query as server-sent events and stores the chat
+    once the answer is complete.
+
+    Args:
+        query (str): The user's query.
+        service (Service): The service layer.
+
+    Yields:
+        str: "token" events with the next piece of the answer, then a "done" event
+            with the complete answer, or an "error" event.
+    """
+    try:
+        result = None
+        async for item in service.retrieve_chat_engine.stream_query(query=query):
+            if isinstance(item, Chat):
+                result = item
+            elif item:
+                yield format_event("token", {"delta": item})
+        await service.chat_repository.add_chat_domains(
+            query=query,
+            answer=result.response,
+            retrieved_nodes=result.retrieved_nodes,
+            is_out_of_domain=result.is_outdomain
+        )
+        yield format_event("done", ResponseChat(
+            response=result.response,
+            is_outdomain=result.is_outdomain
+        ).model_dump())
+    except Exception as e:  # pylint: disable=broad-except
+        yield format_event("error", {"detail": str(e)})
+
+
+@chat_router.post(
+    '/chatDomainStream',
+    status_code=status.HTTP_200_OK
+)
+async def chat_domain_stream(
+    request_chat: RequestChat,
+    service: Service = Depends(get_service)
+) -> StreamingResponse:
+    """
+    Endpoint to stream the response to a chat query as server-sent events.
+
+    Args:
+        request_chat (RequestChat): An object containing the chat query.
+        service (Service, optional): Dependency injection for the service layer.
+                                     Defaults to Depends(get_service).
+
+    Returns:
+        StreamingResponse: A text/event-stream of "token" events followed by
+                           a "done" event carrying the complete ResponseChat.
+    """
+    if not request_chat.query:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Query is required"
+        )
+    return StreamingResponse(
+        stream_chat_events(
+            query=request_chat.query,
+            service=service
+        ),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
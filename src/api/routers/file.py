@@ -2,13 +2,20 @@
 This module defines FastAPI endpoints for file.
 """
 
+from typing import AsyncIterator, Optional
+from bson.errors import InvalidId
 from fastapi import (status,
                      Depends,
                      APIRouter,
                      HTTPException,
+                     Query,
                      Response)
+from fastapi.responses import StreamingResponse
 
+from src.models.ingestion import (IngestionJob,
+                                  RebuildJob)
 from src.services.service import Service
+from src.storage.pagination import iter_ndjson
 from src.api.dependencies.dependency import get_service
 from src.api.schemas.file import (FileUploadRequest,
                                   AllFiles,
@@ -20,6 +27,8 @@ file_router = APIRouter(
     prefix="/file",
 )
 
+MAX_PAGE_SIZE = 1000
+
 
 @file_router.get(
     "/getAllFilesUpload",
@@ -27,22 +36,39 @@ file_router = APIRouter(
     response_model=AllFiles
 )
 async def get_all_files_upload(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
     service: Service = Depends(get_service)
 ) -> AllFiles:
     """
-    Retrieve all files in the file repository.
+    Retrieve the files in the file repository, optionally one page at a time.
 
     Args:
+        limit (Optional[int]): The page size. If None, every file is returned.
+        after (Optional[str]): The next_after cursor returned with the previous page.
         service: The service used for accessing the file repository.
 
     Returns:
-        AllFiles: A list of all files in the file repository.
+        AllFiles: The files, and the cursor of the next page if there is one.
     """
     try:
-        file_records = service.file_repository.load_all_data()
+        if limit is None:
+            file_records = await service.file_repository.load_all_data()
+            next_after = None
+        else:
+            file_records, next_after = await service.file_repository.get_page(
+                limit=limit,
+                after=after
+            )
         return AllFiles(
-            data=[File(**record) for record in file_records]
+            data=[File(**record) for record in file_records],
+            next_after=next_after
         )
+    except InvalidId as e:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        ) from e
     except Exception as e:
         raise HTTPException(
             status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -50,6 +76,57 @@ async def get_all_files_upload(
         ) from e
 
 
+async def stream_file_records(
+    service: Service,
+    after: Optional[str] = None
+) -> AsyncIterator[str]:
+    """
+    Serializes the file records as NDJSON while they are read from the cursor.
+    Each record carries its "cursor", from which an interrupted stream is resumed.
+
+    Args:
+        service (Service): The service used for accessing the file repository.
+        after (Optional[str]): Only stream the files inserted after this _id.
+
+    Yields:
+        str: One JSON document per line.
+    """
+    async for line in iter_ndjson(
+            service.file_repository.iter_files(after=after, with_cursor=True)):
+        yield line
+
+
+@file_router.get(
+    "/streamFilesUpload",
+    status_code=status.HTTP_200_OK
+)
+async def stream_files_upload(
+    after: Optional[str] = None,
+    service: Service = Depends(get_service)
+) -> StreamingResponse:
+    """
+    Stream every file in the file repository as newline-delimited JSON.
+
+    Args:
+        after (Optional[str]): Only stream the files inserted after this _id.
+        service: The service used for accessing the file repository.
+
+    Returns:
+        StreamingResponse: An application/x-ndjson stream of File records.
+    """
+    try:
+        service.file_repository.collection.keyset_filter(after)
+    except InvalidId as e:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        ) from e
+    return StreamingResponse(
+        stream_file_records(service=service, after=after),
+        media_type="application/x-ndjson"
+    )
+
+
 @file_router.get(
     "/getFileUpload",
     status_code=status.HTTP_200_OK,
@@ -73,7 +150,7 @@ async def get_file_upload(
         File: The details of the requested file if found.
     """
     try:
-        file_record = service.file_repository.get_specific_file(
+        file_record = await service.file_repository.get_specific_file(
             public_id=public_id
         )
         if not file_record:
@@ -91,38 +168,94 @@ async def get_file_upload(
 
 @file_router.post(
     "/fileUpload",
-    status_code=status.HTTP_200_OK
+    status_code=status.HTTP_202_ACCEPTED
 )
 async def file_upload(
     request_file: FileUploadRequest,
     service: Service = Depends(get_service)
-) -> Response:
+) -> dict:
     """
-    Endpoint to handle file uploads.
+    Endpoint to handle file uploads. The files are ingested by a background job.
 
     Args:
         request_file (FileUploadRequest): The uploaded file data.
         service (Service): The service used for file management.
 
     Raises:
-        HTTPException: If request data is missing or an error occurs.
+        HTTPException: If request data is missing, a public ID is repeated or already
+                       uploaded, or an error occurs.
 
     Returns:
-        dict: Success message if the file is uploaded successfully.
+        dict: The ID of the ingestion job, to poll with /file/ingestionStatus.
     """
     if not request_file.data:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Data is required"
         )
+    public_ids = [data.public_id for data in request_file.data]
+    if len(set(public_ids)) < len(public_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Each public_id can only be uploaded once per request"
+        )
     try:
-        service.file_management.add_file(
+        existing = await service.file_repository.find_existing(public_ids)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        ) from e
+    if existing:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Files already uploaded, use /file/fileUpdate: {existing}"
+        )
+    try:
+        job = service.ingestion_manager.submit(
             data_list=request_file.data
         )
-        return Response(
-            status_code=status.HTTP_201_CREATED,
-            content="Adding file successfully"
+        return {"job_id": job.job_id}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        ) from e
+
+
+@file_router.put(
+    "/fileUpdate",
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def file_update(
+    request_file: FileUploadRequest,
+    service: Service = Depends(get_service)
+) -> dict:
+    """
+    Endpoint to handle re-uploads of files that are already indexed. Only the
+    nodes that changed are re-indexed, by a background job.
+
+    Args:
+        request_file (FileUploadRequest): The re-uploaded file data.
+        service (Service): The service used for file management.
+
+    Raises:
+        HTTPException: If request data is missing or an error occurs.
+
+    Returns:
+        dict: The ID of the ingestion job, to poll with /file/ingestionStatus.
+    """
+    if not request_file.data:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Data is required"
+        )
+    try:
+        job = service.ingestion_manager.submit(
+            data_list=request_file.data,
+            update=True
         )
+        return {"job_id": job.job_id}
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -130,6 +263,37 @@ async def file_upload(
         ) from e
 
 
+@file_router.get(
+    "/ingestionStatus",
+    status_code=status.HTTP_200_OK,
+    response_model=IngestionJob
+)
+async def ingestion_status(
+    job_id: str,
+    service: Service = Depends(get_service)
+) -> IngestionJob:
+    """
+    Endpoint to retrieve the progress of a file ingestion job.
+
+    Args:
+        job_id (str): The ID returned by /file/fileUpload.
+        service (Service): The service used for file management.
+
+    Raises:
+        HTTPException: If the job is unknown.
+
+    Returns:
+        IngestionJob: The status of the job and the stage and timings of each file.
+    """
+    job = service.ingestion_manager.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
+
+
 @file_router.delete(
     "/fileDelete",
     status_code=status.HTTP_200_OK
@@ -152,7 +316,7 @@ async def file_delete(
         Response: Success message if the file is deleted successfully.
     """
     try:
-        record = service.file_repository.get_specific_file(
+        record = await service.file_repository.get_specific_file(
             public_id=public_id
         )
         if not record:
@@ -160,7 +324,7 @@ async def file_delete(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="File not found"
             )
-        service.file_management.delete_file(
+        await service.file_management.delete_file(
             public_id=public_id
         )
         return Response(
@@ -172,3 +336,65 @@ async def file_delete(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         ) from e
+
+
+@file_router.post(
+    "/rebuildIndex",
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def rebuild_index(
+    service: Service = Depends(get_service)
+) -> dict:
+    """
+    Endpoint to rebuild the knowledge collection from every registered file.
+    Chat keeps retrieving from the current collection until the new one is
+    validated and switched to.
+
+    Args:
+        service (Service): The service used for file management.
+
+    Raises:
+        HTTPException: If a rebuild is already running.
+
+    Returns:
+        dict: The ID of the rebuild job, to poll with /file/rebuildStatus.
+    """
+    try:
+        job = service.collection_rebuilder.start()
+    except RuntimeError as e:
+        raise HTTPException(
+            status.HTTP_409_CONFLICT,
+            detail=str(e)
+        ) from e
+    return {"job_id": job.job_id, "collection": job.collection}
+
+
+@file_router.get(
+    "/rebuildStatus",
+    status_code=status.HTTP_200_OK,
+    response_model=RebuildJob
+)
+async def rebuild_status(
+    job_id: str,
+    service: Service = Depends(get_service)
+) -> RebuildJob:
+    """
+    Endpoint to retrieve the progress of a knowledge collection rebuild.
+
+    Args:
+        job_id (str): The ID returned by /file/rebuildIndex.
+        service (Service): The service used for file management.
+
+    Raises:
+        HTTPException: If the job is unknown.
+
+    Returns:
+        RebuildJob: The status, validation and per-file progress of the rebuild.
+    """
+    job = service.collection_rebuilder.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
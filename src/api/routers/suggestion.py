@@ -2,13 +2,18 @@
 This module defines FastAPI endpoints for suggestion.
 """
 
+from typing import AsyncIterator, Optional
+from bson.errors import InvalidId
 from fastapi import (status,
                      Depends,
                      APIRouter,
                      HTTPException,
+                     Query,
                      Response)
+from fastapi.responses import StreamingResponse
 
 from src.services.service import Service
+from src.storage.pagination import iter_ndjson
 from src.api.dependencies.dependency import get_service
 from src.api.schemas.suggestion import (ResponseSuggestion,
                                         ResponseSuggestionList,
@@ -19,6 +24,8 @@ suggestion_router = APIRouter(
     prefix="/suggestion",
 )
 
+MAX_PAGE_SIZE = 1000
+
 
 @suggestion_router.get(
     "/getAllSuggestion",
@@ -26,31 +33,49 @@ suggestion_router = APIRouter(
     response_model=ResponseSuggestionList
 )
 async def get_all_suggestion(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
     service: Service = Depends(get_service)
 ) -> ResponseSuggestionList:
     """
-    Retrieve all suggestions.
+    Retrieve the suggestions, optionally one page at a time.
 
     Args:
+        limit: Optional[int] - The page size. If None, every suggestion is returned.
+        after: Optional[str] - The next_after cursor returned with the previous page.
         service: Service - A dependency that provides access to the suggestion repository.
 
     Returns:
-        ResponseSuggestionList: A list of all suggestions.
+        ResponseSuggestionList: The suggestions, and the cursor of the next page
+                                if there is one.
 
     Raises:
         HTTPException: If an internal server error occurs, a 500 status code is returned.
     """
     try:
-        suggestion_records = service.suggestion_repository.load_all_data()
-        if not suggestion_records:
+        if limit is None:
+            suggestion_records = await service.suggestion_repository.load_all_data()
+            next_after = None
+        else:
+            suggestion_records, next_after = await service.suggestion_repository.get_page(
+                limit=limit,
+                after=after
+            )
+        if not suggestion_records and after is None:
             raise HTTPException(
                 status.HTTP_404_NOT_FOUND,
                 detail="No suggestion not found"
             )
         return ResponseSuggestionList(
             suggestion=[ResponseSuggestion(**record)
-                        for record in suggestion_records]
+                        for record in suggestion_records],
+            next_after=next_after
         )
+    except InvalidId as e:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        ) from e
     except Exception as e:
         raise HTTPException(
             status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -58,6 +83,60 @@ async def get_all_suggestion(
         ) from e
 
 
+async def stream_suggestion_records(
+    service: Service,
+    after: Optional[str] = None
+) -> AsyncIterator[str]:
+    """
+    Serializes the suggestions as NDJSON while they are read from the cursor.
+    Each suggestion carries its "cursor", from which an interrupted stream is resumed.
+
+    Args:
+        service: Service - A dependency that provides access to the suggestion repository.
+        after: Optional[str] - Only stream the suggestions inserted after this _id.
+
+    Yields:
+        str: One JSON document per line.
+    """
+    async for line in iter_ndjson(
+            service.suggestion_repository.iter_suggestions(after=after, with_cursor=True)):
+        yield line
+
+
+@suggestion_router.get(
+    "/streamSuggestion",
+    status_code=status.HTTP_200_OK
+)
+async def stream_suggestion(
+    after: Optional[str] = None,
+    service: Service = Depends(get_service)
+) -> StreamingResponse:
+    """
+    Stream every suggestion as newline-delimited JSON.
+
+    Args:
+        after: Optional[str] - Only stream the suggestions inserted after this _id.
+        service: Service - A dependency that provides access to the suggestion repository.
+
+    Returns:
+        StreamingResponse: An application/x-ndjson stream of Suggestion records.
+
+    Raises:
+        400 status code if the after cursor is invalid.
+    """
+    try:
+        service.suggestion_repository.collection.keyset_filter(after)
+    except InvalidId as e:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        ) from e
+    return StreamingResponse(
+        stream_suggestion_records(service=service, after=after),
+        media_type="application/x-ndjson"
+    )
+
+
 @suggestion_router.get(
     "/getSuggestion",
     status_code=status.HTTP_200_OK
@@ -81,7 +160,7 @@ async def get_suggestion(
         500 status code if an internal server error occurs.
     """
     try:
-        suggestion_record = service.suggestion_repository.get_suggestion_by_question(
+        suggestion_record = await service.suggestion_repository.get_suggestion_by_question(
             suggestion_question=suggestion_question
         )
         if not suggestion_record:
@@ -123,7 +202,7 @@ async def upload_suggestion(
         response = await service.chat_engine.funny_chat(
             query=question
         )
-        service.suggestion_repository.add_suggestion(
+        await service.suggestion_repository.add_suggestion(
             question=question,
             answer=response.response
         )
@@ -164,7 +243,7 @@ async def delete_suggestion(
             detail="Field is required"
         )
     try:
-        service.suggestion_repository.delete_suggestion(
+        await service.suggestion_repository.delete_suggestion(
             identifier=field
         )
         return Response(
@@ -2,7 +2,7 @@
 This schemas is used for file
 """
 
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 
 
@@ -39,6 +39,7 @@ class File(BaseModel):
         name (str): The name of the file.
         file_type (str): The type or extension of the file (e.g., 'pdf', 'txt').
         time (str): A timestamp indicating when the file was created, modified, or accessed.
+        cursor (Optional[str]): The position of the file in a listing, to pass as after.
     """
     public_id: str
     url: str
@@ -46,6 +47,7 @@ class File(BaseModel):
     file_type: str
     file_path: str
     time: str
+    cursor: Optional[str] = None
 
 
 class AllFiles(BaseModel):
@@ -54,5 +56,7 @@ class AllFiles(BaseModel):
 
     Attributes:
         data (List[File]): A list of File objects representing the files.
+        next_after (Optional[str]): The cursor of the next page, if there is one.
     """
     data: List[File]
+    next_after: Optional[str] = None
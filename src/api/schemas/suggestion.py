@@ -2,7 +2,7 @@
 This schemas is used for suggestion
 """
 
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 
 
@@ -12,6 +12,7 @@ class ResponseSuggestion(BaseModel):
     """
     question: str
     answer: str
+    cursor: Optional[str] = None
 
 
 class ResponseSuggestionList(BaseModel):
@@ -19,6 +20,7 @@ class ResponseSuggestionList(BaseModel):
     A model for representing suggestion list
     """
     suggestion: List[ResponseSuggestion]
+    next_after: Optional[str] = None
 
 
 class Suggestion(BaseModel):
@@ -0,0 +1,146 @@
+"""
+This module provides a semantic cache of the answers generated for in-domain queries.
+"""
+
+import time
+import threading
+from typing import Optional, Tuple
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+
+from src.models.chat import Chat
+
+
+class SemanticAnswerCache:
+    """
+    Stores generated answers together with the embedding of their query and
+    returns a stored answer when a new query is similar enough to an old one.
+
+    The embeddings are kept normalized in a fixed-size matrix, so a lookup is a
+    single matrix-vector product. When the cache is full, the oldest entry is
+    overwritten.
+    """
+
+    def __init__(
+        self,
+        embed_model: BaseEmbedding = None,
+        threshold: float = 0.95,
+        max_size: int = 2000,
+        ttl: Optional[float] = None
+    ) -> None:
+        """
+        Initializes the cache.
+
+        Args:
+            embed_model (BaseEmbedding): The model used to embed the queries.
+            threshold (float, optional): The minimum cosine similarity for a hit.
+            max_size (int, optional): The maximum number of stored answers.
+            ttl (Optional[float], optional): Seconds after which an answer expires.
+                                             None keeps answers until invalidated.
+        """
+        self._embed_model = embed_model
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl = ttl
+        self._vectors = None
+        self._expires = np.zeros(max_size)
+        self._entries = [None] * max_size
+        self._exact = {}
+        self._next = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    async def lookup(
+        self,
+        query: str
+    ) -> Tuple[Optional[Chat], Optional[np.ndarray], int]:
+        """
+        Finds a stored answer for the query.
+
+        Args:
+            query (str): The corrected user query.
+
+        Returns:
+            Tuple[Optional[Chat], Optional[np.ndarray], int]: The stored answer or None,
+                the normalized query embedding to pass to ``store`` (None on an exact hit),
+                and the generation the lookup was made in.
+        """
+        generation = self._generation
+        now = time.monotonic()
+        with self._lock:
+            slot = self._exact.get(query)
+            if slot is not None and self._expires[slot] > now:
+                self.hits += 1
+                return self._entries[slot][1], None, generation
+        embedding = await self._embed_model.aget_query_embedding(query)
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+        with self._lock:
+            if self._vectors is not None and generation == self._generation:
+                scores = self._vectors @ vector
+                scores[self._expires <= now] = -1.0
+                slot = int(np.argmax(scores))
+                if scores[slot] >= self.threshold:
+                    self.hits += 1
+                    return self._entries[slot][1], vector, generation
+            self.misses += 1
+        return None, vector, generation
+
+    def store(
+        self,
+        query: str,
+        vector: np.ndarray,
+        chat: Chat,
+        generation: int
+    ) -> None:
+        """
+        Stores an answer, unless the knowledge base changed since its lookup.
+
+        Args:
+            query (str): The corrected user query.
+            vector (np.ndarray): The normalized query embedding returned by ``lookup``.
+            chat (Chat): The answer to store.
+            generation (int): The generation returned by ``lookup``.
+        """
+        if vector is None or self.max_size <= 0:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_size, vector.shape[0]),
+                                         dtype=np.float32)
+            slot = self._next
+            self._next = (slot + 1) % self.max_size
+            if self._entries[slot] is not None:
+                self._exact.pop(self._entries[slot][0], None)
+            self._vectors[slot] = vector
+            self._expires[slot] = time.monotonic() + self.ttl if self.ttl else np.inf
+            self._entries[slot] = (query, chat)
+            self._exact[query] = slot
+
+    def clear(self) -> None:
+        """
+        Drops every stored answer, e.g. after the knowledge base has changed.
+        """
+        with self._lock:
+            self._generation += 1
+            self._expires[:] = 0
+            self._entries = [None] * self.max_size
+            self._exact = {}
+            self._next = 0
+
+    @property
+    def stats(self) -> dict:
+        """
+        Returns the number of stored answers and the hit and miss counters.
+        """
+        return {
+            "size": len(self._exact),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "generation": self._generation
+        }
@@ -2,7 +2,7 @@
 ChatEngine: A class designed to facilitate conversation using a language model.
 """
 
-from typing import List
+from typing import AsyncIterator, List
 from llama_index.llms.openai import OpenAI
 
 from src.prompt.instruction_prompt import PROMPT
@@ -60,6 +60,30 @@ class ChatEngine:
         response = await self._language_model.acomplete(prompt)
         return response.text
 
+    async def stream_response(
+        self,
+        user_query: str,
+        relevant_information: List[str]
+    ) -> AsyncIterator[str]:
+        """
+        Streams the response to a user query as the language model generates it.
+
+        Args:
+            user_query (str): The user's query.
+            relevant_information (List[str]): A list of relevant information or context nodes.
+
+        Yields:
+            str: The next piece of text generated by the language model.
+        """
+        prompt = self._prompt_template.format(
+            context=relevant_information,
+            query=user_query
+        )
+        response_stream = await self._language_model.astream_complete(prompt)
+        async for response in response_stream:
+            if response.delta:
+                yield response.delta
+
     async def funny_chat(
         self,
         query: str
@@ -80,7 +104,7 @@ class ChatEngine:
             answer=response.text
         )
         await self._weaviate_dbs.insert_suggestion_nodes(nodes=nodes)
-        self._suggestion_repository.add_suggestion(
+        await self._suggestion_repository.add_suggestion(
             question=query,
             answer=response.text
         )
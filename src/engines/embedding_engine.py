@@ -0,0 +1,197 @@
+"""
+This module provides an embedding model wrapper that deduplicates and caches embeddings.
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+from src.storage.result_cache import MongoResultCache
+from src.utils.cache import LRUCache
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Wraps an embedding model so that each distinct text of a batch is embedded once,
+    and embeddings already computed, by any process, are read from a persistent cache
+    keyed by the model name and the text.
+
+    It is meant to be set as ``Settings.embed_model``, so that the node inserts of
+    ingestion and the query embeddings of retrieval share the same cache. Query
+    embeddings are also kept in an in-memory LRU cache, so a repeated query skips
+    both the API and the persistent cache.
+    """
+
+    _embed_model: BaseEmbedding = PrivateAttr()
+    _store: Optional[MongoResultCache] = PrivateAttr()
+    _query_cache: Optional[LRUCache] = PrivateAttr()
+
+    def __init__(
+        self,
+        embed_model: BaseEmbedding = None,
+        store: Optional[MongoResultCache] = None,
+        query_cache: Optional[LRUCache] = None,
+        embed_batch_size: int = 2048,
+        **kwargs: Any
+    ) -> None:
+        """
+        Initializes the wrapper.
+
+        Args:
+            embed_model (BaseEmbedding): The model computing the embeddings.
+            store (Optional[MongoResultCache], optional): The persistent cache. Without it,
+                                                          only in-batch deduplication is done.
+            query_cache (Optional[LRUCache], optional): The in-memory cache of query embeddings.
+            embed_batch_size (int, optional): The number of texts deduplicated together.
+                The wrapped model still calls its API in batches of its own size.
+        """
+        super().__init__(
+            model_name=embed_model.model_name,
+            embed_batch_size=embed_batch_size,
+            **kwargs
+        )
+        self._embed_model = embed_model
+        self._store = store
+        self._query_cache = query_cache
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    def _cache_key(
+        self,
+        text: str,
+        kind: str
+    ) -> str:
+        """
+        Makes the cache key of a text.
+
+        Args:
+            text (str): The text to embed.
+            kind (str): "query" or "text", since a model may embed them differently.
+
+        Returns:
+            str: The cache key.
+        """
+        return MongoResultCache.make_key(self.model_name, kind, text)
+
+    def _lookup(
+        self,
+        texts: List[str],
+        kind: str
+    ) -> Dict[str, List[float]]:
+        """
+        Reads the cached embeddings of the distinct texts.
+
+        Args:
+            texts (List[str]): The texts to embed.
+            kind (str): "query" or "text".
+
+        Returns:
+            Dict[str, List[float]]: The cached embeddings, keyed by text.
+        """
+        if self._store is None:
+            return {}
+        keys = {text: self._cache_key(text, kind) for text in set(texts)}
+        found = self._store.get_many(keys.values())
+        return {text: found[key] for text, key in keys.items() if key in found}
+
+    def _save(
+        self,
+        embeddings: Dict[str, List[float]],
+        kind: str
+    ) -> None:
+        """
+        Writes new embeddings to the persistent cache.
+
+        Args:
+            embeddings (Dict[str, List[float]]): The embeddings, keyed by text.
+            kind (str): "query" or "text".
+        """
+        if self._store is not None:
+            self._store.set_many({self._cache_key(text, kind): embedding
+                                  for text, embedding in embeddings.items()})
+
+    def _embed(
+        self,
+        texts: List[str],
+        kind: str
+    ) -> List[List[float]]:
+        """
+        Embeds texts, computing only the distinct texts missing from the cache.
+
+        Args:
+            texts (List[str]): The texts to embed.
+            kind (str): "query" or "text".
+
+        Returns:
+            List[List[float]]: The embedding of each text, in order.
+        """
+        embeddings = self._lookup(texts, kind)
+        missing = list(dict.fromkeys(t for t in texts if t not in embeddings))
+        if missing:
+            if kind == "query":
+                computed = [self._embed_model.get_query_embedding(t) for t in missing]
+            else:
+                computed = self._embed_model.get_text_embedding_batch(missing)
+            computed = dict(zip(missing, computed))
+            self._save(computed, kind)
+            embeddings.update(computed)
+        return [embeddings[text] for text in texts]
+
+    async def _aembed(
+        self,
+        texts: List[str],
+        kind: str
+    ) -> List[List[float]]:
+        """
+        Asynchronous version of _embed. The cache is read and written in a worker thread.
+
+        Args:
+            texts (List[str]): The texts to embed.
+            kind (str): "query" or "text".
+
+        Returns:
+            List[List[float]]: The embedding of each text, in order.
+        """
+        embeddings = await asyncio.to_thread(self._lookup, texts, kind)
+        missing = list(dict.fromkeys(t for t in texts if t not in embeddings))
+        if missing:
+            if kind == "query":
+                computed = await asyncio.gather(
+                    *[self._embed_model.aget_query_embedding(t) for t in missing])
+            else:
+                computed = await self._embed_model.aget_text_embedding_batch(missing)
+            computed = dict(zip(missing, computed))
+            await asyncio.to_thread(self._save, computed, kind)
+            embeddings.update(computed)
+        return [embeddings[text] for text in texts]
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        embedding = self._query_cache.get(query) if self._query_cache is not None else None
+        if embedding is None:
+            embedding = self._embed([query], "query")[0]
+            if self._query_cache is not None:
+                self._query_cache.set(query, embedding)
+        return embedding
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        embedding = self._query_cache.get(query) if self._query_cache is not None else None
+        if embedding is None:
+            embedding = (await self._aembed([query], "query"))[0]
+            if self._query_cache is not None:
+                self._query_cache.set(query, embedding)
+        return embedding
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed([text], "text")[0]
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return (await self._aembed([text], "text"))[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, "text")
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return await self._aembed(texts, "text")
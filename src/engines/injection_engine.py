@@ -0,0 +1,211 @@
+"""
+This module provides a multi-pattern scanner for prompt injection phrases.
+"""
+
+import re
+from collections import deque
+from typing import Callable, List, Tuple
+
+from src.prompt.preprocessing_prompt import (PROMPT_INJECTION_PATTERNS,
+                                             POTENTIAL_PROMPT_INJECTION_PATTERNS)
+
+REGEX_METACHARACTERS = set(".^$*+?{}[]\\|()")
+# Group numbers shift once the patterns are combined into one alternation
+NUMBERED_REFERENCE = re.compile(r"\\[1-9]|\(\?\(\d")
+# The characters that re.IGNORECASE matches with a letter other than their
+# lowercase form, mapped to that letter. U+0130 is mapped before lowercasing,
+# since str.lower() expands it to two characters.
+CASE_FOLD = str.maketrans({
+    "\u00b5": "\u03bc",  # micro sign -> mu
+    "\u0130": "\u0069",  # dotted capital I -> i
+    "\u0131": "\u0069",  # dotless i -> i
+    "\u017f": "\u0073",  # long s -> s
+    "\u0345": "\u03b9",  # combining ypogegrammeni -> iota
+    "\u03c2": "\u03c3",  # final sigma -> sigma
+    "\u03d0": "\u03b2",  # beta symbol -> beta
+    "\u03d1": "\u03b8",  # theta symbol -> theta
+    "\u03d5": "\u03c6",  # phi symbol -> phi
+    "\u03d6": "\u03c0",  # pi symbol -> pi
+    "\u03f0": "\u03ba",  # kappa symbol -> kappa
+    "\u03f1": "\u03c1",  # rho symbol -> rho
+    "\u03f5": "\u03b5",  # lunate epsilon -> epsilon
+    "\u1c80": "\u0432",  # rounded ve -> ve
+    "\u1c81": "\u0434",  # long-legged de -> de
+    "\u1c82": "\u043e",  # narrow o -> o
+    "\u1c83": "\u0441",  # wide es -> es
+    "\u1c84": "\u0442",  # tall te -> te
+    "\u1c85": "\u0442",  # three-legged te -> te
+    "\u1c86": "\u044a",  # tall hard sign -> hard sign
+    "\u1c87": "\u0463",  # tall yat -> yat
+    "\u1c88": "\ua64b",  # unblended uk -> monograph uk
+    "\u1e9b": "\u1e61",  # long s with dot -> s with dot
+    "\u1fbe": "\u03b9",  # prosgegrammeni -> iota
+    "\u1fd3": "\u0390",  # iota with dialytika and oxia -> tonos
+    "\u1fe3": "\u03b0",  # upsilon with dialytika and oxia -> tonos
+    "\ufb06": "\ufb05",  # st ligature -> long s t ligature
+})
+
+
+def fold_case(text: str) -> str:
+    """
+    Lowercases a text so that two characters are equal exactly when
+    re.IGNORECASE matches them with each other.
+
+    Args:
+        text (str): The input text.
+
+    Returns:
+        str: The folded text, with one character per character of text.
+    """
+    return text.translate(CASE_FOLD).lower().translate(CASE_FOLD)
+
+
+class PromptInjectionScanner:
+    """
+    Finds every hard and potential prompt injection pattern in a text in one pass.
+
+    Literal patterns, which is nearly all of them, go into an Aho-Corasick
+    automaton over case-folded text. Patterns using regex syntax are compiled one
+    by one, behind a combined regex that only tells whether any of them can match,
+    so a text without a regex hit costs a single search. Patterns with numbered
+    group references are kept out of the combined regex and always searched.
+    Both match anywhere in the text, like ``re.search`` with ``re.IGNORECASE``.
+    """
+
+    def __init__(
+        self,
+        patterns: List[str] = None,
+        potential_patterns: List[str] = None
+    ) -> None:
+        """
+        Builds the automaton and the regexes.
+
+        Args:
+            patterns (List[str], optional): Patterns that always flag a prompt injection.
+                                            Defaults to PROMPT_INJECTION_PATTERNS.
+            potential_patterns (List[str], optional): Patterns that require confirmation by
+                                                      the classifier. Defaults to
+                                                      POTENTIAL_PROMPT_INJECTION_PATTERNS.
+        """
+        self.patterns = PROMPT_INJECTION_PATTERNS if patterns is None else patterns
+        self.potential_patterns = (POTENTIAL_PROMPT_INJECTION_PATTERNS
+                                   if potential_patterns is None else potential_patterns)
+        self._entries = ([(True, pattern) for pattern in self.patterns]
+                         + [(False, pattern) for pattern in self.potential_patterns])
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self._regexes = []
+        self._unfiltered_regexes = []
+        for idx, (_, pattern) in enumerate(self._entries):
+            if REGEX_METACHARACTERS.isdisjoint(pattern):
+                self._add_literal(fold_case(pattern), idx)
+            elif NUMBERED_REFERENCE.search(pattern):
+                self._unfiltered_regexes.append((idx, re.compile(pattern, re.IGNORECASE)))
+            else:
+                self._regexes.append((idx, re.compile(pattern, re.IGNORECASE)))
+        self._build_failure_links()
+        self._regex = None
+        if self._regexes:
+            try:
+                self._regex = re.compile(
+                    "|".join(f"(?:{regex.pattern})" for _, regex in self._regexes),
+                    re.IGNORECASE)
+            except re.error:
+                # e.g. a group name used by two patterns: every pattern is then
+                # searched on its own
+                self._regex = None
+
+    def _add_literal(self, pattern: str, idx: int) -> None:
+        """
+        Adds a case-folded literal pattern to the trie.
+        """
+        state = 0
+        for char in pattern:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._output[state].append(idx)
+
+    def _build_failure_links(self) -> None:
+        """
+        Computes the failure links and merges the outputs along them.
+        """
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + \
+                    self._output[self._fail[child]]
+
+    def scan(
+        self,
+        text: str
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Finds the patterns that occur in the text.
+
+        Args:
+            text (str): The input text.
+
+        Returns:
+            Tuple[List[str], List[str]]: The hard and the potential patterns found,
+                in the order of their lists.
+        """
+        hits = set()
+        state = 0
+        goto = self._goto
+        fail = self._fail
+        for char in fold_case(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if self._output[state]:
+                hits.update(self._output[state])
+        # An alternation reports one pattern per position and no overlapping
+        # matches, so it only decides whether the patterns are searched one by one
+        if self._regexes and (self._regex is None or self._regex.search(text)):
+            for idx, regex in self._regexes:
+                if regex.search(text):
+                    hits.add(idx)
+        for idx, regex in self._unfiltered_regexes:
+            if regex.search(text):
+                hits.add(idx)
+        hard = []
+        potential = []
+        for idx in sorted(hits):
+            is_hard, pattern = self._entries[idx]
+            (hard if is_hard else potential).append(pattern)
+        return hard, potential
+
+    def is_injection(
+        self,
+        text: str,
+        confirm: Callable[[str], bool]
+    ) -> bool:
+        """
+        Decides whether a text is a prompt injection. A hard pattern is enough, while
+        potential patterns are confirmed by one call to the classifier, however many
+        of them occur.
+
+        Args:
+            text (str): The input text.
+            confirm (Callable[[str], bool]): The classifier of texts with potential patterns.
+
+        Returns:
+            bool: True if the text is a prompt injection.
+        """
+        patterns, potential_patterns = self.scan(text)
+        if patterns:
+            return True
+        if potential_patterns:
+            return bool(confirm(text))
+        return False
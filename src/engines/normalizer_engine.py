@@ -0,0 +1,223 @@
+"""
+This module provides a precompiled text normalizer for user queries.
+"""
+
+import re
+from typing import Dict, List
+
+from src.prompt.preprocessing_prompt import (FILLTER_WORDS,
+                                             TERMS_DICT)
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+WORD_PATTERN = re.compile(r'\w+')
+ELONGATED_PATTERN = re.compile(r'(.)\1+')
+VIETNAMESE_CHARACTERS = r"[0-9a-zA-ZaăâbcdđeêghiklmnoôơpqrstuưvxyàằầbcdđèềghìklmnòồờpqrstùừvxỳáắấbcdđéếghíklmnóốớpqrstúứvxýảẳẩbcdđẻểghỉklmnỏổởpqrstủửvxỷạặậbcdđẹệghịklmnọộợpqrstụựvxỵãẵẫbcdđẽễghĩklmnõỗỡpqrstũữvxỹAĂÂBCDĐEÊGHIKLMNOÔƠPQRSTUƯVXYÀẰẦBCDĐÈỀGHÌKLMNÒỒỜPQRSTÙỪVXỲÁẮẤBCDĐÉẾGHÍKLMNÓỐỚPQRSTÚỨVXÝẠẶẬBCDĐẸỆGHỊKLMNỌỘỢPQRSTỤỰVXỴẢẲẨBCDĐẺỂGHỈKLMNỎỔỞPQRSTỦỬVXỶÃẴẪBCDĐẼỄGHĨKLMNÕỖỠPQRSTŨỮVXỸ,._]"
+NON_VIETNAMESE_PATTERN = re.compile(rf'[^{VIETNAMESE_CHARACTERS}\s]')
+EMOJI_PATTERN = re.compile(
+    "["
+    u"\U0001F600-\U0001F64F"
+    u"\U0001F300-\U0001F5FF"
+    u"\U0001F680-\U0001F6FF"
+    u"\U0001F700-\U0001F77F"
+    u"\U0001F780-\U0001F7FF"
+    u"\U0001F800-\U0001F8FF"
+    u"\U0001F900-\U0001F9FF"
+    u"\U0001FA00-\U0001FA6F"
+    u"\U0001FA70-\U0001FAFF"
+    u"\U00002702-\U000027B0"
+    u"\U000024C2-\U0001F251"
+    "]+",
+    flags=re.UNICODE
+)
+SYMBOL_TABLE = str.maketrans({
+    ">": " lớn hơn ",
+    "<": " bé hơn ",
+    "=": " bằng ",
+    "$": " ",
+    "#": " ",
+    "^": " ",
+    "/": " ",
+    "!": " "
+})
+
+
+class _RuleSet:
+    """
+    An ordered list of word-bounded replacement rules with a token index.
+
+    The rules are applied in their original order so that the cascading
+    behaviour of the sequential ``re.sub`` calls is preserved exactly, but
+    only the rules whose words can occur in the text are executed.
+    """
+
+    def __init__(self, rules: List[tuple]) -> None:
+        """
+        Compiles the rules and indexes them by the words they contain.
+
+        Args:
+            rules (List[tuple]): Ordered (pattern, replacement) pairs of literal text.
+        """
+        self.patterns = []
+        self.replacements = []
+        self.required_tokens = []
+        self.produced_tokens = []
+        self.always = []
+        self.index = {}
+        for pattern, replacement in rules:
+            if pattern == replacement:
+                continue
+            idx = len(self.patterns)
+            self.patterns.append(
+                re.compile(r'\b{}\b'.format(re.escape(pattern))))
+            self.replacements.append(replacement)
+            tokens = frozenset(WORD_PATTERN.findall(pattern))
+            self.required_tokens.append(tokens)
+            self.produced_tokens.append(
+                frozenset(WORD_PATTERN.findall(replacement)))
+            if not tokens:
+                self.always.append(idx)
+            for token in tokens:
+                self.index.setdefault(token, []).append(idx)
+
+    def candidates(self, text: str) -> List[int]:
+        """
+        Finds the rules that may match the text, including the ones that can only
+        match after an earlier rule has produced their words.
+
+        Args:
+            text (str): The text the rules will be applied to.
+
+        Returns:
+            List[int]: The indexes of the candidate rules in application order.
+        """
+        tokens = set(WORD_PATTERN.findall(text))
+        active = set(self.always)
+        frontier = list(tokens)
+        while frontier:
+            for idx in self.index.get(frontier.pop(), ()):
+                if idx in active or not self.required_tokens[idx] <= tokens:
+                    continue
+                active.add(idx)
+                for token in self.produced_tokens[idx]:
+                    if token not in tokens:
+                        tokens.add(token)
+                        frontier.append(token)
+        return sorted(active)
+
+    def apply(self, text: str) -> str:
+        """
+        Applies the candidate rules to the text.
+
+        Args:
+            text (str): The input text.
+
+        Returns:
+            str: The text with every matching rule applied.
+        """
+        for idx in self.candidates(text):
+            text = self.patterns[idx].sub(self.replacements[idx], text)
+        return text
+
+
+class TextNormalizer:
+    """
+    Normalizes user queries with patterns that are compiled once at startup.
+
+    The output is identical to the step-by-step cleaning performed by
+    ``PreprocessQuestion``: filler words and synonyms keep their list order,
+    but each query only runs the handful of rules whose words it contains.
+    """
+
+    def __init__(
+        self,
+        term_dict: Dict[str, List[str]] = None,
+        filler_words: List[str] = None
+    ) -> None:
+        """
+        Builds the filler word and synonym rule sets.
+
+        Args:
+            term_dict (Dict[str, List[str]], optional): Mapping of keywords to their synonyms.
+                                                        Defaults to TERMS_DICT.
+            filler_words (List[str], optional): Filler words to remove.
+                                                Defaults to FILLTER_WORDS.
+        """
+        self.term_dict = TERMS_DICT if term_dict is None else term_dict
+        self.filler_words = FILLTER_WORDS if filler_words is None else filler_words
+        self._filler_rules = _RuleSet(
+            [(word.strip().lower(), '') for word in self.filler_words]
+        )
+        self._synonym_rules = _RuleSet(
+            [(synonym.strip().lower(), keyword.lower())
+             for keyword, synonyms in self.term_dict.items()
+             for synonym in synonyms]
+        )
+
+    def remove_filler_words(self, text: str) -> str:
+        """
+        Removes the filler words from the text and cleans up extra spaces.
+
+        Args:
+            text (str): The input text.
+
+        Returns:
+            str: The text without filler words.
+        """
+        text = self._filler_rules.apply(text.lower())
+        return WHITESPACE_PATTERN.sub(' ', text).strip()
+
+    def replace_synonyms(self, text: str) -> str:
+        """
+        Replaces synonyms in the text by their keywords.
+
+        Args:
+            text (str): The input text.
+
+        Returns:
+            str: The text with synonyms replaced.
+        """
+        return self._synonym_rules.apply(text.lower())
+
+    @staticmethod
+    def replace_symbols(text: str) -> str:
+        """
+        Replaces specific symbols in the text and cleans up extra spaces.
+
+        Args:
+            text (str): The input text.
+
+        Returns:
+            str: The text with symbols replaced.
+        """
+        return " ".join(text.translate(SYMBOL_TABLE).split())
+
+    @staticmethod
+    def normalize_elonge_word(text: str) -> str:
+        """
+        Shortens elongated words by removing consecutive duplicate characters.
+
+        Args:
+            text (str): Single-spaced input text.
+
+        Returns:
+            str: The text with elongated words shortened.
+        """
+        return ELONGATED_PATTERN.sub(r'\1', text)
+
+    def normalize(self, text: str) -> str:
+        """
+        Cleans and normalizes a query.
+
+        Args:
+            text (str): The raw query.
+
+        Returns:
+            str: The cleaned and normalized query.
+        """
+        text = WHITESPACE_PATTERN.sub(' ', text)
+        text = NON_VIETNAMESE_PATTERN.sub('', text.lower()).strip()
+        text = self.remove_filler_words(text)
+        text = EMOJI_PATTERN.sub('', text)
+        text = self.replace_synonyms(text)
+        text = self.replace_symbols(text)
+        return self.normalize_elonge_word(text)
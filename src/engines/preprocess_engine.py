@@ -3,24 +3,24 @@ This module is used for preprocessing queries
 """
 
 import re
-from difflib import SequenceMatcher
+import time
+import asyncio
+import threading
+from concurrent.futures import Executor
 from underthesea import word_tokenize
-import torch
 import numpy as np
 
-from src.models.preprocess import (ProcessedData,
-                                   ShortChat,
-                                   UnsupportedLanguage,
-                                   PromptInjection)
+from src.engines.normalizer_engine import (TextNormalizer,
+                                           EMOJI_PATTERN)
+from src.engines.tonemark_engine import ToneMarkBatcher
+from src.engines.short_chat_engine import ShortChatMatcher
+from src.engines.injection_engine import PromptInjectionScanner
+from src.utils.cache import LRUCache
+from src.models.preprocess import ProcessedData
 from src.prompt.postprocessing_prompt import (RESPONSE_UNSUPPORTED_LANGUAGE,
                                               RESPONSE_PROMPT_INJECTION)
 from src.prompt.preprocessing_prompt import (FILLTER_WORDS,
-                                             TERMS_DICT,
-                                             SHORT_CHAT,
-                                             RESPONSE_DICT,
-                                             TOKENIZER_WORD_PREFIX,
-                                             PROMPT_INJECTION_PATTERNS,
-                                             POTENTIAL_PROMPT_INJECTION_PATTERNS)
+                                             TOKENIZER_WORD_PREFIX)
 
 
 class PreprocessQuestion:
@@ -38,7 +38,14 @@ class PreprocessQuestion:
         prompt_injection_model,
         prompt_injection_vectorizer,
         device_type,
-        label_list
+        label_list,
+        text_normalizer: TextNormalizer = None,
+        tonemark_batcher: ToneMarkBatcher = None,
+        executor: Executor = None,
+        short_chat_matcher: ShortChatMatcher = None,
+        injection_scanner: PromptInjectionScanner = None,
+        result_cache: LRUCache = None,
+        version: str = None
     ) -> None:
         """
         Initializes the model manager with various models and vectorizers.
@@ -53,6 +60,21 @@ class PreprocessQuestion:
             prompt_injection_vectorizer: The vectorizer associated with the prompt injection model.
             device_type: The type of device (e.g., 'cpu', 'cuda') used for model inference.
             label_list: A list of labels used in classification tasks.
+            text_normalizer (TextNormalizer, optional): The precompiled normalizer used
+                                                        to clean queries.
+            tonemark_batcher (ToneMarkBatcher, optional): The micro-batcher used to run
+                                                          the tonemark model off the event loop.
+            executor (Executor, optional): The pool the CPU-bound preprocessing stages are
+                                           dispatched to. If None, stages run inline.
+            short_chat_matcher (ShortChatMatcher, optional): The indexed matcher used to
+                                                             detect and answer short chats.
+            injection_scanner (PromptInjectionScanner, optional): The multi-pattern scanner
+                                                                  for prompt injection phrases.
+            result_cache (LRUCache, optional): The cache of preprocessing results, keyed by
+                                               the raw and the cleaned query. If None,
+                                               every query is preprocessed.
+            version (str, optional): Identifies the loaded models and dictionaries.
+                                     Cached results are keyed by it.
 
         Returns:
             None
@@ -66,6 +88,42 @@ class PreprocessQuestion:
         self.prompt_injection_vectorizer = prompt_injection_vectorizer
         self.device_type = device_type
         self.label_list = label_list
+        self.text_normalizer = text_normalizer or TextNormalizer()
+        self.tonemark_batcher = tonemark_batcher
+        self.executor = executor
+        self.short_chat_matcher = short_chat_matcher or ShortChatMatcher()
+        self.injection_scanner = injection_scanner or PromptInjectionScanner()
+        self.result_cache = result_cache
+        self.version = version
+        self._tokenize_lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+
+    def reload(
+        self,
+        version: str,
+        **components
+    ) -> None:
+        """
+        Replaces reloaded models and engines. Stages that start afterwards use the
+        new components, while the results of queries already running are cached
+        under the previous version. A classifier and its vectorizer are swapped
+        together, so a stage never mixes an old one with a new one.
+
+        Args:
+            version (str): Identifies the reloaded models and dictionaries.
+            **components: The new values of the attributes, by attribute name,
+                          e.g. domain_clf_model or text_normalizer.
+
+        Raises:
+            AttributeError: If a component is not an attribute of this class.
+        """
+        for name in components:
+            if not hasattr(self, name):
+                raise AttributeError(f"Unknown preprocessing component: {name}")
+        with self._swap_lock:
+            for name, value in components.items():
+                setattr(self, name, value)
+            self.version = version
 
     @staticmethod
     def normalize_elonge_word(text):
@@ -114,27 +172,6 @@ class PreprocessQuestion:
             text = text.replace(symbol, replacement)
         return " ".join(text.split())
 
-    @staticmethod
-    def replace_synonyms(text, synonym_dict):
-        """
-        Replaces synonyms in the input text
-
-        Args:
-            text (str): The input text in which synonyms need to be replaced.
-            synonym_dict (dict): A dictionary where keys are target keywords and values.
-
-        Returns:
-            str: The text with synonyms replaced by their corresponding keywords.
-        """
-        text = text.lower()
-        for keyword, synonyms in synonym_dict.items():
-            keyword = keyword.lower()
-            for synonym in synonyms:
-                synonym = synonym.strip().lower()
-                text = re.sub(r'\b{}\b'.format(
-                    re.escape(synonym)), keyword, text)
-        return text
-
     @staticmethod
     def remove_emojis(text):
         """
@@ -146,42 +183,7 @@ class PreprocessQuestion:
         Returns:
             str: The text with all emojis removed.
         """
-        emoji_pattern = re.compile(
-            "["
-            u"\U0001F600-\U0001F64F"
-            u"\U0001F300-\U0001F5FF"
-            u"\U0001F680-\U0001F6FF"
-            u"\U0001F700-\U0001F77F"
-            u"\U0001F780-\U0001F7FF"
-            u"\U0001F800-\U0001F8FF"
-            u"\U0001F900-\U0001F9FF"
-            u"\U0001FA00-\U0001FA6F"
-            u"\U0001FA70-\U0001FAFF"
-            u"\U00002702-\U000027B0"
-            u"\U000024C2-\U0001F251"
-            "]+",
-            flags=re.UNICODE
-        )
-        return emoji_pattern.sub(r'', text)
-
-    @staticmethod
-    def remove_filler_words(text, filler_words):
-        """
-        Removes specified filler words from the input text.
-
-        Args:
-            text (str): The input text from which filler words need to be removed.
-            filler_words (list): A list of filler words (e.g., "uh", "um").
-
-        Returns:
-            str: The text with the specified filler words removed and extra spaces cleaned up.
-        """
-        text = text.lower()
-        for word in filler_words:
-            pattern = r'\b{}\b'.format(re.escape(word.strip().lower()))
-            text = re.sub(pattern, '', text)
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text
+        return EMOJI_PATTERN.sub(r'', text)
 
     @staticmethod
     def delete_non_vietnamese_characters(text):
@@ -269,57 +271,21 @@ class PreprocessQuestion:
         Returns:
             bool: True if prompt injection patterns are detected; False otherwise.
         """
-        for pattern in PROMPT_INJECTION_PATTERNS:
-            if re.search(pattern, text, re.IGNORECASE):
-                return True
-        for pattern in POTENTIAL_PROMPT_INJECTION_PATTERNS:
-            if re.search(pattern, text, re.IGNORECASE):
-                if self.prompt_injection_model.predict(
-                    self.prompt_injection_vectorizer.transform([text])
-                )[0]:
-                    return True
-        return False
+        return self.injection_scanner.is_injection(text, self.classify_injection)
 
-    def detect_short_chat(self, text_input):
+    def classify_injection(self, text):
         """
-        Detects if the input text is a short chat message based on patterns and emojis.
+        Classifies a text that contains potential prompt injection patterns.
 
         Args:
-            text_input (str): The input text to be analyzed.
+            text (str): The input text to be checked.
 
         Returns:
-            bool: True if the text is detected as a short chat message; False otherwise.
-        """
-        emoji_pattern = re.compile(
-            "["
-            u"\U0001F600-\U0001F64F"
-            u"\U0001F300-\U0001F5FF"
-            u"\U0001F680-\U0001F6FF"
-            u"\U0001F700-\U0001F77F"
-            u"\U0001F780-\U0001F7FF"
-            u"\U0001F800-\U0001F8FF"
-            u"\U0001F900-\U0001F9FF"
-            u"\U0001FA00-\U0001FA6F"
-            u"\U0001FA70-\U0001FAFF"
-            u"\U00002702-\U000027B0"
-            u"\U000024C2-\U0001F251"
-            "]+",
-            flags=re.UNICODE
-        )
-        normalized_text = text_input.lower().strip()
-        has_emoji = bool(emoji_pattern.search(normalized_text))
-
-        def is_similar(text1, text2, threshold=0.85):
-            return SequenceMatcher(None, text1, text2).ratio() >= threshold
-        matches_pattern = any(is_similar(normalized_text, pattern)
-                              for pattern in SHORT_CHAT)
-        if has_emoji:
-            if matches_pattern or normalized_text == '':
-                return True
-        elif matches_pattern:
-            return True
-
-        return False
+            bool: True if the classifier flags the text as a prompt injection.
+        """
+        with self._swap_lock:
+            model, vectorizer = self.prompt_injection_model, self.prompt_injection_vectorizer
+        return bool(model.predict(vectorizer.transform([text]))[0])
 
     def insert_accents(self, text, model, tokenizer):
         """
@@ -343,6 +309,7 @@ class PreprocessQuestion:
         input_ids = inputs['input_ids']
         tokens = tokenizer.convert_ids_to_tokens(input_ids[0])
         tokens = tokens[1:-1]
+        import torch  # pylint: disable=import-outside-toplevel
         with torch.no_grad():
             inputs.to(self.device_type)
             outputs = model(**inputs)
@@ -352,31 +319,6 @@ class PreprocessQuestion:
         assert len(tokens) == len(predictions)
         return tokens, predictions
 
-    def get_response(self, input_text, short_chats, response_dict, threshold=0.9):
-        """
-        Finds the best matching short chat and returns the corresponding response.
-
-        Args:
-            input_text (str): The input text to match.
-            short_chats (list of str): List of short chat patterns to match against.
-            response_dict (dict): Dictionary mapping short chats to responses.
-            threshold (float, optional): Similarity ratio threshold for matching. Default is 0.9.
-
-        Returns:
-            str: The response corresponding to the best match or a default message.
-        """
-        input_text = input_text.lower().strip()
-        best_match = None
-        best_ratio = 0.0
-        for chat in short_chats:
-            ratio = SequenceMatcher(None, input_text, chat).ratio()
-            if ratio > best_ratio and ratio >= threshold:
-                best_ratio = ratio
-                best_match = chat
-        if best_match and best_match in response_dict:
-            return response_dict[best_match]
-        return "Mình chưa hiểu rõ ý bạn lắm."
-
     def clean_text(self, text, term_dict):
         """
         Cleans and normalizes the input text using various text processing methods.
@@ -388,14 +330,13 @@ class PreprocessQuestion:
         Returns:
             str: The cleaned and normalized text.
         """
-        text = re.sub(r'\s+', ' ', text)
-        text = self.delete_non_vietnamese_characters(text.lower())
-        text = self.remove_filler_words(text, FILLTER_WORDS)
-        text = self.remove_emojis(text)
-        text = self.replace_synonyms(text, term_dict)
-        text = self.replace_symbols(text)
-        text = self.normalize_elonge_word(text)
-        return text
+        normalizer = self.text_normalizer
+        if term_dict is not normalizer.term_dict:
+            normalizer = TextNormalizer(
+                term_dict=term_dict,
+                filler_words=FILLTER_WORDS
+            )
+        return normalizer.normalize(text)
 
     def lang_detect_2(self, text: str = None):
         """
@@ -429,8 +370,30 @@ class PreprocessQuestion:
         Returns:
             str: The Vietnamese text with corrected accents.
         """
-        tokens, predictions = self.insert_accents(
-            text, self.tonemark_model, self.tonemark_tokenizer)
+        if self.tonemark_batcher is not None:
+            tokens, predictions = self.tonemark_batcher.predict_batch([text])[0]
+        else:
+            tokens, predictions = self.insert_accents(
+                text, self.tonemark_model, self.tonemark_tokenizer)
+        merged_tokens_preds = self.merge_tokens_and_preds(tokens, predictions)
+        accented_words = self.get_accented_words(
+            merged_tokens_preds, self.label_list)
+        return ' '.join(accented_words)
+
+    async def acorrect_vietnamese_text(self, text):
+        """
+        Corrects the accents in Vietnamese text, batching the model call with other
+        concurrent queries when a tonemark batcher is configured.
+
+        Args:
+            text (str): The input Vietnamese text to correct.
+
+        Returns:
+            str: The Vietnamese text with corrected accents.
+        """
+        if self.tonemark_batcher is None:
+            return self.correct_vietnamese_text(text)
+        tokens, predictions = await self.tonemark_batcher.predict(text)
         merged_tokens_preds = self.merge_tokens_and_preds(tokens, predictions)
         accented_words = self.get_accented_words(
             merged_tokens_preds, self.label_list)
@@ -446,7 +409,8 @@ class PreprocessQuestion:
         Returns:
             list of str: A list of tokens (words) from the input text.
         """
-        tokens = word_tokenize(text, format='text')
+        with self._tokenize_lock:
+            tokens = word_tokenize(text, format='text')
         return tokens
 
     def classify_domain(self, text):
@@ -461,50 +425,130 @@ class PreprocessQuestion:
         """
         # Preprocess the text
         processed_text = self.tokenize_text(text)
-        text_tfidf = self.domain_clf_vectorizer.transform([processed_text])
-        prediction = self.domain_clf_model.predict(text_tfidf)
+        with self._swap_lock:
+            model, vectorizer = self.domain_clf_model, self.domain_clf_vectorizer
+        text_tfidf = vectorizer.transform([processed_text])
+        prediction = model.predict(text_tfidf)
         return prediction[0]
 
+    async def run_stage(self, stage, timings, func, *args):
+        """
+        Runs a CPU-bound preprocessing stage on the executor and records its duration.
+
+        Args:
+            stage (str): The name of the stage, used as key in timings.
+            timings (dict): The mapping the elapsed seconds are written to.
+            func (callable): The stage function.
+            *args: The arguments passed to func.
+
+        Returns:
+            The result of func.
+        """
+        start = time.perf_counter()
+        if self.executor is None:
+            result = func(*args)
+        else:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self.executor, func, *args)
+        timings[stage] = time.perf_counter() - start
+        return result
+
     async def preprocess_text(self, text_input):
         """
         Preprocesses the input text to classify it and detect various conditions
-        such as short chat, language, and prompt injection.
+        such as short chat, language, and prompt injection. Every CPU-bound stage is
+        dispatched to the executor so the event loop keeps serving other requests.
 
         Args:
             text_input (str): The input text to preprocess.
 
         Returns:
-            Union[ShortChat, UnsupportedLanguage, PromptInjection, ProcessedData]: 
-                - ShortChat if the text is detected as a short chat.
-                - UnsupportedLanguage if the detected language is not supported.
-                - PromptInjection if prompt injection is detected.
-                - ProcessedData with various flags and processed text otherwise.
+            ProcessedData: The processed text, the detection flags and
+                the duration of each stage in seconds.
+        """
+        if self.result_cache is None:
+            return await self._preprocess_text(text_input)
+        version = self.version
+        start = time.perf_counter()
+        cached = self.result_cache.get(("raw", version, text_input))
+        if cached is not None:
+            return cached.model_copy(
+                update={"stage_timings": {"cache": time.perf_counter() - start}})
+        result = await self._preprocess_text(text_input, version)
+        self.result_cache.set(("raw", version, text_input), result)
+        return result
+
+    async def _preprocess_text(self, text_input, version=None):
+        """
+        Runs the preprocessing stages, reusing the result of any earlier query
+        that cleans to the same text.
+
+        Args:
+            text_input (str): The input text to preprocess.
+            version (str, optional): The version of the components the query started with.
+
+        Returns:
+            ProcessedData: The processed text, the detection flags and
+                the duration of each stage in seconds.
+        """
+        timings = {}
+        clean_text_input = await self.run_stage(
+            "clean", timings, self.clean_text, text_input, self.text_normalizer.term_dict)
+        if self.result_cache is not None:
+            start = time.perf_counter()
+            cached = self.result_cache.get(("clean", version, clean_text_input))
+            if cached is not None:
+                timings["cache"] = time.perf_counter() - start
+                update = {"stage_timings": timings}
+                if cached.is_outdomain:
+                    update["query"] = text_input
+                return cached.model_copy(update=update)
+            result = await self._run_stages(text_input, clean_text_input, timings)
+            self.result_cache.set(("clean", version, clean_text_input), result)
+            return result
+        return await self._run_stages(text_input, clean_text_input, timings)
+
+    async def _run_stages(self, text_input, clean_text_input, timings):
+        """
+        Runs the detection stages that follow the cleaning of a query.
+
+        Args:
+            text_input (str): The raw input text.
+            clean_text_input (str): The cleaned input text.
+            timings (Dict[str, float]): The stage durations recorded so far.
+
+        Returns:
+            ProcessedData: The processed text, the detection flags and
+                the duration of each stage in seconds.
         """
         query = ""
         language = True
         prompt_injection = False
         outdomain = False
         short_chat = False
-
-        clean_text_input = self.clean_text(text_input, TERMS_DICT)
-        is_short_chat = self.detect_short_chat(clean_text_input)
+        is_short_chat, short_chat_response = await self.run_stage(
+            "short_chat", timings, self.short_chat_matcher.match, clean_text_input)
 
         if is_short_chat:
-            query = self.get_response(
-                clean_text_input, SHORT_CHAT, RESPONSE_DICT, threshold=0.9)
+            query = short_chat_response
             return ProcessedData(
                 query=query,
                 language=language,
                 is_prompt_injection=prompt_injection,
                 is_outdomain=outdomain,
-                is_short_chat=is_short_chat
+                is_short_chat=is_short_chat,
+                stage_timings=timings
             )
 
         if short_chat is False:
-            lang, _ = self.lang_detect_2(clean_text_input)
+            lang, _ = await self.run_stage(
+                "language", timings, self.lang_detect_2, clean_text_input)
             corrected_text = clean_text_input
             if lang == "vie_Latn":
-                corrected_text = self.correct_vietnamese_text(clean_text_input)
+                start = time.perf_counter()
+                corrected_text = await self.acorrect_vietnamese_text(
+                    clean_text_input)
+                timings["tonemark"] = time.perf_counter() - start
             else:
                 language = False
                 return ProcessedData(
@@ -512,19 +556,23 @@ class PreprocessQuestion:
                     language=language,
                     is_prompt_injection=prompt_injection,
                     is_outdomain=outdomain,
-                    is_short_chat=short_chat
+                    is_short_chat=short_chat,
+                    stage_timings=timings
                 )
             if language:
-                if self.is_prompt_injection(corrected_text):
+                if await self.run_stage(
+                        "prompt_injection", timings, self.is_prompt_injection, corrected_text):
                     prompt_injection = True
                     return ProcessedData(
                         query=RESPONSE_PROMPT_INJECTION,
                         language=language,
                         is_prompt_injection=prompt_injection,
                         is_outdomain=outdomain,
-                        is_short_chat=short_chat
+                        is_short_chat=short_chat,
+                        stage_timings=timings
                     )
-                domain = self.classify_domain(corrected_text)
+                domain = await self.run_stage(
+                    "domain", timings, self.classify_domain, corrected_text)
                 if domain == 0:
                     outdomain = True
                 if language and not outdomain:
@@ -538,5 +586,6 @@ class PreprocessQuestion:
             language=language,
             is_prompt_injection=prompt_injection,
             is_outdomain=outdomain,
-            is_short_chat=short_chat
+            is_short_chat=short_chat,
+            stage_timings=timings
         )
@@ -43,6 +43,24 @@ class HybridRetriever:
             alpha=ALPHA
         )
 
+    def set_index(
+        self,
+        index: VectorStoreIndex
+    ) -> None:
+        """
+        Retrieves from another index from now on, e.g. after a collection rebuild.
+
+        Args:
+            index (VectorStoreIndex): The index to retrieve from.
+        """
+        retriever = index.as_retriever(
+            vector_store_query_mode=VECTOR_STORE_QUERY_MODE,
+            similarity_top_k=SIMILARITY_TOP_K,
+            alpha=ALPHA
+        )
+        self._index = index
+        self._retriever = retriever
+
     async def combine_retrieved_nodes(
         self,
         retrieved_nodes: List[TextNode],
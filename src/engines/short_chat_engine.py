@@ -0,0 +1,157 @@
+"""
+This module provides an indexed matcher for short chat messages.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+
+from src.engines.normalizer_engine import EMOJI_PATTERN
+from src.prompt.preprocessing_prompt import (SHORT_CHAT,
+                                             RESPONSE_DICT,
+                                             RESPONSE_SHORT_CHAT_DEFAULT)
+
+
+class ShortChatMatcher:
+    """
+    Finds the canned short chat phrase most similar to a query.
+
+    Similarity is the ``SequenceMatcher.ratio()`` used before. Phrases are
+    indexed by their characters, sorted by length, so only the phrases whose
+    length and character overlap allow the ratio to reach the threshold are
+    compared.
+    """
+
+    def __init__(
+        self,
+        short_chats: List[str] = None,
+        response_dict: Dict[str, str] = None,
+        detect_threshold: float = 0.85,
+        response_threshold: float = 0.9,
+        default_response: str = RESPONSE_SHORT_CHAT_DEFAULT
+    ) -> None:
+        """
+        Builds the character index of the short chat phrases.
+
+        Args:
+            short_chats (List[str], optional): The short chat phrases. Defaults to SHORT_CHAT.
+            response_dict (Dict[str, str], optional): Mapping of phrases to responses.
+                                                      Defaults to RESPONSE_DICT.
+            detect_threshold (float, optional): The ratio above which a query is a short chat.
+            response_threshold (float, optional): The ratio above which a phrase's
+                                                  response is returned.
+            default_response (str, optional): The response used when no phrase is close enough.
+        """
+        self.short_chats = SHORT_CHAT if short_chats is None else short_chats
+        self.response_dict = RESPONSE_DICT if response_dict is None else response_dict
+        self.detect_threshold = detect_threshold
+        self.response_threshold = response_threshold
+        self.default_response = default_response
+        self._phrases = list(dict.fromkeys(self.short_chats))
+        self._empty = [idx for idx, phrase in enumerate(self._phrases)
+                       if not phrase]
+        postings = {}
+        for idx, phrase in enumerate(self._phrases):
+            for char, count in Counter(phrase).items():
+                postings.setdefault(char, []).append(
+                    (len(phrase), idx, count))
+        self._index = {}
+        for char, entries in postings.items():
+            entries.sort()
+            self._index[char] = (
+                [length for length, _, _ in entries],
+                [(idx, count) for _, idx, count in entries]
+            )
+
+    def _candidates(
+        self,
+        text: str,
+        threshold: float
+    ) -> List[Tuple[float, int]]:
+        """
+        Lists the phrases whose upper bound on the ratio reaches the threshold.
+
+        Args:
+            text (str): The normalized query.
+            threshold (float): The minimum ratio.
+
+        Returns:
+            List[Tuple[float, int]]: (upper bound, phrase index) pairs.
+        """
+        size = len(text)
+        if not size:
+            return [(1.0, idx) for idx in self._empty]
+        min_length = size * threshold / (2 - threshold) - 1e-9
+        max_length = size * (2 - threshold) / threshold + 1e-9
+        overlap = {}
+        for char, count in Counter(text).items():
+            if char not in self._index:
+                continue
+            lengths, entries = self._index[char]
+            start = bisect_left(lengths, min_length)
+            end = bisect_right(lengths, max_length)
+            for idx, phrase_count in entries[start:end]:
+                overlap[idx] = overlap.get(idx, 0) + min(count, phrase_count)
+        candidates = []
+        for idx, matched in overlap.items():
+            bound = 2.0 * matched / (size + len(self._phrases[idx]))
+            if bound >= threshold:
+                candidates.append((bound, idx))
+        return candidates
+
+    def best_match(
+        self,
+        text: str,
+        threshold: float
+    ) -> Tuple[Optional[str], float]:
+        """
+        Finds the first phrase with the highest ratio at or above the threshold.
+
+        Args:
+            text (str): The normalized query.
+            threshold (float): The minimum ratio.
+
+        Returns:
+            Tuple[Optional[str], float]: The best phrase, or None, and its ratio.
+        """
+        best_idx = None
+        best_ratio = 0.0
+        for bound, idx in sorted(self._candidates(text, threshold),
+                                 key=lambda item: (-item[0], item[1])):
+            if bound < best_ratio:
+                break
+            ratio = SequenceMatcher(None, text, self._phrases[idx]).ratio()
+            if ratio < threshold:
+                continue
+            if ratio > best_ratio or (ratio == best_ratio and idx < best_idx):
+                best_idx = idx
+                best_ratio = ratio
+        if best_idx is None:
+            return None, 0.0
+        return self._phrases[best_idx], best_ratio
+
+    def match(
+        self,
+        text: str
+    ) -> Tuple[bool, str]:
+        """
+        Detects whether the text is a short chat and finds its response in one pass.
+
+        Args:
+            text (str): The cleaned query.
+
+        Returns:
+            Tuple[bool, str]: Whether the text is a short chat, and the response
+                of the best matching phrase or the default response.
+        """
+        normalized_text = text.lower().strip()
+        has_emoji = bool(EMOJI_PATTERN.search(normalized_text))
+        threshold = min(self.detect_threshold, self.response_threshold)
+        phrase, ratio = self.best_match(normalized_text, threshold)
+        matches_pattern = phrase is not None and ratio >= self.detect_threshold
+        is_short_chat = matches_pattern or (has_emoji and normalized_text == '')
+        if (phrase is not None and ratio >= self.response_threshold
+                and phrase in self.response_dict):
+            return is_short_chat, self.response_dict[phrase]
+        return is_short_chat, self.default_response
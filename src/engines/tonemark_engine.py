@@ -0,0 +1,431 @@
+"""
+This module provides the inference backends and a micro-batching runner
+for the tone-mark restoration model.
+"""
+
+import os
+import asyncio
+import inspect
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+import numpy as np
+
+
+def default_torch_device():
+    """
+    Selects the PyTorch device for the tone-mark model. PyTorch is imported here,
+    so that serving the ONNX model does not load it.
+
+    Returns:
+        torch.device: "cuda" if a GPU is available, otherwise "cpu".
+    """
+    import torch  # pylint: disable=import-outside-toplevel
+    return torch.device("cuda") if torch.cuda.is_available() else torch.device("cpu")
+
+
+class TorchToneMarkBackend:
+    """
+    Runs the HuggingFace token classification model with PyTorch.
+    """
+
+    return_tensors = "pt"
+
+    def __init__(
+        self,
+        model,
+        device_type
+    ) -> None:
+        """
+        Initializes the backend.
+
+        Args:
+            model: The token classification model used for tone-mark prediction.
+            device_type: The device (e.g., 'cpu', 'cuda') used for inference.
+        """
+        self._model = model
+        self._device_type = device_type
+
+    def logits(self, inputs) -> np.ndarray:
+        """
+        Computes the logits of a tokenized batch.
+
+        Args:
+            inputs: The tokenizer output as PyTorch tensors.
+
+        Returns:
+            np.ndarray: The logits with shape (batch, sequence, labels).
+        """
+        import torch  # pylint: disable=import-outside-toplevel
+        with torch.no_grad():
+            outputs = self._model(
+                **{name: value.to(self._device_type) for name, value in inputs.items()})
+        return outputs["logits"].cpu().numpy()
+
+
+class OnnxToneMarkBackend:
+    """
+    Runs an exported (optionally int8-quantized) tone-mark model with ONNX Runtime.
+    """
+
+    return_tensors = "np"
+
+    def __init__(
+        self,
+        model_path: str,
+        intra_op_num_threads: int = 0
+    ) -> None:
+        """
+        Initializes the ONNX Runtime session.
+
+        Args:
+            model_path (str): The path of the ONNX model.
+            intra_op_num_threads (int, optional): The number of threads used inside an
+                                                  operator. 0 lets ONNX Runtime decide.
+        """
+        import onnxruntime as ort  # pylint: disable=import-outside-toplevel
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_num_threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = ort.InferenceSession(
+            model_path,
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self._input_names = [item.name for item in self._session.get_inputs()]
+
+    def logits(self, inputs) -> np.ndarray:
+        """
+        Computes the logits of a tokenized batch.
+
+        Args:
+            inputs: The tokenizer output as numpy arrays.
+
+        Returns:
+            np.ndarray: The logits with shape (batch, sequence, labels).
+        """
+        feed = {name: np.asarray(inputs[name], dtype=np.int64)
+                for name in self._input_names}
+        return self._session.run(["logits"], feed)[0]
+
+
+def export_onnx_model(
+    model,
+    tokenizer,
+    output_path: str,
+    quantize: bool = True
+) -> str:
+    """
+    Exports the tone-mark model to ONNX with dynamic batch and sequence axes,
+    optionally applying dynamic int8 quantization to the weights.
+
+    Args:
+        model: The PyTorch token classification model.
+        tokenizer: The tokenizer associated with the model.
+        output_path (str): Where to write the final ONNX model.
+        quantize (bool, optional): Whether to quantize the exported model to int8.
+
+    Returns:
+        str: The path of the exported model.
+    """
+    import torch  # pylint: disable=import-outside-toplevel
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    fp32_path = output_path
+    if quantize:
+        fp32_path = os.path.splitext(output_path)[0] + "-fp32.onnx"
+    encoded = tokenizer([["xin", "chao"]],
+                        is_split_into_words=True,
+                        return_tensors="pt")
+    # The graph inputs follow the order of forward(), which input_names must match
+    parameters = list(inspect.signature(model.forward).parameters)
+    sample = {name: encoded[name]
+              for name in sorted(encoded, key=parameters.index)}
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in sample}
+    dynamic_axes["logits"] = {0: "batch", 1: "sequence"}
+    sample = {name: value.to(model.device) for name, value in sample.items()}
+    model.eval()
+    options = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        # The TorchScript exporter, which newer torch versions no longer default to,
+        # is the one that takes dynamic_axes
+        options["dynamo"] = False
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample,),
+            fp32_path,
+            input_names=list(sample),
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+            **options
+        )
+    if quantize:
+        from onnxruntime.quantization import (  # pylint: disable=import-outside-toplevel
+            quantize_dynamic,
+            QuantType)
+        try:
+            quantize_dynamic(
+                model_input=fp32_path,
+                model_output=output_path,
+                weight_type=QuantType.QInt8
+            )
+        finally:
+            # Only the quantized model is served
+            os.remove(fp32_path)
+    return output_path
+
+
+class ToneMarkBatcher:
+    """
+    Groups concurrent tone-mark predictions into padded batches that are run
+    in a worker thread, so the model never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        backend,
+        tokenizer,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5
+    ) -> None:
+        """
+        Initializes the batcher.
+
+        Args:
+            backend: The backend (TorchToneMarkBackend or OnnxToneMarkBackend)
+                     used to compute the logits.
+            tokenizer: The tokenizer associated with the model.
+            max_batch_size (int, optional): The maximum number of queries per forward pass.
+            max_wait_ms (float, optional): How long to wait for more queries once
+                                           the first one has arrived, in milliseconds.
+
+        Returns:
+            None
+        """
+        self._backend = backend
+        self._tokenizer = tokenizer
+        self._swap_lock = threading.Lock()
+        self._max_batch_size = max(1, max_batch_size)
+        self._max_wait = max(0, max_wait_ms) / 1000
+        self._executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="tonemark"
+        )
+        self._queue = None
+        self._worker = None
+        self.batch_sizes = Counter()
+
+    def predict_batch(
+        self,
+        texts: List[str]
+    ) -> List[Tuple[List[str], np.ndarray]]:
+        """
+        Runs a single forward pass over a batch of texts.
+
+        Args:
+            texts (List[str]): The input texts.
+
+        Returns:
+            List[Tuple[List[str], np.ndarray]]: The tokens and predicted label
+                indexes of each text, without the special tokens.
+        """
+        with self._swap_lock:
+            backend, tokenizer = self._backend, self._tokenizer
+        inputs = tokenizer([text.strip().split() for text in texts],
+                           is_split_into_words=True,
+                           truncation=True,
+                           padding=True,
+                           return_tensors=backend.return_tensors
+                           )
+        predictions = np.argmax(backend.logits(inputs), axis=2)
+        input_ids = np.asarray(inputs["input_ids"])
+        attention_mask = np.asarray(inputs["attention_mask"]).astype(bool)
+        results = []
+        for row, mask in enumerate(attention_mask):
+            tokens = tokenizer.convert_ids_to_tokens(
+                input_ids[row][mask].tolist())[1:-1]
+            labels = predictions[row][mask][1:-1]
+            assert len(tokens) == len(labels)
+            results.append((tokens, labels))
+        return results
+
+    def replace_backend(
+        self,
+        backend,
+        tokenizer
+    ) -> None:
+        """
+        Switches to a reloaded model. Batches already running finish with the old one.
+
+        Args:
+            backend: The new backend.
+            tokenizer: The tokenizer associated with the new model.
+        """
+        with self._swap_lock:
+            self._backend = backend
+            self._tokenizer = tokenizer
+
+    async def predict(
+        self,
+        text: str
+    ) -> Tuple[List[str], np.ndarray]:
+        """
+        Queues a text for the next batch and waits for its prediction.
+
+        Args:
+            text (str): The input text.
+
+        Returns:
+            Tuple[List[str], np.ndarray]: The tokens and their predicted label indexes.
+        """
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _collect(self) -> list:
+        """
+        Waits for a first request, then gathers more until the batch is full
+        or the wait window has elapsed.
+        """
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._max_wait
+        while len(batch) < self._max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        """
+        Collects batches and scatters the results back to the waiting callers.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            texts = [text for text, _ in batch]
+            self.batch_sizes[len(texts)] += 1
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, self.predict_batch, texts)
+            except Exception as e:  # pylint: disable=broad-except
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def close(self) -> None:
+        """
+        Stops the batching worker and releases the inference thread.
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+        self._executor.shutdown(wait=False)
+
+    @property
+    def stats(self) -> dict:
+        """
+        Returns the number of batches and predictions and the mean batch size.
+        """
+        batches = sum(self.batch_sizes.values())
+        predictions = sum(size * count for size, count in self.batch_sizes.items())
+        return {
+            "batches": batches,
+            "predictions": predictions,
+            "mean_batch_size": predictions / batches if batches else 0.0,
+            "max_batch_size": max(self.batch_sizes, default=0)
+        }
+
+
+def check_parity(
+    reference: ToneMarkBatcher,
+    candidate: ToneMarkBatcher,
+    texts: List[str]
+) -> float:
+    """
+    Measures how often two tone-mark runners predict the same label.
+
+    Args:
+        reference (ToneMarkBatcher): The runner used as ground truth (usually PyTorch fp32).
+        candidate (ToneMarkBatcher): The runner under test (usually ONNX int8).
+        texts (List[str]): The texts used for the comparison.
+
+    Returns:
+        float: The fraction of tokens with identical predicted labels.
+    """
+    total = 0
+    matched = 0
+    for (_, expected), (_, actual) in zip(reference.predict_batch(texts),
+                                          candidate.predict_batch(texts)):
+        total += len(expected)
+        matched += int(np.sum(np.asarray(expected) == np.asarray(actual)))
+    return matched / total if total else 1.0
+
+
+def export_checked_onnx_model(
+    model,
+    tokenizer,
+    output_path: str,
+    samples: List[str],
+    min_agreement: float = 0.99,
+    quantize: bool = True,
+    intra_op_num_threads: int = 0
+) -> dict:
+    """
+    Exports the tone-mark model to ONNX and compares its predictions with PyTorch.
+    The export is removed when they agree on fewer than min_agreement of the tokens.
+
+    Args:
+        model: The PyTorch token classification model.
+        tokenizer: The tokenizer associated with the model.
+        output_path (str): Where to write the ONNX model.
+        samples (List[str]): The texts used for the comparison.
+        min_agreement (float, optional): The fraction of identical labels required.
+        quantize (bool, optional): Whether to quantize the exported model to int8.
+        intra_op_num_threads (int, optional): The ONNX Runtime threads per operator.
+
+    Returns:
+        dict: The parity report, with "passed" False if the export was removed.
+    """
+    export_onnx_model(
+        model=model,
+        tokenizer=tokenizer,
+        output_path=output_path,
+        quantize=quantize
+    )
+    reference = ToneMarkBatcher(
+        TorchToneMarkBackend(model=model, device_type=model.device), tokenizer)
+    candidate = ToneMarkBatcher(
+        OnnxToneMarkBackend(model_path=output_path,
+                            intra_op_num_threads=intra_op_num_threads),
+        tokenizer)
+    try:
+        agreement = check_parity(reference, candidate, samples)
+    finally:
+        reference.close()
+        candidate.close()
+    passed = agreement >= min_agreement
+    if not passed:
+        os.remove(output_path)
+    return {
+        "output_path": output_path,
+        "quantized": quantize,
+        "samples": len(samples),
+        "agreement": agreement,
+        "min_agreement": min_agreement,
+        "passed": passed,
+        "size_bytes": os.path.getsize(output_path) if passed else None
+    }
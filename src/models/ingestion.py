@@ -0,0 +1,78 @@
+"""
+This module defines data models for tracking file ingestion jobs using Pydantic.
+"""
+
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+
+
+class FileProgress(BaseModel):
+    """
+    Represents the progress of one file in an ingestion job.
+
+    Attributes:
+        public_id (str): The public ID of the file.
+        file_name (str): The name of the file.
+        status (str): One of "queued", "running", "succeeded" or "failed".
+        stage (Optional[str]): The stage being run or the last stage run.
+        timings (Dict[str, float]): The duration of each finished stage in seconds.
+        error (Optional[str]): The error that made the file fail.
+    """
+    public_id: str
+    file_name: str
+    status: str = "queued"
+    stage: Optional[str] = None
+    timings: Dict[str, float] = {}
+    error: Optional[str] = None
+
+
+class IngestionJob(BaseModel):
+    """
+    Represents a background job ingesting a list of files.
+
+    Attributes:
+        job_id (str): A unique identifier for the job.
+        update (bool): Whether the files replace indexed files with the same public IDs.
+        status (str): One of "queued", "running", "succeeded" or "failed".
+        created_at (str): When the job was submitted.
+        started_at (Optional[str]): When a worker started the job.
+        finished_at (Optional[str]): When the job finished.
+        error (Optional[str]): The error that stopped the job, if any.
+        files (List[FileProgress]): The progress of each file.
+    """
+    job_id: str
+    update: bool = False
+    status: str = "queued"
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    error: Optional[str] = None
+    files: List[FileProgress]
+
+
+class RebuildJob(BaseModel):
+    """
+    Represents a background rebuild of the knowledge collection.
+
+    Attributes:
+        job_id (str): A unique identifier for the job.
+        status (str): One of "queued", "running", "switched", "succeeded" or "failed".
+        collection (str): The versioned collection being built.
+        previous_collection (Optional[str]): The collection served before the switch.
+        created_at (str): When the rebuild was requested.
+        started_at (Optional[str]): When the rebuild started.
+        finished_at (Optional[str]): When the rebuild finished.
+        error (Optional[str]): The error that stopped the rebuild, if any.
+        files (List[FileProgress]): The progress of each file.
+        validation (Dict[str, Any]): The checks run before switching.
+    """
+    job_id: str
+    status: str = "queued"
+    collection: str
+    previous_collection: Optional[str] = None
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    error: Optional[str] = None
+    files: List[FileProgress] = []
+    validation: Dict[str, Any] = {}
@@ -2,6 +2,7 @@
 this model provides a data model for representing a processed data entry
 """
 
+from typing import Dict
 from pydantic import BaseModel
 
 
@@ -14,12 +15,15 @@ class ProcessedData(BaseModel):
         language (bool): A flag indicating whether the language is detected
         is_prompt_injection (bool): A flag indicating if the query contains a prompt injection.
         is_outdomain (bool): A flag indicating if the query is outside the expected domain.
+        is_short_chat (bool): A flag indicating if the query is a short chat message.
+        stage_timings (Dict[str, float]): The duration of each preprocessing stage in seconds.
     """
     query: str
     language: bool
     is_prompt_injection: bool
     is_outdomain: bool
     is_short_chat: bool
+    stage_timings: Dict[str, float] = {}
 
 
 class ShortChat(BaseModel):
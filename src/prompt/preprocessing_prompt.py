@@ -416,4 +416,17 @@ RESPONSE_DICT = {
     "duoc": "Ừ, đúng rồi!",
 }
 
+RESPONSE_SHORT_CHAT_DEFAULT = "Mình chưa hiểu rõ ý bạn lắm."
+
 TOKENIZER_WORD_PREFIX = "▁"
+
+TONE_PARITY_SAMPLES = [
+    "diem chuan nganh khoa hoc may tinh nam nay la bao nhieu",
+    "hoc phi he chat luong cao mot nam khoang bao nhieu",
+    "truong co ky tuc xa cho sinh vien nam nhat khong",
+    "xet tuyen bang diem thi danh gia nang luc can nhung gi",
+    "chi tieu tuyen sinh nganh tri tue nhan tao",
+    "thoi gian dang ky xet tuyen ket thuc khi nao",
+    "nganh an toan thong tin hoc nhung mon gi",
+    "truong o dau va di xe buyt so may de toi",
+]
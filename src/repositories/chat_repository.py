@@ -2,12 +2,29 @@
 This repository class for managing chat collec in the question answering system.
 """
 
-from typing import List
+import os
+from datetime import datetime, timezone
+from typing import AsyncIterator, List
+from dotenv import load_dotenv
 
 from src.storage.chat_crud import CRUDChatCollection
+from src.storage.chat_log_writer import ChatLogWriter
 from src.models.chat import ChatDomain
 from src.utils.utility import (create_new_id,
-                               get_datetime)
+                               get_datetime,
+                               convert_value)
+
+load_dotenv()
+
+BATCH_SIZE = convert_value(os.getenv('MONGODB_BATCH_SIZE', '500'))
+CHAT_PROJECTION = {
+    "_id": 0,
+    "Id": 1,
+    "query": 1,
+    "answer": 1,
+    "time": 1,
+    "is_outdomain": 1
+}
 
 
 class ChatRepository:
@@ -15,15 +32,44 @@ class ChatRepository:
     A repository class for managing result documents in the question answering system.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        log_writer: ChatLogWriter = None
+    ):
         """
-        Initializes the collection attribute with a CRUDResultCollection instance 
-        and loads all data into the data attribute.
+        Initializes the collection attribute with a CRUDResultCollection instance.
+
+        Args:
+            log_writer (ChatLogWriter, optional): The background writer new chats are
+                                                  queued to. If None, each chat is
+                                                  inserted before returning.
         """
         self.collection = CRUDChatCollection()
-        self.data = self.load_all_data()
+        self.log_writer = log_writer
+
+    async def iter_chats(
+        self,
+        projection: dict = None,
+        batch_size: int = BATCH_SIZE
+    ) -> AsyncIterator[dict]:
+        """
+        Iterates over the chat documents, fetching them from a cursor in batches.
+
+        Args:
+            projection (dict, optional): The fields to return. Defaults to CHAT_PROJECTION.
+            batch_size (int, optional): The number of documents fetched per round-trip.
+
+        Yields:
+            dict: The next document.
+        """
+        cursor = self.collection.find_docs(
+            projection=CHAT_PROJECTION if projection is None else projection,
+            batch_size=batch_size
+        )
+        async for document in cursor:
+            yield document
 
-    def load_all_data(self):
+    async def load_all_data(self):
         """
         Load all documents from the collection.
 
@@ -31,12 +77,9 @@ class ChatRepository:
             None
 
         Returns:
-            list: A list of documents with '_id' field as a string.
+            list: A list of documents limited to the fields in CHAT_PROJECTION.
         """
-        self.data = list(self.collection.find_all_doc())
-        for doc in self.data:
-            doc["_id"] = str(doc["_id"])
-        return self.data
+        return [document async for document in self.iter_chats()]
 
     async def add_one_record(self, chat: ChatDomain):
         """
@@ -48,7 +91,11 @@ class ChatRepository:
         Returns:
             None
         """
-        self.collection.insert_one_doc(chat.__dict__)
+        document = {**chat.__dict__, "created_at": datetime.now(timezone.utc)}
+        if self.log_writer is not None:
+            await self.log_writer.submit(document)
+            return
+        await self.collection.insert_one_doc(document)
 
     async def add_chat_domains(
         self,
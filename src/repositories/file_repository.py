@@ -3,11 +3,12 @@ This module provides a `FileRepository` class to manage file records in a data s
 """
 
 import os
-from typing import List
+from typing import AsyncIterator, List, Optional, Tuple
 import requests
 from dotenv import load_dotenv
 
 from src.storage.file_crud import CRUDFileCollection
+from src.storage.pagination import iter_documents
 from src.models.file import (File,
                              FileUpload)
 from src.utils.utility import (get_datetime,
@@ -17,6 +18,16 @@ load_dotenv()
 
 TIME_OUT = convert_value(os.getenv('TIME_OUT'))
 DIRECTORY = convert_value(os.getenv('DIRECTORY'))
+BATCH_SIZE = convert_value(os.getenv('MONGODB_BATCH_SIZE', '500'))
+FILE_PROJECTION = {
+    "_id": 0,
+    "public_id": 1,
+    "url": 1,
+    "file_name": 1,
+    "file_type": 1,
+    "file_path": 1,
+    "time": 1
+}
 
 
 class FileRepository:
@@ -35,9 +46,58 @@ class FileRepository:
         self.time_out = time_out
         self.directory = directory
         self.collection = CRUDFileCollection()
-        self.data = self.load_all_data()
 
-    def load_all_data(self):
+    async def iter_files(
+        self,
+        projection: dict = None,
+        batch_size: int = BATCH_SIZE,
+        after: str = None,
+        with_cursor: bool = False
+    ) -> AsyncIterator[dict]:
+        """
+        Iterates over the file documents, fetching them from a cursor in batches.
+
+        Args:
+            projection (dict, optional): The fields to return. Defaults to FILE_PROJECTION.
+            batch_size (int, optional): The number of documents fetched per round-trip.
+            after (str, optional): Only yield the documents inserted after this _id.
+            with_cursor (bool, optional): Whether to add the _id of each document as a
+                string under "cursor", to resume from with after.
+
+        Yields:
+            dict: The next document.
+        """
+        async for document in iter_documents(
+                self.collection.find_docs,
+                projection=FILE_PROJECTION if projection is None else projection,
+                batch_size=batch_size,
+                after=after,
+                with_cursor=with_cursor):
+            yield document
+
+    async def get_page(
+        self,
+        limit: int,
+        after: str = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Retrieves one page of file documents.
+
+        Args:
+            limit (int): The page size.
+            after (str, optional): The cursor returned with the previous page.
+
+        Returns:
+            Tuple[List[dict], Optional[str]]: The documents, and the cursor of the
+                next page or None.
+        """
+        return await self.collection.find_page(
+            projection=FILE_PROJECTION,
+            limit=limit,
+            after=after
+        )
+
+    async def load_all_data(self):
         """
         Load all documents from the collection.
 
@@ -45,14 +105,11 @@ class FileRepository:
             None
 
         Returns:
-            list: A list of documents with '_id' field as a string.
+            list: A list of documents limited to the fields in FILE_PROJECTION.
         """
-        self.data = list(self.collection.find_all_doc())
-        for doc in self.data:
-            doc["_id"] = str(doc["_id"])
-        return self.data
+        return [document async for document in self.iter_files()]
 
-    def add_one_record(
+    async def add_one_record(
         self,
         file: File = None
     ) -> None:
@@ -65,9 +122,9 @@ class FileRepository:
         Returns:
             None
         """
-        self.collection.insert_one_doc(file.__dict__)
+        await self.collection.insert_one_doc(file.__dict__)
 
-    def add_file(
+    async def add_file(
         self,
         public_id: str = None,
         url: str = None,
@@ -95,10 +152,43 @@ class FileRepository:
             file_path=file_path,
             time=timestamp
         )
-        self.add_one_record(
+        await self.add_one_record(
             file=file_instance
         )
 
+    async def update_file(
+        self,
+        public_id: str = None,
+        url: str = None,
+        file_name: str = None,
+        file_type: str = None,
+        file_path: str = None
+    ) -> None:
+        """
+        Update the record of a re-uploaded file, or create it if it does not exist.
+
+        Args:
+            public_id (str, optional): The public ID of the file.
+            url (str, optional): The URL associated with the file.
+            file_name (str, optional): The name of the file.
+            file_type (str, optional): The type or format of the file (e.g., "pdf", "txt").
+            file_path (str, optional): The local path of the file.
+
+        Returns:
+            None
+        """
+        await self.collection.update_one_doc(
+            {"public_id": public_id},
+            {"$set": {
+                "url": url,
+                "file_name": file_name,
+                "file_type": file_type,
+                "file_path": file_path,
+                "time": get_datetime()
+            }},
+            upsert=True
+        )
+
     def file_transfer(
         self,
         data: FileUpload
@@ -134,7 +224,7 @@ class FileRepository:
         file_path = data.url
         return file_path
 
-    def delete_specific_file(
+    async def delete_specific_file(
         self,
         public_id: str = None
     ) -> None:
@@ -153,7 +243,7 @@ class FileRepository:
             the result of the deletion operation.
         """
         try:
-            result = self.collection.delete_one_doc({"public_id": public_id})
+            result = await self.collection.delete_one_doc({"public_id": public_id})
             if result.deleted_count > 0:
                 print(
                     f"Document with public_id = {public_id} deleted successfully.")
@@ -163,7 +253,26 @@ class FileRepository:
             print(f"Error deleting document with public_id = {public_id}: {e}")
             raise
 
-    def get_specific_file(
+    async def find_existing(
+        self,
+        public_ids: List[str]
+    ) -> List[str]:
+        """
+        Finds which of the given public IDs already have a file record.
+
+        Args:
+            public_ids (List[str]): The public IDs to check.
+
+        Returns:
+            List[str]: The public IDs that are registered.
+        """
+        cursor = self.collection.find_docs(
+            obj={"public_id": {"$in": list(public_ids)}},
+            projection={"_id": 0, "public_id": 1}
+        )
+        return [document["public_id"] async for document in cursor]
+
+    async def get_specific_file(
         self,
         public_id: str = None
     ) -> List:
@@ -176,11 +285,9 @@ class FileRepository:
         Returns:
             Optional[dict]: A dictionary representing the document
         """
-        document = self.collection.find_one_doc(
+        return await self.collection.find_one_doc(
             {
                 "public_id": public_id
-            }
+            },
+            projection=FILE_PROJECTION
         )
-        if document:
-            document["_id"] = str(document["_id"])
-        return document
@@ -2,10 +2,27 @@
 This module provides a repository class for managing suggestions
 """
 
+import os
+from typing import AsyncIterator, List, Optional, Tuple
+from dotenv import load_dotenv
+
 from src.storage.suggestion_crud import CRUDSuggestionCollection
+from src.storage.pagination import iter_documents
 from src.models.suggestion import Suggestion
 from src.utils.utility import (create_new_id,
-                               get_datetime)
+                               get_datetime,
+                               convert_value)
+
+load_dotenv()
+
+BATCH_SIZE = convert_value(os.getenv('MONGODB_BATCH_SIZE', '500'))
+SUGGESTION_PROJECTION = {
+    "_id": 0,
+    "Id": 1,
+    "question": 1,
+    "answer": 1,
+    "time": 1
+}
 
 
 class SuggestionRepository:
@@ -20,9 +37,58 @@ class SuggestionRepository:
         Initialize the SuggestionRepository.
         """
         self.collection = CRUDSuggestionCollection()
-        self.data = self.load_all_data()
 
-    def load_all_data(self):
+    async def iter_suggestions(
+        self,
+        projection: dict = None,
+        batch_size: int = BATCH_SIZE,
+        after: str = None,
+        with_cursor: bool = False
+    ) -> AsyncIterator[dict]:
+        """
+        Iterates over the suggestion documents, fetching them from a cursor in batches.
+
+        Args:
+            projection (dict, optional): The fields to return. Defaults to SUGGESTION_PROJECTION.
+            batch_size (int, optional): The number of documents fetched per round-trip.
+            after (str, optional): Only yield the documents inserted after this _id.
+            with_cursor (bool, optional): Whether to add the _id of each document as a
+                string under "cursor", to resume from with after.
+
+        Yields:
+            dict: The next document.
+        """
+        async for document in iter_documents(
+                self.collection.find_docs,
+                projection=SUGGESTION_PROJECTION if projection is None else projection,
+                batch_size=batch_size,
+                after=after,
+                with_cursor=with_cursor):
+            yield document
+
+    async def get_page(
+        self,
+        limit: int,
+        after: str = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Retrieves one page of suggestion documents.
+
+        Args:
+            limit (int): The page size.
+            after (str, optional): The cursor returned with the previous page.
+
+        Returns:
+            Tuple[List[dict], Optional[str]]: The documents, and the cursor of the
+                next page or None.
+        """
+        return await self.collection.find_page(
+            projection=SUGGESTION_PROJECTION,
+            limit=limit,
+            after=after
+        )
+
+    async def load_all_data(self):
         """
         Load all documents from the collection.
 
@@ -30,14 +96,11 @@ class SuggestionRepository:
             None
 
         Returns:
-            list: A list of documents with '_id' field as a string.
+            list: A list of documents limited to the fields in SUGGESTION_PROJECTION.
         """
-        self.data = list(self.collection.find_all_doc())
-        for doc in self.data:
-            doc["_id"] = str(doc["_id"])
-        return self.data
+        return [document async for document in self.iter_suggestions()]
 
-    def add_one_record(
+    async def add_one_record(
         self,
         suggestion: Suggestion = None
     ) -> None:
@@ -50,9 +113,9 @@ class SuggestionRepository:
         Returns:
             None
         """
-        self.collection.insert_one_doc(suggestion.__dict__)
+        await self.collection.insert_one_doc(suggestion.__dict__)
 
-    def add_suggestion(
+    async def add_suggestion(
         self,
         question: str = None,
         answer: str = None
@@ -75,11 +138,11 @@ class SuggestionRepository:
             answer=answer,
             time=timestamp
         )
-        self.add_one_record(
+        await self.add_one_record(
             suggestion=suggestion_instance
         )
 
-    def delete_suggestion(
+    async def delete_suggestion(
         self,
         identifier: str = None
     ) -> None:
@@ -97,7 +160,7 @@ class SuggestionRepository:
         """
         try:
             query = {"$or": [{"Id": identifier}, {"question": identifier}]}
-            result = self.collection.delete_one_doc(query)
+            result = await self.collection.delete_one_doc(query)
             if result.deleted_count > 0:
                 print(
                     f"Suggestion with identifier = {identifier} deleted successfully.")
@@ -108,7 +171,7 @@ class SuggestionRepository:
                 f"Error deleting suggestion with identifier = {identifier}: {e}")
             raise
 
-    def get_suggestion_by_question(
+    async def get_suggestion_by_question(
         self,
         suggestion_question: str = None
     ) -> str:
@@ -121,11 +184,9 @@ class SuggestionRepository:
         Returns:
             dict: A dictionary containing the suggestion document
         """
-        document = self.collection.find_one_doc(
+        return await self.collection.find_one_doc(
             {
                 "question": suggestion_question
-            }
+            },
+            projection=SUGGESTION_PROJECTION
         )
-        if document:
-            document["_id"] = str(document["_id"])
-        return document
@@ -0,0 +1,86 @@
+"""
+Exports the tone-mark model to ONNX Runtime, offline, for TONE_BACKEND=onnx.
+
+The model is kept only when its predictions agree with PyTorch on at least
+TONE_ONNX_MIN_AGREEMENT of the sample tokens, and a JSON parity report is
+written next to it. The service loads the exported model at startup and never
+exports it itself.
+
+Run from the repository root, with the same environment as the service:
+    python -m src.scripts.export_tone_onnx
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+from src.utils.utility import convert_value
+from src.engines.tonemark_engine import (export_checked_onnx_model,
+                                         default_torch_device)
+from src.prompt.preprocessing_prompt import TONE_PARITY_SAMPLES
+
+load_dotenv()
+
+TONE_MODEL = convert_value(os.getenv('TONE_MODEL'))
+TONE_ONNX_PATH = convert_value(
+    os.getenv('TONE_ONNX_PATH', './AIModel/tone_model_int8.onnx'))
+TONE_ONNX_THREADS = convert_value(os.getenv('TONE_ONNX_THREADS', '0'))
+TONE_ONNX_MIN_AGREEMENT = convert_value(
+    os.getenv('TONE_ONNX_MIN_AGREEMENT', '0.99'))
+
+
+def main() -> int:
+    """
+    Exports the model and writes the parity report.
+
+    Returns:
+        int: 0 if the exported model is kept, 1 otherwise.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default=TONE_MODEL,
+                        help="the tone-mark model directory or hub name (TONE_MODEL)")
+    parser.add_argument("--output", default=TONE_ONNX_PATH,
+                        help="where to write the ONNX model (TONE_ONNX_PATH)")
+    parser.add_argument("--report", default=None,
+                        help="the parity report path, defaults to the output path + .parity.json")
+    parser.add_argument("--min-agreement", type=float, default=TONE_ONNX_MIN_AGREEMENT)
+    parser.add_argument("--threads", type=int, default=TONE_ONNX_THREADS)
+    parser.add_argument("--no-quantize", action="store_true",
+                        help="keep the fp32 weights instead of quantizing them to int8")
+    args = parser.parse_args()
+    report_path = args.report or args.output + ".parity.json"
+
+    # pylint: disable=import-outside-toplevel
+    from transformers import (AutoTokenizer,
+                              AutoModelForTokenClassification)
+    tokenizer = AutoTokenizer.from_pretrained(args.model, add_prefix_space=True)
+    model = AutoModelForTokenClassification.from_pretrained(args.model).to(
+        default_torch_device())
+    report = export_checked_onnx_model(
+        model=model,
+        tokenizer=tokenizer,
+        output_path=args.output,
+        samples=TONE_PARITY_SAMPLES,
+        min_agreement=args.min_agreement,
+        quantize=not args.no_quantize,
+        intra_op_num_threads=args.threads
+    )
+    report.update(model=args.model,
+                  exported_at=datetime.now(timezone.utc).isoformat())
+    os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+    with open(report_path, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    if not report["passed"]:
+        print(f"ONNX tone model agreement {report['agreement']:.4f} is below "
+              f"{args.min_agreement}, the export was removed. Report: {report_path}")
+        return 1
+    print(f"ONNX tone model exported to {args.output} with agreement "
+          f"{report['agreement']:.4f}. Report: {report_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+This service reloads model artifacts when they change on disk.
+"""
+
+import asyncio
+from typing import Any, Callable, Hashable
+
+
+class ArtifactWatcher:
+    """
+    Polls the fingerprint of a set of artifacts and reloads them when it changes,
+    so that a replaced classifier or dictionary is served without a restart.
+
+    The artifacts are loaded in a worker thread and swapped in on the event loop,
+    so requests never see a partly reloaded service. A reload that fails keeps the
+    previous artifacts loaded and is retried at the next poll.
+    """
+
+    def __init__(
+        self,
+        fingerprint_func: Callable[[], Hashable],
+        load_func: Callable[[], Any],
+        apply_func: Callable[[Any], Hashable],
+        fingerprint: Hashable = None,
+        interval: float = 60
+    ) -> None:
+        """
+        Initializes the watcher.
+
+        Args:
+            fingerprint_func (Callable[[], Hashable]): Computes the fingerprint of the
+                artifacts on disk.
+            load_func (Callable[[], Any]): Loads the artifacts without using them yet.
+                Runs in a worker thread.
+            apply_func (Callable[[Any], Hashable]): Swaps in what load_func returned and
+                returns the fingerprint of what it loaded. Runs on the event loop.
+            fingerprint (Hashable, optional): The fingerprint of the artifacts loaded now.
+            interval (float, optional): Seconds between two polls.
+        """
+        self._fingerprint_func = fingerprint_func
+        self._load_func = load_func
+        self._apply_func = apply_func
+        self._fingerprint = fingerprint
+        self._interval = interval
+        self._task = None
+        self.reloads = 0
+
+    def start(self) -> None:
+        """
+        Starts polling on the running event loop.
+        """
+        if self._interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def check(self) -> bool:
+        """
+        Reloads the artifacts if their fingerprint has changed.
+
+        Returns:
+            bool: True if they were reloaded.
+        """
+        fingerprint = await asyncio.to_thread(self._fingerprint_func)
+        if fingerprint == self._fingerprint:
+            return False
+        print("Model artifacts changed, reloading them")
+        loaded = await asyncio.to_thread(self._load_func)
+        self._fingerprint = self._apply_func(loaded)
+        self.reloads += 1
+        return True
+
+    async def _run(self) -> None:
+        """
+        Polls the fingerprint until cancelled.
+        """
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.check()
+            except Exception as e:  # pylint: disable=broad-except
+                print(f"Failed to reload the model artifacts: {e}")
+
+    async def close(self) -> None:
+        """
+        Stops polling.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -2,12 +2,19 @@
 This service represents the file management functionality of the application.
 """
 
-from typing import List
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
 
 from src.data_loader.general_loader import GeneralLoader
 from src.repositories.file_repository import FileRepository
 from src.storage.weaviatedb import WeaviateDB
 from src.models.file import FileUpload
+from src.models.ingestion import FileProgress
+from src.engines.answer_cache_engine import SemanticAnswerCache
+
+INGESTION_STAGES = ("transfer", "load", "split", "index", "register")
 
 
 class FileManagement:
@@ -19,50 +26,291 @@ class FileManagement:
         self,
         file_repository: FileRepository = None,
         general_loader: GeneralLoader = None,
-        vector_database: WeaviateDB = None
+        vector_database: WeaviateDB = None,
+        answer_cache: SemanticAnswerCache = None,
+        stage_concurrency: Dict[str, int] = None,
+        max_files_in_flight: int = None
     ):
+        """
+        Initializes the file management service.
+
+        Args:
+            file_repository (FileRepository): The repository of uploaded files.
+            general_loader (GeneralLoader): The loader that parses files into documents.
+            vector_database (WeaviateDB): The vector database holding the knowledge.
+            answer_cache (SemanticAnswerCache, optional): Cleared when the knowledge changes.
+            stage_concurrency (Dict[str, int], optional): The maximum number of files in
+                each ingestion stage at once. Stages that are missing are limited to one.
+            max_files_in_flight (int, optional): The maximum number of files between the
+                start of transfer and the end of register. Defaults to the split and
+                index concurrency, so files are only downloaded and parsed as fast as
+                the downstream stages take them.
+        """
         self._file_repository = file_repository
         self._general_loader = general_loader
         self._vector_database = vector_database
+        self._answer_cache = answer_cache
+        stage_concurrency = stage_concurrency or {}
+        self._stage_limits = {
+            stage: asyncio.Semaphore(max(1, stage_concurrency.get(stage, 1)))
+            for stage in INGESTION_STAGES
+        }
+        if not max_files_in_flight:
+            max_files_in_flight = (max(1, stage_concurrency.get("split", 1))
+                                   + max(1, stage_concurrency.get("index", 1)))
+        self._files_in_flight = asyncio.Semaphore(max_files_in_flight)
+        self._file_locks = {}
+        self._writes = asyncio.Condition()
+        self._writers = 0
+        self._writes_paused = False
+
+    def invalidate_answers(self) -> None:
+        """
+        Drops the cached chat answers after the knowledge base has changed.
+        """
+        if self._answer_cache is not None:
+            self._answer_cache.clear()
+
+    @asynccontextmanager
+    async def writing(self) -> AsyncIterator[None]:
+        """
+        Marks a change of the knowledge base, waiting while writes are paused.
+        """
+        async with self._writes:
+            await self._writes.wait_for(lambda: not self._writes_paused)
+            self._writers += 1
+        try:
+            yield
+        finally:
+            async with self._writes:
+                self._writers -= 1
+                self._writes.notify_all()
+
+    @asynccontextmanager
+    async def file_lock(
+        self,
+        public_id: str
+    ) -> AsyncIterator[None]:
+        """
+        Serializes the uploads, updates and deletes of one file, so that two of them
+        never diff or register the same public ID at once.
+
+        Args:
+            public_id (str): The public ID of the file.
+        """
+        entry = self._file_locks.setdefault(public_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._file_locks[public_id]
 
-    def add_file(
+    @asynccontextmanager
+    async def pause_writes(self) -> AsyncIterator[None]:
+        """
+        Holds new uploads, updates and deletes back and waits for the running ones
+        to finish, so that the knowledge base does not change until the block exits.
+        """
+        async with self._writes:
+            await self._writes.wait_for(lambda: not self._writes_paused)
+            self._writes_paused = True
+            await self._writes.wait_for(lambda: self._writers == 0)
+        try:
+            yield
+        finally:
+            async with self._writes:
+                self._writes_paused = False
+                self._writes.notify_all()
+
+    async def run_stage(
         self,
-        data_list: List[FileUpload]
+        progress: Optional[FileProgress],
+        stage: str,
+        func: Callable,
+        **kwargs
+    ) -> Any:
+        """
+        Runs one ingestion stage off the event loop and records its duration.
+        The stage waits while its concurrency limit is reached.
+
+        Args:
+            progress (Optional[FileProgress]): The progress of the file, if it is tracked.
+            stage (str): The name of the stage.
+            func (Callable): The stage function. Coroutine functions are awaited,
+                             other functions run in a worker thread.
+            **kwargs: The arguments of func.
+
+        Returns:
+            Any: The result of func.
+        """
+        if progress is not None:
+            progress.stage = stage
+        async with self._stage_limits[stage]:
+            start = time.perf_counter()
+            if asyncio.iscoroutinefunction(func):
+                result = await func(**kwargs)
+            else:
+                result = await asyncio.to_thread(func, **kwargs)
+        if progress is not None:
+            progress.timings[stage] = time.perf_counter() - start
+        return result
+
+    async def ingest_file(
+        self,
+        data: FileUpload,
+        progress: Optional[FileProgress] = None,
+        update: bool = False,
+        register: bool = True
     ) -> None:
         """
-        Adds files to the system by transferring them, loading their data,
-        and storing them in a vector database.
+        Transfers, loads, splits, indexes and registers a single file.
 
         Args:
-            data_list (List[FileUpload]): A list of FileUpload objects containing file metadata.
+            data (FileUpload): The metadata of the file.
+            progress (Optional[FileProgress], optional): Updated as the stages run.
+            update (bool, optional): Whether the file replaces an indexed file with the
+                same public ID. Only its new or changed nodes are then indexed.
+            register (bool, optional): Whether to add or update the file record, which
+                a rebuild of the vector database does not need.
+
+        Raises:
+            ValueError: If a new file has the public ID of a registered file.
 
         Returns:
             None
         """
-        for data in data_list:
-            file_path = self._file_repository.file_transfer(
-                data=data
+        registered = update
+        if register:
+            registered = bool(await self._file_repository.find_existing([data.public_id]))
+        if register and not update and registered:
+            # Checked before indexing, the unique index would only reject the
+            # record once the nodes are already served
+            raise ValueError(f"A file with public_id {data.public_id} already exists")
+        file_path = await self.run_stage(
+            progress, "transfer", self._file_repository.file_transfer,
+            data=data
+        )
+        documents = await self.run_stage(
+            progress, "load", self._general_loader.load_data,
+            sources=[file_path]
+        )
+        try:
+            nodes = await self.run_stage(
+                progress, "split", self._vector_database.build_knowledge_nodes,
+                url=data.url,
+                file_type=data.file_type,
+                public_id=data.public_id,
+                file_name=data.file_name,
+                documents=documents
             )
-            documents = self._general_loader.load_data(sources=[file_path])
-            try:
-                self._vector_database.add_knowledge(
-                    url=data.url,
-                    file_type=data.file_type,
+            if update:
+                await self.run_stage(
+                    progress, "index", self._vector_database.sync_knowledge,
                     public_id=data.public_id,
-                    file_name=data.file_name,
-                    documents=documents,
+                    nodes=nodes,
+                    indexed=registered
                 )
-                self._file_repository.add_file(
+            else:
+                await self.run_stage(
+                    progress, "index", self._vector_database.insert_knowledge,
+                    nodes=nodes
+                )
+            if register:
+                await self.run_stage(
+                    progress, "register",
+                    (self._file_repository.update_file if update
+                     else self._file_repository.add_file),
                     public_id=data.public_id,
                     url=data.url,
                     file_name=data.file_name,
                     file_type=data.file_type,
-                    file_path=file_path,
+                    file_path=file_path
                 )
-            except ValueError as e:
-                print(f"Failed to process file {data.file_name}: {str(e)}")
+        finally:
+            self.invalidate_answers()
+
+    async def add_file(
+        self,
+        data_list: List[FileUpload],
+        progresses: List[FileProgress] = None,
+        update: bool = False,
+        register: bool = True
+    ) -> None:
+        """
+        Adds files to the system by transferring them, loading their data,
+        and adding the data to the vector database and file repository.
+
+        The files go through the stages concurrently, so one file can be split
+        while the next one is still downloading. Each stage admits at most its
+        configured number of files at once, and at most max_files_in_flight files
+        are in the pipeline, so a large upload is not held in memory all at once.
+
+        Args:
+            data_list (List[FileUpload]): A list of FileUpload objects containing file metadata.
+            progresses (List[FileProgress], optional): The progress of each file,
+                                                       in the order of data_list.
+            update (bool, optional): Whether the files replace indexed files with the
+                                     same public IDs, see ingest_file.
+            register (bool, optional): Whether to add or update the file records.
+
+        Raises:
+            Exception: The first error other than a ValueError, once every file has finished.
+
+        Returns:
+            None
+        """
+        progresses = progresses or [None] * len(data_list)
+        results = await asyncio.gather(
+            *[self._add_one_file(data=data, progress=progress,
+                                 update=update, register=register)
+              for data, progress in zip(data_list, progresses)],
+            return_exceptions=True
+        )
+        for error in results:
+            if error is not None:
+                raise error
 
-    def delete_file(
+    async def _add_one_file(
+        self,
+        data: FileUpload,
+        progress: Optional[FileProgress] = None,
+        update: bool = False,
+        register: bool = True
+    ) -> None:
+        """
+        Ingests one file of add_file and records its outcome.
+
+        Args:
+            data (FileUpload): The metadata of the file.
+            progress (Optional[FileProgress], optional): Updated as the stages run.
+            update (bool, optional): Whether the file replaces an indexed file.
+            register (bool, optional): Whether to add or update the file record.
+
+        Returns:
+            None
+        """
+        try:
+            async with (self.file_lock(data.public_id),
+                        self._files_in_flight,
+                        self.writing()):
+                if progress is not None:
+                    progress.status = "running"
+                await self.ingest_file(data=data, progress=progress,
+                                       update=update, register=register)
+            if progress is not None:
+                progress.status = "succeeded"
+        except Exception as e:
+            if progress is not None:
+                progress.status = "failed"
+                progress.error = str(e)
+            if not isinstance(e, ValueError):
+                raise
+            print(f"Failed to process file {data.file_name}: {str(e)}")
+
+    async def delete_file(
         self,
         public_id: str = None
     ) -> None:
@@ -75,9 +323,14 @@ class FileManagement:
         Returns:
             None
         """
-        self._file_repository.delete_specific_file(
-            public_id=public_id
-        )
-        self._vector_database.delete_knowlegde(
-            public_id=public_id
-        )
+        async with self.file_lock(public_id), self.writing():
+            await self._file_repository.delete_specific_file(
+                public_id=public_id
+            )
+            try:
+                await asyncio.to_thread(
+                    self._vector_database.delete_knowlegde,
+                    public_id=public_id
+                )
+            finally:
+                self.invalidate_answers()
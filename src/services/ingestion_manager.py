@@ -0,0 +1,144 @@
+"""
+This service runs file ingestion jobs in the background.
+"""
+
+import asyncio
+from collections import OrderedDict
+from typing import List, Optional
+
+from src.models.file import FileUpload
+from src.models.ingestion import (FileProgress,
+                                  IngestionJob)
+from src.services.file_management import FileManagement
+from src.utils.utility import (create_new_id,
+                               get_datetime)
+
+
+class IngestionJobManager:
+    """
+    Queues file uploads as jobs and processes them with a pool of worker tasks,
+    so ingestion never runs inside an HTTP request.
+
+    Jobs are kept in memory; only the most recent ``max_jobs`` are retained.
+    """
+
+    def __init__(
+        self,
+        file_management: FileManagement = None,
+        workers: int = 2,
+        max_jobs: int = 1000
+    ) -> None:
+        """
+        Initializes the job manager.
+
+        Args:
+            file_management (FileManagement): The service that ingests the files.
+            workers (int, optional): The number of jobs processed concurrently.
+            max_jobs (int, optional): The number of finished jobs kept for status queries.
+        """
+        self._file_management = file_management
+        self._workers = max(1, workers)
+        self._max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._queue = None
+        self._tasks = []
+
+    def start(self) -> None:
+        """
+        Starts the worker tasks on the running event loop.
+        """
+        if self._tasks and not all(task.done() for task in self._tasks):
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._run())
+                       for _ in range(self._workers)]
+
+    def submit(
+        self,
+        data_list: List[FileUpload],
+        update: bool = False
+    ) -> IngestionJob:
+        """
+        Creates a job for a list of files and queues it.
+
+        Args:
+            data_list (List[FileUpload]): The files to ingest.
+            update (bool, optional): Whether the files replace indexed files
+                                     with the same public IDs.
+
+        Returns:
+            IngestionJob: The queued job.
+        """
+        self.start()
+        job = IngestionJob(
+            job_id=create_new_id(prefix="ingestion"),
+            update=update,
+            created_at=get_datetime(),
+            files=[FileProgress(public_id=data.public_id,
+                                file_name=data.file_name)
+                   for data in data_list]
+        )
+        self._jobs[job.job_id] = job
+        self._evict()
+        self._queue.put_nowait((job, data_list))
+        return job
+
+    def get(
+        self,
+        job_id: str
+    ) -> Optional[IngestionJob]:
+        """
+        Retrieves a job by its ID.
+
+        Args:
+            job_id (str): The ID returned by submit.
+
+        Returns:
+            Optional[IngestionJob]: The job, or None if it is unknown or was evicted.
+        """
+        return self._jobs.get(job_id)
+
+    def _evict(self) -> None:
+        """
+        Forgets the oldest finished jobs beyond max_jobs.
+        """
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self._max_jobs:
+                break
+            if self._jobs[job_id].status in ("succeeded", "failed"):
+                del self._jobs[job_id]
+
+    async def _run(self) -> None:
+        """
+        Processes queued jobs until cancelled.
+        """
+        while True:
+            job, data_list = await self._queue.get()
+            job.status = "running"
+            job.started_at = get_datetime()
+            try:
+                await self._file_management.add_file(
+                    data_list=data_list,
+                    progresses=job.files,
+                    update=job.update
+                )
+            except Exception as e:  # pylint: disable=broad-except
+                job.error = str(e)
+                print(f"Ingestion job {job.job_id} failed: {e}")
+            failed = job.error or any(progress.status != "succeeded"
+                                      for progress in job.files)
+            job.status = "failed" if failed else "succeeded"
+            job.finished_at = get_datetime()
+
+    async def close(self) -> None:
+        """
+        Stops the workers. Jobs that have not finished are marked as failed.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for job in self._jobs.values():
+            if job.status in ("queued", "running"):
+                job.status = "failed"
+                job.error = "Interrupted by shutdown"
+        self._tasks = []
@@ -0,0 +1,315 @@
+"""
+This service rebuilds the knowledge collection next to the one being served
+and switches to it once it is complete.
+"""
+
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from src.data_loader.general_loader import GeneralLoader
+from src.engines.answer_cache_engine import SemanticAnswerCache
+from src.engines.retriever_engine import HybridRetriever
+from src.models.file import FileUpload
+from src.models.ingestion import (FileProgress,
+                                  RebuildJob)
+from src.repositories.file_repository import FileRepository
+from src.services.file_management import FileManagement
+from src.storage.weaviatedb import WeaviateDB
+from src.utils.utility import (create_new_id,
+                               get_datetime)
+
+
+class CollectionRebuilder:
+    """
+    Rebuilds the knowledge base with blue/green collections: every registered file
+    is ingested again into a new versioned collection while chat keeps retrieving
+    from the current one. When the new collection is complete and valid, the alias
+    is switched to it, the retriever is rebound and the old collection is dropped
+    after a grace period.
+
+    Files added, updated or deleted while the rebuild runs are caught up until a
+    pass finds no more changes. The last pass, the validation and the switch run
+    with the writes of the served file management paused, so that no change can
+    reach only the old collection. Only one rebuild runs at a time.
+    """
+
+    def __init__(
+        self,
+        vector_database: WeaviateDB = None,
+        file_repository: FileRepository = None,
+        general_loader: GeneralLoader = None,
+        file_management: FileManagement = None,
+        retriever: HybridRetriever = None,
+        answer_cache: SemanticAnswerCache = None,
+        stage_concurrency: Dict[str, int] = None,
+        gc_delay: float = 60,
+        max_jobs: int = 20,
+        max_catch_up_passes: int = 5
+    ) -> None:
+        """
+        Initializes the rebuilder.
+
+        Args:
+            vector_database (WeaviateDB): The vector database serving the knowledge.
+            file_repository (FileRepository): The repository listing the files to ingest.
+            general_loader (GeneralLoader): The loader that parses files into documents.
+            file_management (FileManagement): The file management writing to the served
+                collection, whose writes are paused around the switch.
+            retriever (HybridRetriever): The retriever to rebind after the switch.
+            answer_cache (SemanticAnswerCache, optional): Cleared after the switch.
+            stage_concurrency (Dict[str, int], optional): The concurrency of each
+                ingestion stage during the rebuild.
+            gc_delay (float, optional): Seconds to keep the old collection after the
+                switch, so that requests still using it can finish.
+            max_jobs (int, optional): The number of finished rebuilds kept for status queries.
+            max_catch_up_passes (int, optional): The number of catch-up passes run before
+                writes are paused for the last one.
+        """
+        self._vector_database = vector_database
+        self._file_repository = file_repository
+        self._general_loader = general_loader
+        self._file_management = file_management
+        self._retriever = retriever
+        self._answer_cache = answer_cache
+        self._stage_concurrency = stage_concurrency
+        self._gc_delay = gc_delay
+        self._max_jobs = max_jobs
+        self._max_catch_up_passes = max_catch_up_passes
+        self._jobs = OrderedDict()
+        self._task = None
+
+    def start(self) -> RebuildJob:
+        """
+        Starts a rebuild in the background.
+
+        Raises:
+            RuntimeError: If a rebuild is already running.
+
+        Returns:
+            RebuildJob: The started job.
+        """
+        if self._task is not None and not self._task.done():
+            raise RuntimeError("A rebuild is already running")
+        job = RebuildJob(
+            job_id=create_new_id(prefix="rebuild"),
+            collection=f"{self._vector_database.alias}_"
+                       f"{time.strftime('%Y%m%d%H%M%S')}",
+            created_at=get_datetime()
+        )
+        self._jobs[job.job_id] = job
+        while len(self._jobs) > self._max_jobs:
+            self._jobs.popitem(last=False)
+        self._task = asyncio.create_task(self._run(job))
+        return job
+
+    def get(
+        self,
+        job_id: str
+    ) -> Optional[RebuildJob]:
+        """
+        Retrieves a rebuild by its ID.
+
+        Args:
+            job_id (str): The ID returned by start.
+
+        Returns:
+            Optional[RebuildJob]: The job, or None if it is unknown.
+        """
+        return self._jobs.get(job_id)
+
+    async def _ingest(
+        self,
+        file_management: FileManagement,
+        records: List[dict],
+        job: RebuildJob,
+        update: bool = False
+    ) -> None:
+        """
+        Ingests file records into the new collection without registering them again.
+
+        Args:
+            file_management (FileManagement): The file management bound to the new collection.
+            records (List[dict]): The file records to ingest.
+            job (RebuildJob): The job whose file progress is updated.
+            update (bool, optional): Whether the files may already be in the new collection.
+        """
+        progresses = [FileProgress(public_id=record["public_id"],
+                                   file_name=record["file_name"])
+                      for record in records]
+        job.files.extend(progresses)
+        try:
+            await file_management.add_file(
+                data_list=[FileUpload(public_id=record["public_id"],
+                                      url=record["url"],
+                                      file_type=record["file_type"],
+                                      file_name=record["file_name"])
+                           for record in records],
+                progresses=progresses,
+                update=update,
+                register=False
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            print(f"Rebuild {job.job_id}: {e}")
+
+    async def _catch_up(
+        self,
+        file_management: FileManagement,
+        target: WeaviateDB,
+        ingested: set,
+        since: str,
+        job: RebuildJob
+    ) -> bool:
+        """
+        Ingests the files added or updated since a time into the new collection and
+        removes the files deleted from the repository.
+
+        Args:
+            file_management (FileManagement): The file management bound to the new collection.
+            target (WeaviateDB): The new collection.
+            ingested (set): The public IDs in the new collection. Updated in place.
+            since (str): The time of the previous pass, as returned by get_datetime.
+            job (RebuildJob): The job whose file progress is updated.
+
+        Returns:
+            bool: Whether anything changed.
+        """
+        current = [record async for record in self._file_repository.iter_files()]
+        added = [record for record in current if record["public_id"] not in ingested]
+        updated = [record for record in current if record["public_id"] in ingested
+                   and record.get("time", "") >= since]
+        await self._ingest(file_management, added, job)
+        await self._ingest(file_management, updated, job, update=True)
+        current_ids = {record["public_id"] for record in current}
+        deleted = [public_id for public_id in ingested if public_id not in current_ids]
+        for public_id in deleted:
+            await asyncio.to_thread(target.delete_knowlegde, public_id=public_id)
+        ingested.clear()
+        ingested.update(current_ids)
+        return bool(added or updated or deleted)
+
+    async def _run(
+        self,
+        job: RebuildJob
+    ) -> None:
+        """
+        Builds, validates and switches to the new collection, then drops the old one.
+
+        Args:
+            job (RebuildJob): The job to run.
+        """
+        job.status = "running"
+        job.started_at = get_datetime()
+        target = None
+        switched = False
+        try:
+            target = await asyncio.to_thread(
+                self._vector_database.for_collection, job.collection)
+            file_management = FileManagement(
+                file_repository=self._file_repository,
+                general_loader=self._general_loader,
+                vector_database=target,
+                stage_concurrency=self._stage_concurrency
+            )
+            records = [record async for record in self._file_repository.iter_files()]
+            await self._ingest(file_management, records, job)
+            ingested = {record["public_id"] for record in records}
+
+            # Catch up with the uploads, updates and deletes made during the rebuild
+            since = job.started_at
+            for _ in range(self._max_catch_up_passes):
+                checked_at = get_datetime()
+                changed = await self._catch_up(
+                    file_management, target, ingested, since, job)
+                since = checked_at
+                if not changed:
+                    break
+
+            async with self._file_management.pause_writes():
+                await self._catch_up(file_management, target, ingested, since, job)
+                job.validation = await asyncio.to_thread(
+                    self._validate, target, job, set(ingested))
+                if not job.validation["valid"]:
+                    raise ValueError(f"Validation failed: {job.validation}")
+
+                job.previous_collection = self._vector_database.switch_to(target)
+                self._retriever.set_index(self._vector_database.index)
+                if self._answer_cache is not None:
+                    self._answer_cache.clear()
+                switched = True
+            job.status = "switched"
+            print(f"Rebuild {job.job_id}: switched from "
+                  f"{job.previous_collection} to {job.collection}")
+
+            try:
+                await asyncio.sleep(self._gc_delay)
+            finally:
+                # Drop the old collection even when the grace period is cut short
+                # by a shutdown, since nothing serves it anymore
+                previous = await asyncio.to_thread(
+                    self._vector_database.for_collection, job.previous_collection)
+                await asyncio.to_thread(previous.drop)
+            job.status = "succeeded"
+        except (Exception, asyncio.CancelledError) as e:  # pylint: disable=broad-except
+            cancelled = isinstance(e, asyncio.CancelledError)
+            job.error = "Interrupted by shutdown" if cancelled else str(e)
+            if switched:
+                # The new collection is served, only the grace period was cut short
+                # (the old collection was dropped on the way out) or the drop failed
+                if cancelled:
+                    job.status = "succeeded"
+                    job.error = None
+                else:
+                    print(f"Rebuild {job.job_id}: failed to drop "
+                          f"{job.previous_collection}: {job.error}")
+            else:
+                job.status = "failed"
+                print(f"Rebuild {job.job_id} failed: {job.error}")
+                if target is not None:
+                    await asyncio.to_thread(target.drop)
+            if cancelled:
+                raise
+        finally:
+            job.finished_at = get_datetime()
+
+    async def close(self) -> None:
+        """
+        Stops a running rebuild. A collection that was not switched to yet is dropped,
+        and so is an old collection whose grace period had not elapsed.
+        """
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    @staticmethod
+    def _validate(
+        target: WeaviateDB,
+        job: RebuildJob,
+        public_ids: set
+    ) -> dict:
+        """
+        Checks that every registered file was ingested and that the collection
+        holds every recorded node.
+
+        Args:
+            target (WeaviateDB): The new collection.
+            job (RebuildJob): The job whose file progress is checked.
+            public_ids (set): The public IDs of the files registered now.
+
+        Returns:
+            dict: The counts that were compared, and whether the collection is valid.
+        """
+        latest = {progress.public_id: progress for progress in job.files
+                  if progress.public_id in public_ids}
+        failed = [public_id for public_id, progress in latest.items()
+                  if progress.status != "succeeded"]
+        recorded_nodes = sum(target.count_recorded_nodes().values())
+        objects = target.count_objects()
+        return {
+            "files": len(latest),
+            "failed_files": failed,
+            "recorded_nodes": recorded_nodes,
+            "objects": objects,
+            "valid": not failed and objects >= recorded_nodes
+        }
@@ -2,17 +2,36 @@
 this service provides retrieve and chat module for chatbot
 """
 
+import os
 import json
-from typing import List
+from typing import AsyncIterator, List, Optional, Union
+from dotenv import load_dotenv
 from llama_index.core.schema import TextNode
 
 from src.engines.chat_engine import ChatEngine
 from src.engines.retriever_engine import HybridRetriever
 from src.engines.semantic_engine import SemanticSearch
 from src.engines.preprocess_engine import PreprocessQuestion
+from src.engines.answer_cache_engine import SemanticAnswerCache
 from src.models.chat import Chat
+from src.models.preprocess import ProcessedData
 from src.prompt.postprocessing_prompt import FAIL_CASES, RESPONSE_FAIL_CASE
-from src.utils.utility import format_document
+from src.services.logger import DSCLogger
+from src.utils.utility import (convert_value,
+                               format_document)
+
+load_dotenv()
+
+LOG_LEVEL = convert_value(os.environ.get("LOG_LEVEL", "info"))
+WRITE_LOG_TO_FILE = convert_value(os.environ.get("WRITE_LOG_TO_FILE", "false"))
+FILE_NAME = convert_value(os.environ.get("FILE_NAME", "retrieve_chat"))
+
+log = DSCLogger(
+    file_name=FILE_NAME,
+    file_log="retrieve_chat",
+    write_to_file=WRITE_LOG_TO_FILE,
+    mode=LOG_LEVEL
+)
 
 
 class RetrieveChat:
@@ -25,12 +44,14 @@ class RetrieveChat:
         retriever: HybridRetriever = None,
         chat: ChatEngine = None,
         preprocess: PreprocessQuestion = None,
-        semantic: SemanticSearch = None
+        semantic: SemanticSearch = None,
+        answer_cache: SemanticAnswerCache = None
     ):
         self._retriever = retriever
         self._chat = chat
         self._preprocess = preprocess
         self._semantic = semantic
+        self._answer_cache = answer_cache
 
     async def retrieve_chat(
         self,
@@ -46,6 +67,29 @@ class RetrieveChat:
             response (str): The chat response generated for the query.
             is_outdomain (bool): True if the query is outside the domain scope, otherwise False.
         """
+        if self._answer_cache is None:
+            return await self._generate_chat(query)
+        cached, vector, generation = await self._answer_cache.lookup(query)
+        if cached is not None:
+            return cached
+        result = await self._generate_chat(query)
+        if result.retrieved_nodes:
+            self._answer_cache.store(query, vector, result, generation)
+        return result
+
+    async def _generate_chat(
+        self,
+        query: str
+    ) -> Chat:
+        """
+        Retrieves the relevant nodes and generates the answer with the language model.
+
+        Parameters:
+            query(str): The corrected user query.
+
+        Returns:
+            Chat: The generated answer and the retrieved nodes.
+        """
         combined_retrieved_nodes, retrieved_nodes = await self._retriever.retrieve_nodes(query)
         response = await self._chat.generate_response(
             user_query=query,
@@ -66,24 +110,75 @@ class RetrieveChat:
             retrieved_nodes=list_nodes
         )
 
-    async def preprocess_query(
+    async def stream_retrieve_chat(
         self,
         query: str
-    ) -> Chat:
+    ) -> AsyncIterator[Union[str, Chat]]:
         """
-        Preprocesses the user's query and generates an appropriate response.
+        Streams the answer to an in-domain query as it is generated.
+
+        Text that may still turn out to be one of the FAIL_CASES is held back,
+        so a fail case is replaced by RESPONSE_FAIL_CASE before it reaches the user.
+
+        Parameters:
+            query(str): The corrected user query.
+
+        Yields:
+            Union[str, Chat]: The pieces of the answer, then the complete Chat.
+        """
+        cached, vector, generation = None, None, 0
+        if self._answer_cache is not None:
+            cached, vector, generation = await self._answer_cache.lookup(query)
+        if cached is not None:
+            yield cached.response
+            yield cached
+            return
+        combined_retrieved_nodes, retrieved_nodes = await self._retriever.retrieve_nodes(query)
+        fail_cases = [case for case in FAIL_CASES if isinstance(case, str)]
+        response = ""
+        flushed = 0
+        async for delta in self._chat.stream_response(
+            user_query=query,
+            relevant_information=combined_retrieved_nodes
+        ):
+            response += delta
+            if flushed or not any(case.startswith(response) for case in fail_cases):
+                yield response[flushed:]
+                flushed = len(response)
+        if response in FAIL_CASES:
+            yield RESPONSE_FAIL_CASE
+            yield Chat(
+                response=RESPONSE_FAIL_CASE,
+                is_outdomain=False,
+                retrieved_nodes=[]
+            )
+            return
+        if flushed < len(response):
+            yield response[flushed:]
+        result = Chat(
+            response=response,
+            is_outdomain=False,
+            retrieved_nodes=[retrieved_node.text for retrieved_node in retrieved_nodes]
+        )
+        if self._answer_cache is not None and result.retrieved_nodes:
+            self._answer_cache.store(query, vector, result, generation)
+        yield result
+
+    async def answer_without_retrieval(
+        self,
+        processed_query: ProcessedData
+    ) -> Optional[Chat]:
+        """
+        Answers the queries that do not need the knowledge base: short chats,
+        unsupported languages, prompt injections and out-of-domain questions.
 
         Args:
-            query (str): The input query from the user.
+            processed_query (ProcessedData): The preprocessed query.
 
         Returns:
-            Chat: A Chat object containing the response, a flag indicating if the response
-                is out of domain, and a list of retrieved nodes.
+            Optional[Chat]: The answer, or None if the query must be answered
+                from the knowledge base.
         """
-        processed_query = await self._preprocess.preprocess_text(
-            text_input=query
-        )
-        print(processed_query)
         if processed_query.is_short_chat:
             return Chat(
                 response=processed_query.query,
@@ -120,6 +215,57 @@ class RetrieveChat:
                 is_outdomain=True,
                 retrieved_nodes=[]
             )
+        return None
+
+    async def preprocess_query(
+        self,
+        query: str
+    ) -> Chat:
+        """
+        Preprocesses the user's query and generates an appropriate response.
+
+        Args:
+            query (str): The input query from the user.
+
+        Returns:
+            Chat: A Chat object containing the response, a flag indicating if the response
+                is out of domain, and a list of retrieved nodes.
+        """
+        processed_query = await self._preprocess.preprocess_text(
+            text_input=query
+        )
+        log.debug(f"Processed query: {processed_query}")
+        result = await self.answer_without_retrieval(processed_query)
+        if result is not None:
+            return result
         return await self.retrieve_chat(
             query=processed_query.query
         )
+
+    async def stream_query(
+        self,
+        query: str
+    ) -> AsyncIterator[Union[str, Chat]]:
+        """
+        Preprocesses the user's query and streams the response. Answers that do not
+        come from the language model are sent as a single piece.
+
+        Args:
+            query (str): The input query from the user.
+
+        Yields:
+            Union[str, Chat]: The pieces of the response, then the complete Chat.
+        """
+        processed_query = await self._preprocess.preprocess_text(
+            text_input=query
+        )
+        log.debug(f"Processed query: {processed_query}")
+        result = await self.answer_without_retrieval(processed_query)
+        if result is None:
+            async for item in self.stream_retrieve_chat(
+                query=processed_query.query
+            ):
+                yield item
+            return
+        yield result.response
+        yield result
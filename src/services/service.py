@@ -3,32 +3,49 @@ This module provides services for handling LLM and embedding models using OpenAI
 """
 
 import os
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 import joblib
 import requests
 from dotenv import load_dotenv
 import google.generativeai as genai
 import fasttext
-import torch
 from huggingface_hub import hf_hub_download
 from llama_index.llms.openai import OpenAI
 from llama_index.embeddings.openai import OpenAIEmbedding
 from llama_index.core import Settings
-from transformers import (AutoTokenizer,
-                          AutoModelForTokenClassification)
+from transformers import AutoTokenizer
 
 from src.storage.weaviatedb import WeaviateDB
 from src.engines.retriever_engine import HybridRetriever
 from src.engines.chat_engine import ChatEngine
 from src.services.retrieve_chat import RetrieveChat
-from src.utils.utility import convert_value
+from src.utils.utility import (convert_value,
+                               compute_fingerprint)
+from src.utils.cache import LRUCache
 from src.repositories.chat_repository import ChatRepository
+from src.storage.chat_log_writer import ChatLogWriter
 from src.repositories.file_repository import FileRepository
 from src.data_loader.general_loader import GeneralLoader
 from src.services.file_management import FileManagement
+from src.services.ingestion_manager import IngestionJobManager
+from src.services.rebuild_manager import CollectionRebuilder
+from src.services.artifact_watcher import ArtifactWatcher
 from src.repositories.suggestion_repository import SuggestionRepository
+from src.prompt import preprocessing_prompt
 from src.prompt.preprocessing_prompt import SAFETY_SETTINGS
 from src.engines.preprocess_engine import PreprocessQuestion
+from src.engines.normalizer_engine import TextNormalizer
+from src.engines.tonemark_engine import (ToneMarkBatcher,
+                                         TorchToneMarkBackend,
+                                         OnnxToneMarkBackend,
+                                         default_torch_device)
+from src.engines.short_chat_engine import ShortChatMatcher
+from src.engines.injection_engine import PromptInjectionScanner
 from src.engines.semantic_engine import SemanticSearch
+from src.engines.answer_cache_engine import SemanticAnswerCache
+from src.engines.embedding_engine import CachedEmbedding
+from src.storage.result_cache import MongoResultCache
 
 load_dotenv()
 
@@ -49,6 +66,56 @@ PROMPT_INJECTION_VECTORIZER = convert_value(
     os.getenv('PROMPT_INJECTION_VECTORIZER'))
 TONE_MODEL = convert_value(os.getenv('TONE_MODEL'))
 URL = convert_value(os.getenv('LABEL_LIST'))
+TONE_MAX_BATCH_SIZE = convert_value(os.getenv('TONE_MAX_BATCH_SIZE', '16'))
+TONE_MAX_WAIT_MS = convert_value(os.getenv('TONE_MAX_WAIT_MS', '5'))
+PREPROCESS_WORKERS = convert_value(os.getenv('PREPROCESS_WORKERS', '4'))
+TONE_BACKEND = convert_value(os.getenv('TONE_BACKEND', 'torch'))
+TONE_ONNX_PATH = convert_value(
+    os.getenv('TONE_ONNX_PATH', './AIModel/tone_model_int8.onnx'))
+TONE_ONNX_THREADS = convert_value(os.getenv('TONE_ONNX_THREADS', '0'))
+PREPROCESS_CACHE_SIZE = convert_value(
+    os.getenv('PREPROCESS_CACHE_SIZE', '10000'))
+PREPROCESS_CACHE_TTL = convert_value(os.getenv('PREPROCESS_CACHE_TTL', '3600'))
+# Seconds between two checks of the classifiers and dictionaries, which are then
+# reloaded without a restart. A new tone-mark model needs a restart.
+PREPROCESS_CACHE_CHECK_INTERVAL = convert_value(
+    os.getenv('PREPROCESS_CACHE_CHECK_INTERVAL', '60'))
+ANSWER_CACHE_SIZE = convert_value(os.getenv('ANSWER_CACHE_SIZE', '2000'))
+ANSWER_CACHE_THRESHOLD = convert_value(
+    os.getenv('ANSWER_CACHE_THRESHOLD', '0.95'))
+ANSWER_CACHE_TTL = convert_value(os.getenv('ANSWER_CACHE_TTL', '86400'))
+CHAT_LOG_QUEUE_SIZE = convert_value(os.getenv('CHAT_LOG_QUEUE_SIZE', '10000'))
+CHAT_LOG_BATCH_SIZE = convert_value(os.getenv('CHAT_LOG_BATCH_SIZE', '100'))
+CHAT_LOG_FLUSH_MS = convert_value(os.getenv('CHAT_LOG_FLUSH_MS', '200'))
+CHAT_LOG_PUT_TIMEOUT_MS = convert_value(
+    os.getenv('CHAT_LOG_PUT_TIMEOUT_MS', '100'))
+CHAT_LOG_SPILL_PATH = convert_value(
+    os.getenv('CHAT_LOG_SPILL_PATH', './log/chat_log_spill.jsonl'))
+MONGODB_CREATE_INDEXES = convert_value(
+    os.getenv('MONGODB_CREATE_INDEXES', 'true'))
+MONGODB_URL = convert_value(os.getenv('MONGODB_URL'))
+MONGODB_NAME = convert_value(os.getenv('MONGODB_NAME'))
+EMBEDDING_CACHE_ENABLED = convert_value(
+    os.getenv('EMBEDDING_CACHE_ENABLED', 'true'))
+EMBEDDING_CACHE_COLLECTION = convert_value(
+    os.getenv('EMBEDDING_CACHE_COLLECTION', 'embedding_cache'))
+QUERY_EMBEDDING_CACHE_SIZE = convert_value(
+    os.getenv('QUERY_EMBEDDING_CACHE_SIZE', '10000'))
+QUERY_EMBEDDING_CACHE_TTL = convert_value(
+    os.getenv('QUERY_EMBEDDING_CACHE_TTL', '0'))
+INGESTION_WORKERS = convert_value(os.getenv('INGESTION_WORKERS', '2'))
+INGESTION_MAX_JOBS = convert_value(os.getenv('INGESTION_MAX_JOBS', '1000'))
+REBUILD_GC_DELAY_S = convert_value(os.getenv('REBUILD_GC_DELAY_S', '60'))
+INGESTION_STAGE_CONCURRENCY = {
+    "transfer": convert_value(os.getenv('INGESTION_TRANSFER_CONCURRENCY', '8')),
+    "load": convert_value(os.getenv('INGESTION_LOAD_CONCURRENCY', '4')),
+    "split": convert_value(os.getenv('INGESTION_SPLIT_CONCURRENCY', '4')),
+    "index": convert_value(os.getenv('INGESTION_INDEX_CONCURRENCY', '2')),
+    "register": convert_value(os.getenv('INGESTION_REGISTER_CONCURRENCY', '8')),
+}
+# 0 derives the limit from the split and index concurrency
+INGESTION_MAX_FILES_IN_FLIGHT = convert_value(
+    os.getenv('INGESTION_MAX_FILES_IN_FLIGHT', '0'))
 
 
 class Service:
@@ -60,27 +127,20 @@ class Service:
         """
         Initializes the Service class with LLM and embedding models.
         """
-        self._device = torch.device(
-            "cuda") if torch.cuda.is_available() else torch.device("cpu")
+        # Selected when the PyTorch tone model is loaded, the ONNX backend runs without torch
+        self._device = None
         genai.configure(
             api_key=GEMINI_API_KEY
         )
-        self._domain_clf_model = joblib.load(
-            filename=DOMAIN_CLF_MODEL
-        )
-        self._domain_clf_vectorizer = joblib.load(
-            filename=DOMAIN_CLF_VECTORIZER
-        )
-        self._prompt_injection_model = joblib.load(
-            filename=PROMPT_INJECTION_MODEL
-        )
-        self._prompt_injection_vectorizer = joblib.load(
-            filename=PROMPT_INJECTION_VECTORIZER
-        )
-        self._tone_tokenizer = AutoTokenizer.from_pretrained(
-            TONE_MODEL, add_prefix_space=True)
-        self._tone_model = AutoModelForTokenClassification.from_pretrained(
-            TONE_MODEL).to(self._device)
+        # Fingerprinted before loading, so that a change made while loading is
+        # picked up by the next check
+        self._preprocess_version = self._preprocess_fingerprint()
+        classifiers = self._load_classifiers()
+        self._domain_clf_model = classifiers["domain_clf_model"]
+        self._domain_clf_vectorizer = classifiers["domain_clf_vectorizer"]
+        self._prompt_injection_model = classifiers["prompt_injection_model"]
+        self._prompt_injection_vectorizer = classifiers["prompt_injection_vectorizer"]
+        self._load_tone_model()
         self._generation_config = {
             "temperature": TEMPERATURE,
             "top_p": TOP_P,
@@ -99,9 +159,26 @@ class Service:
             model=OPENAI_MODEL,
             temperature=TEMPERATURE_MODEL
         )
-        self._embed_model = OpenAIEmbedding(
-            api_key=OPENAI_API_KEY,
-            model=OPENAI_EMBED_MODEL
+        self._embedding_cache = None
+        if EMBEDDING_CACHE_ENABLED:
+            self._embedding_cache = MongoResultCache(
+                mongodb_url=MONGODB_URL,
+                mongodb_name=MONGODB_NAME,
+                collection_name=EMBEDDING_CACHE_COLLECTION
+            )
+        self._query_embedding_cache = None
+        if QUERY_EMBEDDING_CACHE_SIZE > 0:
+            self._query_embedding_cache = LRUCache(
+                max_size=QUERY_EMBEDDING_CACHE_SIZE,
+                ttl=QUERY_EMBEDDING_CACHE_TTL or None
+            )
+        self._embed_model = CachedEmbedding(
+            embed_model=OpenAIEmbedding(
+                api_key=OPENAI_API_KEY,
+                model=OPENAI_EMBED_MODEL
+            ),
+            store=self._embedding_cache,
+            query_cache=self._query_embedding_cache
         )
         self._gemini = genai.GenerativeModel(
             model_name=GEMINI_LLM_MODEL,
@@ -120,6 +197,28 @@ class Service:
             weaviate_db=self._vector_database,
             suggestion_repository=self._suggestion_repository
         )
+        prompt_engines = self._build_prompt_engines(preprocessing_prompt)
+        self._text_normalizer = prompt_engines["text_normalizer"]
+        self._tonemark_batcher = ToneMarkBatcher(
+            backend=self._tonemark_backend,
+            tokenizer=self._tone_tokenizer,
+            max_batch_size=TONE_MAX_BATCH_SIZE,
+            max_wait_ms=TONE_MAX_WAIT_MS
+        )
+        self._short_chat_matcher = prompt_engines["short_chat_matcher"]
+        self._injection_scanner = prompt_engines["injection_scanner"]
+        self._preprocess_executor = ThreadPoolExecutor(
+            max_workers=PREPROCESS_WORKERS,
+            thread_name_prefix="preprocess"
+        )
+        self._preprocess_cache = None
+        if PREPROCESS_CACHE_SIZE > 0:
+            self._preprocess_cache = LRUCache(
+                max_size=PREPROCESS_CACHE_SIZE,
+                ttl=PREPROCESS_CACHE_TTL,
+                version_func=lambda: self._preprocess_version,
+                check_interval=0
+            )
         self._preprocess_engine = PreprocessQuestion(
             domain_clf_model=self._domain_clf_model,
             domain_clf_vectorizer=self._domain_clf_vectorizer,
@@ -129,24 +228,243 @@ class Service:
             prompt_injection_model=self._prompt_injection_model,
             prompt_injection_vectorizer=self._prompt_injection_vectorizer,
             device_type=self._device,
-            label_list=self._label_list
+            label_list=self._label_list,
+            text_normalizer=self._text_normalizer,
+            tonemark_batcher=self._tonemark_batcher,
+            executor=self._preprocess_executor,
+            short_chat_matcher=self._short_chat_matcher,
+            injection_scanner=self._injection_scanner,
+            result_cache=self._preprocess_cache,
+            version=self._preprocess_version
+        )
+        self._artifact_watcher = ArtifactWatcher(
+            fingerprint_func=self._preprocess_fingerprint,
+            load_func=self.load_preprocess_models,
+            apply_func=self.apply_preprocess_models,
+            fingerprint=self._preprocess_version,
+            interval=PREPROCESS_CACHE_CHECK_INTERVAL
         )
         self._semantic_engine = SemanticSearch(
             index=self._vector_database._suggestion_index
         )
+        self._answer_cache = None
+        if ANSWER_CACHE_SIZE > 0:
+            self._answer_cache = SemanticAnswerCache(
+                embed_model=self._embed_model,
+                threshold=ANSWER_CACHE_THRESHOLD,
+                max_size=ANSWER_CACHE_SIZE,
+                ttl=ANSWER_CACHE_TTL
+            )
         self._retrieve_chat_engine = RetrieveChat(
             retriever=self._retriever,
             chat=self._chat_engine,
             preprocess=self._preprocess_engine,
-            semantic=self._semantic_engine
+            semantic=self._semantic_engine,
+            answer_cache=self._answer_cache
+        )
+        self._chat_log_writer = None
+        if CHAT_LOG_QUEUE_SIZE > 0:
+            self._chat_log_writer = ChatLogWriter(
+                max_queue_size=CHAT_LOG_QUEUE_SIZE,
+                batch_size=CHAT_LOG_BATCH_SIZE,
+                flush_interval_ms=CHAT_LOG_FLUSH_MS,
+                put_timeout_ms=CHAT_LOG_PUT_TIMEOUT_MS,
+                spill_path=CHAT_LOG_SPILL_PATH
+            )
+        self._chat_repository = ChatRepository(
+            log_writer=self._chat_log_writer
         )
-        self._chat_repository = ChatRepository()
         self._file_repository = FileRepository()
         self._general_loader = GeneralLoader()
         self._file_management = FileManagement(
             file_repository=self._file_repository,
             general_loader=self._general_loader,
-            vector_database=self._vector_database
+            vector_database=self._vector_database,
+            answer_cache=self._answer_cache,
+            stage_concurrency=INGESTION_STAGE_CONCURRENCY,
+            max_files_in_flight=INGESTION_MAX_FILES_IN_FLIGHT
+        )
+        self._collection_rebuilder = CollectionRebuilder(
+            vector_database=self._vector_database,
+            file_repository=self._file_repository,
+            general_loader=self._general_loader,
+            file_management=self._file_management,
+            retriever=self._retriever,
+            answer_cache=self._answer_cache,
+            stage_concurrency=INGESTION_STAGE_CONCURRENCY,
+            gc_delay=REBUILD_GC_DELAY_S
+        )
+        self._ingestion_manager = IngestionJobManager(
+            file_management=self._file_management,
+            workers=INGESTION_WORKERS,
+            max_jobs=INGESTION_MAX_JOBS
+        )
+
+    @staticmethod
+    def _load_classifiers() -> dict:
+        """
+        Loads the domain classification and prompt injection models and vectorizers.
+
+        Returns:
+            dict: The loaded objects, keyed by their PreprocessQuestion attribute name.
+        """
+        return {
+            "domain_clf_model": joblib.load(filename=DOMAIN_CLF_MODEL),
+            "domain_clf_vectorizer": joblib.load(filename=DOMAIN_CLF_VECTORIZER),
+            "prompt_injection_model": joblib.load(filename=PROMPT_INJECTION_MODEL),
+            "prompt_injection_vectorizer": joblib.load(
+                filename=PROMPT_INJECTION_VECTORIZER)
+        }
+
+    @staticmethod
+    def _build_prompt_engines(prompts) -> dict:
+        """
+        Builds the engines compiled from the preprocessing dictionaries and patterns.
+
+        Args:
+            prompts: The src.prompt.preprocessing_prompt module.
+
+        Returns:
+            dict: The engines, keyed by their PreprocessQuestion attribute name.
+        """
+        return {
+            "text_normalizer": TextNormalizer(
+                term_dict=prompts.TERMS_DICT,
+                filler_words=prompts.FILLTER_WORDS
+            ),
+            "short_chat_matcher": ShortChatMatcher(
+                short_chats=prompts.SHORT_CHAT,
+                response_dict=prompts.RESPONSE_DICT
+            ),
+            "injection_scanner": PromptInjectionScanner(
+                patterns=prompts.PROMPT_INJECTION_PATTERNS,
+                potential_patterns=prompts.POTENTIAL_PROMPT_INJECTION_PATTERNS
+            )
+        }
+
+    def _load_tone_model(self) -> None:
+        """
+        Loads the tone-mark tokenizer and the backend selected by TONE_BACKEND.
+
+        With "onnx", the model exported to TONE_ONNX_PATH by src.scripts.export_tone_onnx
+        is loaded. If it has not been exported, the PyTorch model is served instead.
+        """
+        self._tone_tokenizer = AutoTokenizer.from_pretrained(
+            TONE_MODEL, add_prefix_space=True)
+        self._tone_model = None
+        if TONE_BACKEND == "onnx" and os.path.exists(TONE_ONNX_PATH):
+            self._tonemark_backend = OnnxToneMarkBackend(
+                model_path=TONE_ONNX_PATH,
+                intra_op_num_threads=TONE_ONNX_THREADS
+            )
+            return
+        if TONE_BACKEND == "onnx":
+            print(f"No ONNX tone model at {TONE_ONNX_PATH}, serving the PyTorch model. "
+                  "Export it with: python -m src.scripts.export_tone_onnx")
+        from transformers import (  # pylint: disable=import-outside-toplevel
+            AutoModelForTokenClassification)
+        if self._device is None:
+            self._device = default_torch_device()
+        self._tone_model = AutoModelForTokenClassification.from_pretrained(
+            TONE_MODEL).to(self._device)
+        self._tonemark_backend = TorchToneMarkBackend(
+            model=self._tone_model,
+            device_type=self._device
+        )
+
+    def load_preprocess_models(self) -> dict:
+        """
+        Loads the classifiers and compiles the dictionaries again, without touching the
+        ones in use. Meant to run in a worker thread, see apply_preprocess_models.
+
+        The tone-mark model is not reloaded: a new model, or a new ONNX export of it,
+        is served after a restart.
+
+        Returns:
+            dict: The fingerprint of the loaded artifacts under "version", and the
+                  loaded components by their PreprocessQuestion attribute name.
+        """
+        version = self._preprocess_fingerprint()
+        return {
+            "version": version,
+            **self._load_classifiers(),
+            **self._build_prompt_engines(self._load_preprocessing_prompt())
+        }
+
+    def apply_preprocess_models(self, loaded: dict) -> str:
+        """
+        Swaps components returned by load_preprocess_models into the preprocessing
+        engine. Runs on the event loop. Cached results of the previous components
+        are no longer used.
+
+        Args:
+            loaded (dict): The result of load_preprocess_models.
+
+        Returns:
+            str: The fingerprint of the swapped artifacts.
+        """
+        components = dict(loaded)
+        version = components.pop("version")
+        self._domain_clf_model = components["domain_clf_model"]
+        self._domain_clf_vectorizer = components["domain_clf_vectorizer"]
+        self._prompt_injection_model = components["prompt_injection_model"]
+        self._prompt_injection_vectorizer = components["prompt_injection_vectorizer"]
+        self._text_normalizer = components["text_normalizer"]
+        self._short_chat_matcher = components["short_chat_matcher"]
+        self._injection_scanner = components["injection_scanner"]
+        self._preprocess_engine.reload(version=version, **components)
+        self._preprocess_version = version
+        print(f"Reloaded the preprocessing models, version {version[:12]}")
+        return version
+
+    @staticmethod
+    def _load_preprocessing_prompt():
+        """
+        Executes the dictionary module again as a new module object, leaving the
+        module imported by the rest of the application unchanged.
+
+        Returns:
+            module: The freshly executed src.prompt.preprocessing_prompt.
+        """
+        spec = importlib.util.spec_from_file_location(
+            preprocessing_prompt.__name__, preprocessing_prompt.__file__)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    async def ensure_indexes(self) -> dict:
+        """
+        Ensures the MongoDB indexes declared by the storage layer and reports the
+        ones that are missing. They are only created if MONGODB_CREATE_INDEXES is true.
+
+        Returns:
+            dict: The index report of each collection, keyed by collection name.
+        """
+        report = {}
+        for repository in (self._chat_repository,
+                           self._file_repository,
+                           self._suggestion_repository):
+            crud = repository.collection
+            report[crud.collection.name] = await crud.ensure_indexes(
+                create=MONGODB_CREATE_INDEXES
+            )
+        for name, result in report.items():
+            if result["missing"] or result["mismatched"] or result["failed"]:
+                print(f"Indexes of {name}: {result}")
+        return report
+
+    @staticmethod
+    def _preprocess_fingerprint() -> str:
+        """
+        Fingerprints the classifiers and the dictionary module that preprocessing
+        results depend on. The artifact watcher reloads them when it changes.
+
+        Returns:
+            str: The fingerprint of the reloadable preprocessing inputs.
+        """
+        return compute_fingerprint(
+            [DOMAIN_CLF_MODEL, DOMAIN_CLF_VECTORIZER, PROMPT_INJECTION_MODEL,
+             PROMPT_INJECTION_VECTORIZER, preprocessing_prompt.__file__]
         )
 
     @property
@@ -170,12 +488,12 @@ class Service:
         return self._llm
 
     @property
-    def embed_model(self) -> OpenAIEmbedding:
+    def embed_model(self) -> CachedEmbedding:
         """
         Retrieves the embedding model instance.
 
         Returns:
-            OpenAIEmbedding: The initialized embedding model object.
+            CachedEmbedding: The OpenAI embedding model behind the embedding cache.
         """
         return self._embed_model
 
@@ -263,3 +581,59 @@ class Service:
         Provides access to the SemanticEngine instance.
         """
         return self._semantic_engine
+
+    @property
+    def preprocess_cache(self) -> LRUCache:
+        """
+        Provides access to the preprocessing result cache, or None when it is disabled.
+        """
+        return self._preprocess_cache
+
+    @property
+    def artifact_watcher(self) -> ArtifactWatcher:
+        """
+        Provides access to the watcher that reloads the preprocessing models.
+        """
+        return self._artifact_watcher
+
+    @property
+    def answer_cache(self) -> SemanticAnswerCache:
+        """
+        Provides access to the semantic answer cache, or None when it is disabled.
+        """
+        return self._answer_cache
+
+    @property
+    def chat_log_writer(self) -> ChatLogWriter:
+        """
+        Provides access to the background chat log writer, or None when it is disabled.
+        """
+        return self._chat_log_writer
+
+    @property
+    def ingestion_manager(self) -> IngestionJobManager:
+        """
+        Provides access to the background file ingestion job manager.
+        """
+        return self._ingestion_manager
+
+    @property
+    def embedding_cache(self) -> MongoResultCache:
+        """
+        Provides access to the persistent embedding cache, or None when it is disabled.
+        """
+        return self._embedding_cache
+
+    @property
+    def query_embedding_cache(self) -> LRUCache:
+        """
+        Provides access to the in-memory query embedding cache, or None when it is disabled.
+        """
+        return self._query_embedding_cache
+
+    @property
+    def collection_rebuilder(self) -> CollectionRebuilder:
+        """
+        Provides access to the blue/green knowledge collection rebuilder.
+        """
+        return self._collection_rebuilder
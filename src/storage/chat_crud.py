@@ -2,13 +2,32 @@
 Module for CRUD operations on the chat collection.
 """
 
+import os
+from dotenv import load_dotenv
+from pymongo import ASCENDING, IndexModel
+
 from src.storage.mongodb import CRUDDocuments
+from src.utils.utility import convert_value
+
+load_dotenv()
+
+CHAT_TTL_SECONDS = convert_value(os.getenv('CHAT_TTL_SECONDS', '0'))
+CHAT_INDEXES = [
+    IndexModel([("Id", ASCENDING)], name="Id_unique", unique=True)
+]
+if CHAT_TTL_SECONDS > 0:
+    CHAT_INDEXES.append(IndexModel([("created_at", ASCENDING)],
+                                   name="created_at_ttl",
+                                   expireAfterSeconds=CHAT_TTL_SECONDS))
 
 
 class CRUDChatCollection(CRUDDocuments):
     """
     A class to handle CRUD operations for the result collection in the MongoDB database.
+
+    Chats expire CHAT_TTL_SECONDS after their created_at date when it is positive.
     """
+    indexes = CHAT_INDEXES
 
     def __init__(self):
         """
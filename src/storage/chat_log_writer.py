@@ -0,0 +1,287 @@
+"""
+This module writes chat logs to MongoDB in the background, in batches.
+"""
+
+import os
+import json
+import asyncio
+from typing import List
+from bson import ObjectId, json_util
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from src.storage.chat_crud import CRUDChatCollection
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class ChatLogWriter:
+    """
+    Queues chat records and inserts them with ``insert_many`` from a worker task.
+
+    The queue is bounded: when it is full, producers wait up to ``put_timeout_ms``
+    and the record is then appended to a spill file instead. Batches that cannot
+    be written because MongoDB is unreachable are spilled too, and the spill file
+    is replayed once writes succeed again. Every record gets its ``_id`` before
+    it is queued, so a replay never creates duplicates.
+
+    Records that can never be written, because MongoDB rejects them or they cannot
+    be encoded, are appended to a dead-letter file instead of being retried.
+    """
+
+    def __init__(
+        self,
+        collection: CRUDChatCollection = None,
+        max_queue_size: int = 10000,
+        batch_size: int = 100,
+        flush_interval_ms: float = 200,
+        put_timeout_ms: float = 100,
+        spill_path: str = "./log/chat_log_spill.jsonl",
+        replay_interval: float = 30,
+        dead_letter_path: str = None
+    ) -> None:
+        """
+        Initializes the writer.
+
+        Args:
+            collection (CRUDChatCollection, optional): The chat collection to write to.
+            max_queue_size (int, optional): The maximum number of queued records.
+            batch_size (int, optional): The maximum number of records per insert_many.
+            flush_interval_ms (float, optional): How long a partial batch may wait,
+                                                 in milliseconds.
+            put_timeout_ms (float, optional): How long a producer waits on a full queue
+                                              before the record is spilled, in milliseconds.
+            spill_path (str, optional): The JSON lines file used when MongoDB is unreachable.
+            replay_interval (float, optional): Minimum seconds between two replays
+                                               of the spill file.
+            dead_letter_path (str, optional): The JSON lines file of the records that
+                cannot be written. Defaults to the spill file name with ".dead" appended.
+        """
+        self._collection = collection or CRUDChatCollection()
+        self._max_queue_size = max_queue_size
+        self._batch_size = max(1, batch_size)
+        self._flush_interval = max(0, flush_interval_ms) / 1000
+        self._put_timeout = max(0, put_timeout_ms) / 1000
+        self._spill_path = spill_path
+        self._replay_interval = replay_interval
+        self._dead_letter_path = dead_letter_path or spill_path + ".dead"
+        self._queue = None
+        self._worker = None
+        self._replayed_at = None
+        self._spill_lock = asyncio.Lock()
+        self.written = 0
+        self.spilled = 0
+        self.dead_lettered = 0
+
+    def start(self) -> None:
+        """
+        Starts the worker task on the running event loop. A worker that stopped
+        is restarted on the same queue, so the records still queued are kept.
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._max_queue_size)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def submit(self, record: dict) -> None:
+        """
+        Queues a record for the next batch.
+
+        Args:
+            record (dict): The document to insert.
+        """
+        self.start()
+        record.setdefault("_id", ObjectId())
+        try:
+            await asyncio.wait_for(self._queue.put(record), self._put_timeout)
+        except asyncio.TimeoutError:
+            await self._spill([record])
+
+    async def _collect(self) -> List[dict]:
+        """
+        Waits for a first record, then gathers more until the batch is full,
+        the flush interval has elapsed or the closing sentinel (None) arrives.
+        """
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._flush_interval
+        while len(batch) < self._batch_size and batch[-1] is not None:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        """
+        Replays the records spilled by a previous run, then flushes batches
+        until the closing sentinel is received.
+        """
+        await self._replay(force=True)
+        while True:
+            batch = await self._collect()
+            records = [record for record in batch if record is not None]
+            try:
+                if records and await self._write(records):
+                    await self._replay()
+            except Exception as e:  # pylint: disable=broad-except
+                # Keep the worker alive so that the records queued behind still get written
+                print(f"Chat log writer error: {e}")
+            if len(records) < len(batch):
+                return
+
+    async def _write(self, batch: List[dict]) -> bool:
+        """
+        Inserts a batch, spilling the records that could not be written because
+        MongoDB is unreachable and dead-lettering the ones it rejected.
+
+        Args:
+            batch (List[dict]): The documents to insert.
+
+        Returns:
+            bool: True if MongoDB accepted the batch.
+        """
+        try:
+            await self._collection.insert_many_docs(batch)
+            self.written += len(batch)
+            return True
+        except BulkWriteError as e:
+            # Duplicates were written by an earlier attempt; any other write error,
+            # e.g. a failed validation, would fail again on every replay
+            rejected = [error for error in e.details["writeErrors"]
+                        if error["code"] != DUPLICATE_KEY_ERROR]
+            self.written += len(batch) - len(rejected)
+            for error in rejected:
+                await self._dead_letter([batch[error["index"]]], error.get("errmsg", ""))
+            return True
+        except (PyMongoError, OSError) as e:
+            print(f"Failed to write {len(batch)} chat logs: {e}")
+            await self._spill(batch)
+            return False
+        except Exception as e:  # pylint: disable=broad-except
+            # A record that cannot be encoded, e.g. bson InvalidDocument, fails the
+            # whole batch: write the records one by one to isolate it
+            if len(batch) == 1:
+                await self._dead_letter(batch, str(e))
+                return True
+            for start, record in enumerate(batch):
+                if not await self._write([record]):
+                    await self._spill(batch[start + 1:])
+                    return False
+            return True
+
+    async def _dead_letter(
+        self,
+        records: List[dict],
+        error: str
+    ) -> None:
+        """
+        Appends records that cannot be written to the dead-letter file.
+
+        Args:
+            records (List[dict]): The rejected documents.
+            error (str): Why they were rejected.
+        """
+        print(f"Dropping {len(records)} chat logs to {self._dead_letter_path}: {error}")
+        lines = []
+        for record in records:
+            try:
+                lines.append(json_util.dumps({"error": error, "record": record},
+                                             ensure_ascii=False))
+            except Exception:  # pylint: disable=broad-except
+                lines.append(json.dumps({"error": error, "record": repr(record)},
+                                        ensure_ascii=False))
+        async with self._spill_lock:
+            await asyncio.to_thread(self._append, self._dead_letter_path,
+                                    "".join(line + "\n" for line in lines))
+        self.dead_lettered += len(records)
+
+    async def _spill(self, records: List[dict]) -> None:
+        """
+        Appends records to the spill file.
+
+        Args:
+            records (List[dict]): The documents to keep for a later replay.
+        """
+        if not records:
+            return
+        lines = "".join(json_util.dumps(record, ensure_ascii=False) + "\n"
+                        for record in records)
+        async with self._spill_lock:
+            await asyncio.to_thread(self._append, self._spill_path, lines)
+        self.spilled += len(records)
+
+    @staticmethod
+    def _append(path: str, lines: str) -> None:
+        """
+        Appends lines to a file.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as file:
+            file.write(lines)
+
+    def _take_spilled(self) -> List[dict]:
+        """
+        Moves the spill file aside and reads its records. Lines that cannot be
+        parsed are moved to the dead-letter file.
+        """
+        replay_path = self._spill_path + ".replay"
+        os.replace(self._spill_path, replay_path)
+        records, corrupt = [], []
+        with open(replay_path, encoding="utf-8") as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    records.append(json_util.loads(line))
+                except ValueError:
+                    corrupt.append(line if line.endswith("\n") else line + "\n")
+        if corrupt:
+            self._append(self._dead_letter_path, "".join(corrupt))
+            self.dead_lettered += len(corrupt)
+        os.remove(replay_path)
+        return records
+
+    async def _replay(self, force: bool = False) -> None:
+        """
+        Re-inserts the spilled records once MongoDB accepts writes again.
+
+        Args:
+            force (bool, optional): Replay even if the last replay was recent.
+        """
+        loop = asyncio.get_running_loop()
+        if not os.path.exists(self._spill_path):
+            return
+        if (not force and self._replayed_at is not None
+                and loop.time() - self._replayed_at < self._replay_interval):
+            return
+        self._replayed_at = loop.time()
+        async with self._spill_lock:
+            records = await asyncio.to_thread(self._take_spilled)
+        for start in range(0, len(records), self._batch_size):
+            if not await self._write(records[start:start + self._batch_size]):
+                await self._spill(records[start + self._batch_size:])
+                return
+
+    async def close(self) -> None:
+        """
+        Writes every queued record, then stops the worker.
+        """
+        if self._worker is None or self._worker.done():
+            return
+        await self._queue.put(None)
+        await self._worker
+
+    @property
+    def stats(self) -> dict:
+        """
+        Returns the number of queued, written, spilled and dead-lettered records.
+        """
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "written": self.written,
+            "spilled": self.spilled,
+            "dead_lettered": self.dead_lettered
+        }
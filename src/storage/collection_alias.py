@@ -0,0 +1,83 @@
+"""
+This module keeps the aliases that point a logical Weaviate collection name
+at the versioned collection currently serving it.
+"""
+
+from datetime import datetime, timezone
+from typing import Optional
+from pymongo import MongoClient
+
+
+class CollectionAliases:
+    """
+    Maps an alias to a Weaviate collection name, stored in MongoDB so that every
+    process, and every restart, serves the same collection.
+
+    Weaviate 1.26 has no server-side aliases, so the switch is done by the
+    application: it resolves the alias when it binds to a collection.
+    """
+
+    def __init__(
+        self,
+        mongodb_url: str = None,
+        mongodb_name: str = None,
+        collection_name: str = "collection_aliases",
+        timeout_ms: int = 5000
+    ) -> None:
+        """
+        Initializes the alias store.
+
+        Args:
+            mongodb_url (str): The MongoDB connection string.
+            mongodb_name (str): The name of the database.
+            collection_name (str, optional): The name of the collection holding the aliases.
+            timeout_ms (int, optional): The server selection timeout.
+        """
+        self._client = MongoClient(
+            mongodb_url,
+            serverSelectionTimeoutMS=timeout_ms
+        )
+        self._collection = self._client[mongodb_name][collection_name]
+
+    def resolve(
+        self,
+        alias: str
+    ) -> str:
+        """
+        Finds the collection an alias points at.
+
+        Args:
+            alias (str): The logical collection name.
+
+        Returns:
+            str: The collection name, or the alias itself if it was never switched.
+        """
+        record = self._collection.find_one({"_id": alias}, {"collection": 1})
+        return record["collection"] if record else alias
+
+    def switch(
+        self,
+        alias: str,
+        collection: str
+    ) -> Optional[str]:
+        """
+        Points an alias at another collection.
+
+        Args:
+            alias (str): The logical collection name.
+            collection (str): The collection to serve from now on.
+
+        Returns:
+            Optional[str]: The collection the alias pointed at before.
+        """
+        previous = self.resolve(alias)
+        self._collection.update_one(
+            {"_id": alias},
+            {"$set": {
+                "collection": collection,
+                "previous": previous,
+                "switched_at": datetime.now(timezone.utc)
+            }},
+            upsert=True
+        )
+        return previous
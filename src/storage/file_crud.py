@@ -2,6 +2,8 @@
 Module for CRUD operations on the file collection.
 """
 
+from pymongo import ASCENDING, IndexModel
+
 from src.storage.mongodb import CRUDDocuments
 
 
@@ -9,6 +11,9 @@ class CRUDFileCollection(CRUDDocuments):
     """
     A class to handle CRUD operations for the file collection in the MongoDB database.
     """
+    indexes = [
+        IndexModel([("public_id", ASCENDING)], name="public_id_unique", unique=True)
+    ]
 
     def __init__(self):
         """
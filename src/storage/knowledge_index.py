@@ -0,0 +1,160 @@
+"""
+This module maps the public ID of each uploaded file to the documents indexed from it.
+"""
+
+from typing import Dict, Iterable, List, Optional
+from pymongo import MongoClient
+
+
+class KnowledgeRefIndex:
+    """
+    Stores, for each file, the reference document IDs of its nodes in the vector
+    store and the document store, so a file can be deleted without scanning the
+    whole document store.
+
+    It also keeps the content hash of each node, so a re-uploaded file can be
+    diffed against what is indexed.
+
+    Each file is one MongoDB document::
+
+        {"_id": public_id,
+         "ref_doc_ids": [...],
+         "nodes": {node_id: {"hash": ..., "ref_doc_id": ...}}}
+    """
+
+    def __init__(
+        self,
+        mongodb_url: str = None,
+        mongodb_name: str = None,
+        collection_name: str = "knowledge_refs",
+        timeout_ms: int = 5000
+    ) -> None:
+        """
+        Initializes the index.
+
+        Args:
+            mongodb_url (str): The MongoDB connection string.
+            mongodb_name (str): The name of the database.
+            collection_name (str, optional): The name of the collection holding the index.
+            timeout_ms (int, optional): The server selection timeout.
+        """
+        self._client = MongoClient(
+            mongodb_url,
+            serverSelectionTimeoutMS=timeout_ms
+        )
+        self._collection = self._client[mongodb_name][collection_name]
+
+    def add(
+        self,
+        public_id: str,
+        ref_doc_ids: Iterable[str],
+        nodes: Dict[str, Dict[str, str]] = None
+    ) -> None:
+        """
+        Records reference document IDs and nodes of a file.
+
+        Args:
+            public_id (str): The public ID of the file.
+            ref_doc_ids (Iterable[str]): The IDs to add to the ones already recorded.
+            nodes (Dict[str, Dict[str, str]], optional): The hash and reference
+                document ID of each new node, keyed by node ID.
+        """
+        update = {"$addToSet": {"ref_doc_ids": {"$each": list(ref_doc_ids)}}}
+        if nodes:
+            update["$set"] = {f"nodes.{node_id}": entry
+                              for node_id, entry in nodes.items()}
+        self._collection.update_one(
+            {"_id": public_id},
+            update,
+            upsert=True
+        )
+
+    def get(
+        self,
+        public_id: str
+    ) -> Optional[List[str]]:
+        """
+        Retrieves the reference document IDs of a file.
+
+        Args:
+            public_id (str): The public ID of the file.
+
+        Returns:
+            Optional[List[str]]: The IDs, or None if the file was never recorded,
+                                 e.g. because it was indexed before this index existed.
+        """
+        record = self._collection.find_one({"_id": public_id}, {"ref_doc_ids": 1})
+        if record is None:
+            return None
+        return record.get("ref_doc_ids", [])
+
+    def get_nodes(
+        self,
+        public_id: str
+    ) -> Optional[Dict[str, Dict[str, str]]]:
+        """
+        Retrieves the hash and reference document ID of each node of a file.
+
+        Args:
+            public_id (str): The public ID of the file.
+
+        Returns:
+            Optional[Dict[str, Dict[str, str]]]: The nodes keyed by node ID, or None if
+                they were not recorded, e.g. because the file was indexed before
+                node hashes were kept.
+        """
+        record = self._collection.find_one({"_id": public_id}, {"nodes": 1})
+        if record is None:
+            return None
+        return record.get("nodes")
+
+    def remove_nodes(
+        self,
+        public_id: str,
+        node_ids: Iterable[str],
+        ref_doc_ids: Iterable[str]
+    ) -> None:
+        """
+        Forgets some nodes of a file and sets the reference document IDs still in use.
+
+        Args:
+            public_id (str): The public ID of the file.
+            node_ids (Iterable[str]): The IDs of the deleted nodes.
+            ref_doc_ids (Iterable[str]): The reference document IDs of the remaining nodes.
+        """
+        update = {"$set": {"ref_doc_ids": list(ref_doc_ids)}}
+        unset = {f"nodes.{node_id}": "" for node_id in node_ids}
+        if unset:
+            update["$unset"] = unset
+        self._collection.update_one({"_id": public_id}, update)
+
+    def remove(
+        self,
+        public_id: str
+    ) -> None:
+        """
+        Forgets a file.
+
+        Args:
+            public_id (str): The public ID of the file.
+        """
+        self._collection.delete_one({"_id": public_id})
+
+    def count_nodes(self) -> Dict[str, int]:
+        """
+        Counts the recorded nodes of every file.
+
+        Returns:
+            Dict[str, int]: The number of nodes, keyed by public ID.
+        """
+        pipeline = [{"$project": {
+            "count": {"$size": {"$objectToArray": {"$ifNull": ["$nodes", {}]}}}
+        }}]
+        return {record["_id"]: record["count"]
+                for record in self._collection.aggregate(pipeline)}
+
+    def drop(self) -> None:
+        """
+        Deletes the whole index.
+        """
+        self._collection.drop()
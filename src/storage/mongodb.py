@@ -3,10 +3,15 @@ mongodb function
 """
 
 import os
+from typing import List, Optional, Tuple
 from dotenv import load_dotenv
-from pymongo import MongoClient
+from pymongo import IndexModel
+from pymongo.errors import PyMongoError
+from motor.motor_asyncio import AsyncIOMotorClient
 
 from src.services.logger import DSCLogger
+from src.storage.pagination import (keyset_filter,
+                                    find_page)
 from src.utils.utility import convert_value
 
 load_dotenv()
@@ -18,6 +23,14 @@ if MONGODB_URL is None:
 LOG_LEVEL = convert_value(os.environ.get("LOG_LEVEL"))
 WRITE_LOG_TO_FILE = convert_value(os.environ.get("WRITE_LOG_TO_FILE"))
 FILE_NAME = convert_value(os.environ.get("FILE_NAME"))
+MONGODB_MAX_POOL_SIZE = convert_value(
+    os.environ.get("MONGODB_MAX_POOL_SIZE", "100"))
+MONGODB_MIN_POOL_SIZE = convert_value(
+    os.environ.get("MONGODB_MIN_POOL_SIZE", "10"))
+MONGODB_MAX_IDLE_TIME_MS = convert_value(
+    os.environ.get("MONGODB_MAX_IDLE_TIME_MS", "60000"))
+MONGODB_TIMEOUT_MS = convert_value(os.environ.get("MONGODB_TIMEOUT_MS", "5000"))
+INDEX_OPTIONS = ("unique", "expireAfterSeconds", "sparse")
 
 log = DSCLogger(
     file_name=FILE_NAME,
@@ -36,16 +49,35 @@ class MongoDBConnection():
     col = MONGODB_NAME
 
     def __init__(self):
-        self.client = MongoClient(self.url)
+        self.client = AsyncIOMotorClient(
+            self.url,
+            maxPoolSize=MONGODB_MAX_POOL_SIZE,
+            minPoolSize=MONGODB_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGODB_MAX_IDLE_TIME_MS,
+            serverSelectionTimeoutMS=MONGODB_TIMEOUT_MS
+        )
         self.db = self.client[MONGODB_NAME]
-        print("DEBUG DEBUG")
+
+    async def ping(self) -> bool:
+        """
+        Checks that the database is reachable.
+
+        Returns:
+            bool: True if the server answered the ping.
+        """
         try:
-            # check connection is available
-            self.client.admin.command("ismaster")
-            log.info(f"CONNECT TO DB {self.db} SUCCESSFULLY")
+            await self.client.admin.command("ping")
+            log.info(f"CONNECT TO DB {self.db.name} SUCCESSFULLY")
+            return True
+        except PyMongoError as e:
+            log.error(f"CONNECT TO DB {self.db.name} FAIL, ERROR: {e}")
+            return False
 
-        except ValueError as e:
-            log.error(f"CONNECT TO DB {self.db} FAIL, ERROR: {e}")
+    def close(self) -> None:
+        """
+        Closes the connection pool.
+        """
+        self.client.close()
 
 
 class CRUDDocuments():
@@ -53,11 +85,49 @@ class CRUDDocuments():
     author: Ngo Phuc Danh
     """
     connection = MongoDBConnection()
+    indexes: List[IndexModel] = []
 
     def __init__(self):
         self.collection = None
 
-    def insert_one_doc(self, obj):
+    async def ensure_indexes(self, create: bool = True) -> dict:
+        """
+        Compares the declared indexes with the ones in the collection and creates
+        the missing ones.
+
+        Args:
+            create (bool, optional): If False, only report the missing indexes.
+
+        Returns:
+            dict: The names of the missing, created and mismatched indexes, and the
+                errors of the ones that could not be created.
+        """
+        existing = await self.collection.index_information()
+        report = {"missing": [], "created": [], "mismatched": [], "failed": {}}
+        for index in self.indexes:
+            spec = index.document
+            name = spec["name"]
+            if name not in existing:
+                report["missing"].append(name)
+                continue
+            current = existing[name]
+            if (list(current["key"]) != list(spec["key"].items())
+                    or any(current.get(option) != spec.get(option)
+                           for option in INDEX_OPTIONS)):
+                report["mismatched"].append(name)
+        if create:
+            for index in self.indexes:
+                name = index.document["name"]
+                if name not in report["missing"]:
+                    continue
+                try:
+                    await self.collection.create_indexes([index])
+                    report["created"].append(name)
+                except PyMongoError as e:
+                    report["failed"][name] = str(e)
+        return report
+
+    async def insert_one_doc(self, obj):
         """
         Insert a single document.
         Example:
@@ -71,21 +141,87 @@ class CRUDDocuments():
             Returns:
                 An instance of InsertOneResult.
         """
-        return self.collection.insert_one(document=obj)
+        return await self.collection.insert_one(document=obj)
 
-    def find_all_doc(self):
+    async def insert_many_docs(self, objs: List[dict], ordered: bool = False):
+        """
+        Insert several documents in one round-trip.
+
+        Parameters:
+            objs (List[dict]): The documents to insert.
+            ordered (bool): If True, stop at the first failed insert.
+
+        Returns:
+            An instance of InsertManyResult.
+        """
+        return await self.collection.insert_many(documents=objs, ordered=ordered)
+
+    def find_all_doc(self, projection: dict = None):
         """
         Retrieve all documents from the collection.
 
         Args:
-            None
+            projection (dict, optional): The fields to return. Defaults to all fields.
+
+        Returns:
+            AsyncIOMotorCursor: A cursor to iterate over all documents in the collection.
+        """
+        return self.collection.find({}, projection)
+
+    def find_docs(
+        self,
+        obj: dict = None,
+        projection: dict = None,
+        sort: list = None,
+        limit: int = 0,
+        batch_size: int = None
+    ):
+        """
+        Finds the documents matching a filter without loading them into memory.
+
+        Args:
+            obj (dict, optional): A dictionary specifying the filter. Defaults to all documents.
+            projection (dict, optional): The fields to return. Defaults to all fields.
+            sort (list, optional): (key, direction) pairs to sort by.
+            limit (int, optional): The maximum number of documents. 0 means no limit.
+            batch_size (int, optional): The number of documents fetched per round-trip.
+
+        Returns:
+            AsyncIOMotorCursor: A cursor over the matching documents.
+        """
+        cursor = self.collection.find(obj or {}, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        if batch_size:
+            cursor = cursor.batch_size(batch_size)
+        return cursor
+
+    keyset_filter = staticmethod(keyset_filter)
+
+    async def find_page(
+        self,
+        projection: dict,
+        limit: int,
+        after: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Retrieves one page of documents in _id order.
+
+        Args:
+            projection (dict): The fields to return.
+            limit (int): The page size.
+            after (Optional[str], optional): The cursor returned with the previous page.
 
         Returns:
-            pymongo.cursor.Cursor: A cursor to iterate over all documents in the collection.
+            Tuple[List[dict], Optional[str]]: The documents, each with its _id as a
+                string under "cursor", and the cursor of the next page, or None if
+                this is the last page.
         """
-        return self.collection.find({})
+        return await find_page(self.find_docs, projection, limit, after)
 
-    def delete_one_doc(self, obj):
+    async def delete_one_doc(self, obj):
         """
         Deletes a single document from the collection based on the specified filter.
 
@@ -95,16 +231,31 @@ class CRUDDocuments():
         Returns:
             dict: A dictionary containing information about the delete operation
         """
-        return self.collection.delete_one(filter=obj)
+        return await self.collection.delete_one(filter=obj)
+
+    async def update_one_doc(self, obj, update: dict, upsert: bool = False):
+        """
+        Updates a single document matching the specified filter.
+
+        Args:
+            obj (dict): A dictionary specifying the filter
+            update (dict): The update operators to apply, e.g. {"$set": {...}}
+            upsert (bool, optional): Insert the document if none matches.
+
+        Returns:
+            An instance of UpdateResult.
+        """
+        return await self.collection.update_one(filter=obj, update=update, upsert=upsert)
 
-    def find_one_doc(self, obj):
+    async def find_one_doc(self, obj, projection: dict = None):
         """
         Finds a single document in the collection that matches the specified filter.
 
         Args:
             obj (dict): A dictionary specifying the filter
+            projection (dict, optional): The fields to return. Defaults to all fields.
 
         Returns:
             Optional[dict]: A dictionary representing the found document
         """
-        return self.collection.find_one(filter=obj)
+        return await self.collection.find_one(filter=obj, projection=projection)
@@ -0,0 +1,111 @@
+"""
+This module provides keyset pagination over the _id of MongoDB documents.
+
+The functions take the find_docs method of a collection, so they only depend on
+bson and work with any collection that follows CRUDDocuments.find_docs.
+"""
+
+import json
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+from bson import ObjectId
+
+
+def keyset_filter(after: Optional[str] = None) -> dict:
+    """
+    Builds the filter selecting the documents inserted after a given one.
+
+    Args:
+        after (Optional[str], optional): The _id of the last document already seen.
+
+    Returns:
+        dict: The filter on _id, or an empty filter.
+
+    Raises:
+        bson.errors.InvalidId: If after is not a valid ObjectId.
+    """
+    if not after:
+        return {}
+    return {"_id": {"$gt": ObjectId(after)}}
+
+
+async def find_page(
+    find_docs: Callable,
+    projection: dict,
+    limit: int,
+    after: Optional[str] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Retrieves one page of documents in _id order.
+
+    Args:
+        find_docs (Callable): The find_docs method of the collection.
+        projection (dict): The fields to return.
+        limit (int): The page size.
+        after (Optional[str], optional): The cursor returned with the previous page.
+
+    Returns:
+        Tuple[List[dict], Optional[str]]: The documents, each with its _id as a
+            string under "cursor", and the cursor of the next page, or None if
+            this is the last page.
+    """
+    cursor = find_docs(
+        obj=keyset_filter(after),
+        projection={**projection, "_id": 1},
+        sort=[("_id", 1)],
+        limit=limit + 1
+    )
+    documents = await cursor.to_list(length=limit + 1)
+    next_after = str(documents[limit - 1]["_id"]) if len(documents) > limit else None
+    documents = documents[:limit]
+    for document in documents:
+        document["cursor"] = str(document.pop("_id"))
+    return documents, next_after
+
+
+async def iter_documents(
+    find_docs: Callable,
+    projection: dict,
+    batch_size: int = None,
+    after: Optional[str] = None,
+    with_cursor: bool = False
+) -> AsyncIterator[dict]:
+    """
+    Iterates over the documents in _id order, fetching them from a cursor in batches.
+
+    Args:
+        find_docs (Callable): The find_docs method of the collection.
+        projection (dict): The fields to return.
+        batch_size (int, optional): The number of documents fetched per round-trip.
+        after (Optional[str], optional): Only yield the documents inserted after this _id.
+        with_cursor (bool, optional): Whether to add the _id of each document as a
+            string under "cursor", to resume from with after.
+
+    Yields:
+        dict: The next document.
+    """
+    if with_cursor:
+        projection = {**projection, "_id": 1}
+    cursor = find_docs(
+        obj=keyset_filter(after),
+        projection=projection,
+        sort=[("_id", 1)],
+        batch_size=batch_size
+    )
+    async for document in cursor:
+        if with_cursor:
+            document["cursor"] = str(document.pop("_id"))
+        yield document
+
+
+async def iter_ndjson(records: AsyncIterator[dict]) -> AsyncIterator[str]:
+    """
+    Serializes records as newline-delimited JSON while they are read.
+
+    Args:
+        records (AsyncIterator[dict]): The records to serialize.
+
+    Yields:
+        str: One JSON document per line.
+    """
+    async for record in records:
+        yield json.dumps(record, ensure_ascii=False) + "\n"
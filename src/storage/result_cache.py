@@ -0,0 +1,124 @@
+"""
+This module provides a persistent cache of expensive results stored in MongoDB.
+"""
+
+import json
+import hashlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable
+from pymongo import MongoClient, ReplaceOne
+from pymongo.errors import PyMongoError
+
+
+class MongoResultCache:
+    """
+    A key-value cache backed by a MongoDB collection, shared by every process
+    using the same database.
+
+    It is synchronous, because it is used from the worker threads of the ingestion
+    stages. A cache that cannot be reached behaves like an empty one, so a MongoDB
+    outage only costs recomputation.
+    """
+
+    def __init__(
+        self,
+        mongodb_url: str = None,
+        mongodb_name: str = None,
+        collection_name: str = None,
+        timeout_ms: int = 5000
+    ) -> None:
+        """
+        Initializes the cache.
+
+        Args:
+            mongodb_url (str): The MongoDB connection string.
+            mongodb_name (str): The name of the database.
+            collection_name (str): The name of the collection holding the cache.
+            timeout_ms (int, optional): The server selection timeout.
+        """
+        self._client = MongoClient(
+            mongodb_url,
+            serverSelectionTimeoutMS=timeout_ms
+        )
+        self._collection = self._client[mongodb_name][collection_name]
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """
+        Hashes the parts a result depends on into a cache key.
+
+        Args:
+            *parts (Any): JSON-serializable values, e.g. a model name and an input text.
+
+        Returns:
+            str: The hex digest of the parts.
+        """
+        payload = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_many(
+        self,
+        keys: Iterable[str]
+    ) -> Dict[str, Any]:
+        """
+        Retrieves the cached values of several keys in one query.
+
+        Args:
+            keys (Iterable[str]): The keys made by make_key.
+
+        Returns:
+            Dict[str, Any]: The values found, keyed by key. Missing keys are left out.
+        """
+        keys = list(set(keys))
+        if not keys:
+            return {}
+        try:
+            found = {
+                doc["_id"]: doc["value"]
+                for doc in self._collection.find(
+                    {"_id": {"$in": keys}},
+                    {"value": 1}
+                )
+            }
+        except PyMongoError as e:
+            print(f"Result cache is unavailable: {e}")
+            found = {}
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(
+        self,
+        items: Dict[str, Any]
+    ) -> None:
+        """
+        Stores several values, replacing the ones already stored under the same keys.
+
+        Args:
+            items (Dict[str, Any]): The values to store, keyed by key.
+        """
+        if not items:
+            return
+        now = datetime.now(timezone.utc)
+        try:
+            self._collection.bulk_write(
+                [ReplaceOne({"_id": key},
+                            {"value": value, "created_at": now},
+                            upsert=True)
+                 for key, value in items.items()],
+                ordered=False
+            )
+        except PyMongoError as e:
+            print(f"Failed to write the result cache: {e}")
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the hit and miss counters.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses
+        }
@@ -2,6 +2,8 @@
 Module for CRUD operations on the suggestion collection.
 """
 
+from pymongo import ASCENDING, HASHED, IndexModel
+
 from src.storage.mongodb import CRUDDocuments
 
 
@@ -9,6 +11,10 @@ class CRUDSuggestionCollection(CRUDDocuments):
     """
     A class to handle CRUD operations for the suggestion collection in the MongoDB database.
     """
+    indexes = [
+        IndexModel([("Id", ASCENDING)], name="Id_unique", unique=True),
+        IndexModel([("question", HASHED)], name="question_hashed")
+    ]
 
     def __init__(self):
         """
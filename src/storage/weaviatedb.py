@@ -4,22 +4,36 @@ for managing a vector store using Weaviate and LlamaIndex.
 """
 
 import os
-from typing import List, Optional
+import copy
+import json
+import time
+import random
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
 from dotenv import load_dotenv
+import openai
 import weaviate
+from weaviate.classes.query import Filter
 from llama_index.core import VectorStoreIndex, StorageContext
 from llama_index.vector_stores.weaviate import WeaviateVectorStore
+from llama_index.vector_stores.weaviate.utils import add_node
 from llama_index.core.schema import (
     Document,
     TextNode,
     NodeRelationship,
     RelatedNodeInfo,
     ObjectType,
+    MetadataMode,
 )
 from llama_index.core.node_parser import SentenceSplitter
 from llama_index.storage.docstore.mongodb import MongoDocumentStore
 from scrapegraphai.graphs import SmartScraperGraph
 
+from src.storage.result_cache import MongoResultCache
+from src.storage.knowledge_index import KnowledgeRefIndex
+from src.storage.collection_alias import CollectionAliases
 from src.utils.utility import convert_value
 from src.prompt.loader_prompt import URL_SPLITER_PROMPT
 
@@ -33,6 +47,49 @@ MONGODB_URL = convert_value(os.getenv("MONGODB_URL"))
 MONGODB_NAME = convert_value(os.getenv("MONGODB_NAME"))
 OPENAI_MODEL = convert_value(os.getenv("OPENAI_MODEL"))
 OPENAI_EMBED_MODEL = convert_value(os.getenv("OPENAI_EMBED_MODEL"))
+SESSION_SPLIT_CONCURRENCY = convert_value(
+    os.getenv("SESSION_SPLIT_CONCURRENCY", "8"))
+SESSION_SPLIT_MAX_RETRIES = convert_value(
+    os.getenv("SESSION_SPLIT_MAX_RETRIES", "5"))
+SESSION_SPLIT_BACKOFF_S = convert_value(
+    os.getenv("SESSION_SPLIT_BACKOFF_S", "1"))
+SESSION_SPLIT_MAX_BACKOFF_S = convert_value(
+    os.getenv("SESSION_SPLIT_MAX_BACKOFF_S", "60"))
+SESSION_CACHE_ENABLED = convert_value(
+    os.getenv("SESSION_CACHE_ENABLED", "true"))
+SESSION_CACHE_COLLECTION = convert_value(
+    os.getenv("SESSION_CACHE_COLLECTION", "session_split_cache"))
+SESSION_SPLIT_PROMPT_VERSION = convert_value(
+    os.getenv("SESSION_SPLIT_PROMPT_VERSION", "1"))
+SESSION_SPLIT_TEMPERATURE = 0.1
+WEAVIATE_IMPORT_MODE = convert_value(
+    os.getenv("WEAVIATE_IMPORT_MODE", "fixed"))
+WEAVIATE_BATCH_SIZE = convert_value(os.getenv("WEAVIATE_BATCH_SIZE", "100"))
+WEAVIATE_BATCH_CONCURRENCY = convert_value(
+    os.getenv("WEAVIATE_BATCH_CONCURRENCY", "2"))
+EMBED_BATCH_SIZE = convert_value(os.getenv("EMBED_BATCH_SIZE", "100"))
+EMBED_CONCURRENCY = convert_value(os.getenv("EMBED_CONCURRENCY", "4"))
+WEAVIATE_DELETE_BATCH_SIZE = convert_value(
+    os.getenv("WEAVIATE_DELETE_BATCH_SIZE", "200"))
+WEAVIATE_QUERY_MAXIMUM_RESULTS = convert_value(
+    os.getenv("WEAVIATE_QUERY_MAXIMUM_RESULTS", "10000"))
+VOLATILE_METADATA_KEYS = (
+    "file_path",
+    "file_size",
+    "creation_date",
+    "last_modified_date",
+    "last_accessed_date",
+)
+KNOWLEDGE_REFS_COLLECTION = convert_value(
+    os.getenv("KNOWLEDGE_REFS_COLLECTION", "knowledge_refs"))
+COLLECTION_ALIASES_COLLECTION = convert_value(
+    os.getenv("COLLECTION_ALIASES_COLLECTION", "collection_aliases"))
+RETRYABLE_SPLIT_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
 
 
 class WeaviateDB:
@@ -48,16 +105,31 @@ class WeaviateDB:
         suggestion_name: str = SUGGESTION_NAME,
         mongodb_url: str = MONGODB_URL,
         mongodb_name: str = MONGODB_NAME,
-        documents: List[Document] = None
+        documents: List[Document] = None,
+        split_concurrency: int = SESSION_SPLIT_CONCURRENCY,
+        session_cache: bool = SESSION_CACHE_ENABLED,
+        import_mode: str = WEAVIATE_IMPORT_MODE
     ):
         """
         Initializes the WeaviateDB class with the specified host, port
         and index name for the Weaviate instance,
         and optionally a list of documents.
+
+        The session splitting LLM calls of every file share one pool of
+        split_concurrency threads, which bounds the load put on the LLM API.
+        With session_cache, the sessions of each page are kept in MongoDB so an
+        unchanged page is never split twice.
+
+        import_mode selects how insert_nodes writes to Weaviate: "index" goes through
+        VectorStoreIndex.insert_nodes, "fixed" and "dynamic" embed the nodes in
+        parallel and use the Weaviate batch API of the same name.
+
+        index_name is an alias: the knowledge is served from the collection it points
+        at, which a rebuild switches to a new versioned collection.
         """
         self._host = host
         self._port = port
-        self._index_name = index_name
+        self._alias = index_name
         self._suggestion_name = suggestion_name
         self._documents = documents
         self._mongodb_url = mongodb_url
@@ -66,34 +138,46 @@ class WeaviateDB:
             host=self._host,
             port=self._port
         )
-        self._vector_store = WeaviateVectorStore(
-            weaviate_client=self._client,
-            index_name=self._index_name
+        self._aliases = CollectionAliases(
+            mongodb_url=self._mongodb_url,
+            mongodb_name=self._mongodb_name,
+            collection_name=COLLECTION_ALIASES_COLLECTION
         )
         self._suggestion_vector_store = WeaviateVectorStore(
             weaviate_client=self._client,
             index_name=self._suggestion_name
         )
-        self._storage_context = StorageContext.from_defaults(
-            docstore=MongoDocumentStore.from_uri(
-                uri=self._mongodb_url,
-                db_name=self._mongodb_name
-            ),
-            vector_store=self._vector_store
-        )
         self._suggestion_storage_context = StorageContext.from_defaults(
             vector_store=self._suggestion_vector_store
         )
         self.parser = SentenceSplitter()
+        self._split_executor = ThreadPoolExecutor(
+            max_workers=max(1, split_concurrency),
+            thread_name_prefix="session-split"
+        )
+        self._import_mode = import_mode
+        # The batch API of the client keeps one current batch and one list of
+        # failed objects, so imports that share the client must not overlap
+        self._batch_lock = threading.Lock()
+        self._embed_executor = ThreadPoolExecutor(
+            max_workers=max(1, EMBED_CONCURRENCY),
+            thread_name_prefix="embed"
+        )
+        self._session_cache = None
+        if session_cache:
+            self._session_cache = MongoResultCache(
+                mongodb_url=self._mongodb_url,
+                mongodb_name=self._mongodb_name,
+                collection_name=SESSION_CACHE_COLLECTION
+            )
+        self._bind_collection(
+            collection_name=self._aliases.resolve(self._alias)
+        )
         if self._documents:
             self._index = VectorStoreIndex.from_documents(
                 documents=self._documents,
                 storage_context=self._storage_context
             )
-        else:
-            self._index = VectorStoreIndex.from_vector_store(
-                vector_store=self._vector_store
-            )
         self._suggestion_index = VectorStoreIndex.from_vector_store(
             vector_store=self._suggestion_vector_store
         )
@@ -112,6 +196,149 @@ class WeaviateDB:
         """
         return self._index
 
+    @property
+    def alias(self) -> str:
+        """
+        Provides the alias the knowledge collection is served under.
+        """
+        return self._alias
+
+    @property
+    def collection_name(self) -> str:
+        """
+        Provides the name of the Weaviate collection the knowledge is served from.
+        """
+        return self._index_name
+
+    def _bind_collection(
+        self,
+        collection_name: str
+    ) -> None:
+        """
+        Binds the vector store, document store, index and knowledge reference index
+        to a Weaviate collection, creating the collection if it does not exist.
+
+        The collection named like the alias keeps the default document store namespace
+        and knowledge reference collection. Versioned collections get their own, so
+        that rebuilding one never touches the data of another.
+
+        Args:
+            collection_name (str): The name of the Weaviate collection.
+
+        Returns:
+            None
+        """
+        versioned = collection_name != self._alias
+        vector_store = WeaviateVectorStore(
+            weaviate_client=self._client,
+            index_name=collection_name
+        )
+        storage_context = StorageContext.from_defaults(
+            docstore=MongoDocumentStore.from_uri(
+                uri=self._mongodb_url,
+                db_name=self._mongodb_name,
+                namespace=collection_name if versioned else None
+            ),
+            vector_store=vector_store
+        )
+        knowledge_refs = KnowledgeRefIndex(
+            mongodb_url=self._mongodb_url,
+            mongodb_name=self._mongodb_name,
+            collection_name=(f"{KNOWLEDGE_REFS_COLLECTION}_{collection_name}"
+                             if versioned else KNOWLEDGE_REFS_COLLECTION)
+        )
+        index = VectorStoreIndex.from_vector_store(
+            vector_store=vector_store
+        )
+        self._index_name = collection_name
+        self._vector_store = vector_store
+        self._storage_context = storage_context
+        self._knowledge_refs = knowledge_refs
+        self._index = index
+
+    def for_collection(
+        self,
+        collection_name: str
+    ) -> "WeaviateDB":
+        """
+        Creates a WeaviateDB bound to another collection, sharing the client,
+        the executors and the caches of this one. It is used to build a new
+        version of the knowledge base next to the one being served.
+
+        Args:
+            collection_name (str): The name of the Weaviate collection.
+
+        Returns:
+            WeaviateDB: The WeaviateDB of the collection.
+        """
+        other = copy.copy(self)
+        other._bind_collection(collection_name=collection_name)
+        return other
+
+    def switch_to(
+        self,
+        other: "WeaviateDB"
+    ) -> str:
+        """
+        Points the alias at the collection of another WeaviateDB and serves it
+        from now on.
+
+        Args:
+            other (WeaviateDB): The WeaviateDB returned by for_collection.
+
+        Returns:
+            str: The name of the collection served before.
+        """
+        previous = self._aliases.switch(
+            alias=self._alias,
+            collection=other.collection_name
+        )
+        self._index_name = other._index_name
+        self._vector_store = other._vector_store
+        self._storage_context = other._storage_context
+        self._knowledge_refs = other._knowledge_refs
+        self._index = other._index
+        return previous
+
+    def count_objects(self) -> int:
+        """
+        Counts the objects of the bound Weaviate collection.
+
+        Returns:
+            int: The number of objects.
+        """
+        collection = self._client.collections.get(self._index_name)
+        return collection.aggregate.over_all(total_count=True).total_count
+
+    def count_recorded_nodes(self) -> Dict[str, int]:
+        """
+        Counts the nodes recorded in the knowledge reference index for each file.
+
+        Returns:
+            Dict[str, int]: The number of nodes, keyed by public ID.
+        """
+        return self._knowledge_refs.count_nodes()
+
+    def drop(self) -> None:
+        """
+        Deletes the bound Weaviate collection, its document store namespace and its
+        knowledge reference index. Used to garbage-collect a collection that is
+        no longer served.
+
+        Returns:
+            None
+        """
+        if self._client.collections.exists(self._index_name):
+            self.delete_collection(collection_name=self._index_name)
+        docstore = self._storage_context.docstore
+        database = getattr(getattr(docstore, "_kvstore", None), "_db", None)
+        if database is not None:
+            for name in (docstore._node_collection,
+                         docstore._ref_doc_collection,
+                         docstore._metadata_collection):
+                database.drop_collection(name)
+        self._knowledge_refs.drop()
+
     @property
     def client(self) -> weaviate:
         """
@@ -265,7 +492,7 @@ class WeaviateDB:
         graph_config = {
             "llm": {
                 "model": OPENAI_MODEL,
-                "temperature": 0.1,
+                "temperature": SESSION_SPLIT_TEMPERATURE,
             },
             # "embeddings": {
             #     "model": OPENAI_EMBED_MODEL,
@@ -280,6 +507,106 @@ class WeaviateDB:
             config=graph_config,
         )
 
+    def split_sessions(
+        self,
+        text: str
+    ) -> List[Dict[str, Any]]:
+        """
+        Splits the text of a document into sessions with the LLM, retrying with
+        exponential backoff when the API is rate limited or unavailable.
+
+        Args:
+            text (str): The text of the document.
+
+        Returns:
+            List[Dict[str, Any]]: The sessions, as dicts with a title and a content.
+        """
+        for attempt in range(SESSION_SPLIT_MAX_RETRIES + 1):
+            try:
+                splitter = self.get_sessions_splitter(text)
+                # splitted_text_list = [{'title': 'Title A', 'content': 'content A'}]
+                return splitter.run()["sessions"]
+            except RETRYABLE_SPLIT_ERRORS as e:
+                if attempt == SESSION_SPLIT_MAX_RETRIES:
+                    raise
+                delay = min(SESSION_SPLIT_MAX_BACKOFF_S,
+                            SESSION_SPLIT_BACKOFF_S * 2 ** attempt)
+                response = getattr(e, "response", None)
+                retry_after = response.headers.get(
+                    "retry-after") if response is not None else None
+                try:
+                    delay = max(delay, float(retry_after))
+                except (TypeError, ValueError):
+                    pass
+                delay += random.uniform(0, delay / 2)
+                print(f"Session splitting failed ({type(e).__name__}), "
+                      f"retrying in {delay:.1f}s")
+                time.sleep(delay)
+        return []
+
+    def session_cache_key(
+        self,
+        text: str
+    ) -> str:
+        """
+        Makes the session cache key of a page. It changes with the text, the prompt
+        and the model, so editing any of them re-splits the page.
+
+        Args:
+            text (str): The text of the page.
+
+        Returns:
+            str: The cache key.
+        """
+        return MongoResultCache.make_key(
+            SESSION_SPLIT_PROMPT_VERSION,
+            URL_SPLITER_PROMPT,
+            OPENAI_MODEL,
+            SESSION_SPLIT_TEMPERATURE,
+            text
+        )
+
+    def split_documents_sessions(
+        self,
+        texts: List[str]
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Splits several pages into sessions. Only the pages missing from the session
+        cache are sent to the LLM, each distinct text once and concurrently.
+
+        Args:
+            texts (List[str]): The texts of the pages.
+
+        Returns:
+            List[List[Dict[str, Any]]]: The sessions of each page, in the order of texts.
+        """
+        if self._session_cache is None:
+            return list(self._split_executor.map(self.split_sessions, texts))
+        keys = [self.session_cache_key(text) for text in texts]
+        sessions_by_key = self._session_cache.get_many(keys)
+        reused = sum(key in sessions_by_key for key in keys)
+        missing = {key: text for key, text in zip(keys, texts)
+                   if key not in sessions_by_key}
+        futures = {
+            key: self._split_executor.submit(self.split_sessions, text)
+            for key, text in missing.items()
+        }
+        split, error = {}, None
+        for key, future in futures.items():
+            try:
+                split[key] = future.result()
+            except Exception as e:  # pylint: disable=broad-except
+                error = error or e
+        # Keep the pages that were split even if another one failed,
+        # so that retrying the file only re-splits the failed pages
+        self._session_cache.set_many(split)
+        if error is not None:
+            raise error
+        sessions_by_key.update(split)
+        print(f"Session splitting: {reused} of {len(texts)} "
+              f"pages reused from the cache")
+        return [sessions_by_key[key] for key in keys]
+
     def documents_to_nodes_by_sessions(
         self, documents: List[Document]
     ) -> List[TextNode]:
@@ -288,6 +615,9 @@ class WeaviateDB:
         objects splitted by sessions using ScrapeGraph:
         https://github.com/ScrapeGraphAI/Scrapegraph-ai.
 
+        The documents are split concurrently, or taken from the session cache,
+        then their nodes are linked in the order of the documents.
+
         Args:
             documents (List[Document]): A list of Document objects to be
                                         converted into TextNode objects.
@@ -296,78 +626,94 @@ class WeaviateDB:
             List[TextNode]: A list of TextNode objects splitted by sessions.
             derived from the given documents.
         """
+        sessions_of_docs = self.split_documents_sessions(
+            texts=[doc.text for doc in documents]
+        )
         nodes_of_docs = []
-        for doc in documents:
-            splitter = self.get_sessions_splitter(doc.text)
-            # splitted_text_list = [{'title': 'Title A', 'content': 'content A'}]
-            splitted_text_list = splitter.run()
-            # print(splitted_text_list)
-            splitted_text_list = splitted_text_list["sessions"]
-
-            # Add each TextNode to list nodes
-            nodes = []
-            for text_dict in splitted_text_list:
-                title = text_dict["title"]
-                content = text_dict["content"]
-                node = TextNode(text=title + "\n" + content)
-                nodes.append(node)
-
-            # Add relationship throughout TextNodes
-            for i, node in enumerate(nodes):
-                # Add source relationship
-                node.relationships[NodeRelationship.SOURCE] = RelatedNodeInfo(
-                    node_id=doc.id_,
-                    node_type=ObjectType.DOCUMENT,
-                    metadata=doc.metadata,
-                    hash=doc.hash,
-                )
+        for doc, splitted_text_list in zip(documents, sessions_of_docs):
+            nodes_of_docs.extend(self.sessions_to_nodes(
+                doc=doc,
+                splitted_text_list=splitted_text_list
+            ))
+        return nodes_of_docs
 
-                if len(nodes) == 1:  # If there is only 1 nodes --> pass
-                    pass
+    def sessions_to_nodes(
+        self,
+        doc: Document,
+        splitted_text_list: List[Dict[str, Any]]
+    ) -> List[TextNode]:
+        """
+        Builds the TextNode objects of a document's sessions and links them to
+        the document and to each other.
 
-                if i == 0:  # If it is Start node, add next node relationship
-                    node.relationships[NodeRelationship.NEXT] = RelatedNodeInfo(
-                        node_id=nodes[i + 1].node_id,
-                        node_type=ObjectType.TEXT,
-                        hash=nodes[i + 1].hash,
-                    )
+        Args:
+            doc (Document): The document the sessions were split from.
+            splitted_text_list (List[Dict[str, Any]]): The sessions of the document.
 
-                elif (
-                    i == len(nodes) - 1
-                ):  # If it is End node, add previous node relationship
-                    node.relationships[NodeRelationship.PREVIOUS] = RelatedNodeInfo(
-                        node_id=nodes[i - 1].node_id,
-                        node_type=ObjectType.TEXT,
-                        hash=nodes[i - 1].hash,
-                    )
+        Returns:
+            List[TextNode]: The nodes of the document, in session order.
+        """
+        # Add each TextNode to list nodes
+        nodes = []
+        for text_dict in splitted_text_list:
+            title = text_dict["title"]
+            content = text_dict["content"]
+            node = TextNode(text=title + "\n" + content)
+            nodes.append(node)
 
-                else:  # Add both previous node and next node relationship for remaining nodes
-                    node.relationships[NodeRelationship.PREVIOUS] = RelatedNodeInfo(
-                        node_id=nodes[i - 1].node_id,
-                        node_type=ObjectType.TEXT,
-                        hash=nodes[i - 1].hash,
-                    )
-                    node.relationships[NodeRelationship.NEXT] = RelatedNodeInfo(
-                        node_id=nodes[i + 1].node_id,
-                        node_type=ObjectType.TEXT,
-                        hash=nodes[i + 1].hash,
-                    )
+        # Add relationship throughout TextNodes
+        for i, node in enumerate(nodes):
+            # Add source relationship
+            node.relationships[NodeRelationship.SOURCE] = RelatedNodeInfo(
+                node_id=doc.id_,
+                node_type=ObjectType.DOCUMENT,
+                metadata=doc.metadata,
+                hash=doc.hash,
+            )
 
-                # Add metadata
-                node.metadata = doc.metadata
-                # doc.metadata.update({"tiêu đề": title})
-                node.excluded_embed_metadata_keys = doc.excluded_embed_metadata_keys
-                node.excluded_llm_metadata_keys = doc.excluded_llm_metadata_keys
+            if len(nodes) == 1:  # If there is only 1 nodes --> pass
+                pass
 
-            # Extend the nodes_of_docs list including nodes from multiple documents
-            nodes_of_docs.extend(nodes)
+            elif i == 0:  # If it is Start node, add next node relationship
+                node.relationships[NodeRelationship.NEXT] = RelatedNodeInfo(
+                    node_id=nodes[i + 1].node_id,
+                    node_type=ObjectType.TEXT,
+                    hash=nodes[i + 1].hash,
+                )
 
-        return nodes_of_docs
+            elif (
+                i == len(nodes) - 1
+            ):  # If it is End node, add previous node relationship
+                node.relationships[NodeRelationship.PREVIOUS] = RelatedNodeInfo(
+                    node_id=nodes[i - 1].node_id,
+                    node_type=ObjectType.TEXT,
+                    hash=nodes[i - 1].hash,
+                )
+
+            else:  # Add both previous node and next node relationship for remaining nodes
+                node.relationships[NodeRelationship.PREVIOUS] = RelatedNodeInfo(
+                    node_id=nodes[i - 1].node_id,
+                    node_type=ObjectType.TEXT,
+                    hash=nodes[i - 1].hash,
+                )
+                node.relationships[NodeRelationship.NEXT] = RelatedNodeInfo(
+                    node_id=nodes[i + 1].node_id,
+                    node_type=ObjectType.TEXT,
+                    hash=nodes[i + 1].hash,
+                )
+
+            # Add metadata
+            node.metadata = doc.metadata
+            # doc.metadata.update({"tiêu đề": title})
+            node.excluded_embed_metadata_keys = doc.excluded_embed_metadata_keys
+            node.excluded_llm_metadata_keys = doc.excluded_llm_metadata_keys
+
+        return nodes
 
     def insert_nodes(
         self,
         nodes: List[TextNode]
-    ) -> str:
+    ) -> Optional[Dict[str, float]]:
         """
         Adds a list of nodes into the vector store.
 
@@ -375,10 +721,106 @@ class WeaviateDB:
             nodes (List[Node]): List of nodes to be added.
 
         Returns:
-            None
+            Optional[Dict[str, float]]: The import report of batch_import_nodes,
+                                        or None in "index" mode.
         """
-        if nodes:
+        if not nodes:
+            return None
+        if self._import_mode == "index":
             self._index.insert_nodes(nodes=nodes)
+            return None
+        return self.batch_import_nodes(nodes=nodes)
+
+    def embed_nodes(
+        self,
+        nodes: List[TextNode]
+    ) -> None:
+        """
+        Embeds the nodes that have no embedding yet, EMBED_BATCH_SIZE nodes per
+        request and EMBED_CONCURRENCY requests at a time.
+
+        Args:
+            nodes (List[TextNode]): The nodes to embed. Their embedding is set in place.
+
+        Returns:
+            None
+        """
+        nodes = [node for node in nodes if node.embedding is None]
+        batches = [nodes[start:start + EMBED_BATCH_SIZE]
+                   for start in range(0, len(nodes), EMBED_BATCH_SIZE)]
+        embed_model = self._index._embed_model
+        embeddings = self._embed_executor.map(
+            lambda batch: embed_model.get_text_embedding_batch(
+                [node.get_content(metadata_mode=MetadataMode.EMBED)
+                 for node in batch]),
+            batches
+        )
+        for batch, batch_embeddings in zip(batches, embeddings):
+            for node, embedding in zip(batch, batch_embeddings):
+                node.embedding = embedding
+
+    def batch_import_nodes(
+        self,
+        nodes: List[TextNode]
+    ) -> Dict[str, float]:
+        """
+        Embeds the nodes in parallel and writes them with the Weaviate batch API,
+        which sends WEAVIATE_BATCH_SIZE objects per request over gRPC.
+
+        The embedding runs concurrently with other imports, the write holds the
+        batch lock of the client.
+
+        Args:
+            nodes (List[TextNode]): The nodes to import.
+
+        Raises:
+            RuntimeError: If Weaviate rejected any of the objects.
+
+        Returns:
+            Dict[str, float]: The number of objects, failed objects, seconds spent
+                              embedding and writing, and objects written per second.
+        """
+        start = time.perf_counter()
+        self.embed_nodes(nodes=nodes)
+        embedded = time.perf_counter()
+        with self._batch_lock:
+            if self._import_mode == "dynamic":
+                batch_context = self._client.batch.dynamic()
+            else:
+                batch_context = self._client.batch.fixed_size(
+                    batch_size=WEAVIATE_BATCH_SIZE,
+                    concurrent_requests=WEAVIATE_BATCH_CONCURRENCY
+                )
+            with batch_context as batch:
+                for node in nodes:
+                    add_node(
+                        self._client,
+                        node,
+                        self._index_name,
+                        batch=batch,
+                        text_key=self._vector_store.text_key
+                    )
+            failed_objects = list(self._client.batch.failed_objects)
+        written = time.perf_counter()
+        report = {
+            "objects": len(nodes),
+            "failed": len(failed_objects),
+            "embed_seconds": embedded - start,
+            "write_seconds": written - embedded,
+            "objects_per_second": len(nodes) / max(written - start, 1e-9)
+        }
+        print(f"Imported {report['objects'] - report['failed']} of {report['objects']} "
+              f"objects into {self._index_name} at "
+              f"{report['objects_per_second']:.1f} objects/s "
+              f"(embedding {report['embed_seconds']:.2f}s, "
+              f"writing {report['write_seconds']:.2f}s)")
+        if failed_objects:
+            for failed_object in failed_objects[:5]:
+                print(f"Failed object: {failed_object.message}")
+            raise RuntimeError(
+                f"Weaviate rejected {len(failed_objects)} of {len(nodes)} objects "
+                f"imported into {self._index_name}: {failed_objects[0].message}")
+        return report
 
     def delete_nodes(
         self,
@@ -398,6 +840,41 @@ class WeaviateDB:
                 ref_doc_id=ref_doc_id
             )
 
+    def delete_nodes_many(
+        self,
+        ref_doc_ids: List[str] = None
+    ) -> int:
+        """
+        Deletes the nodes of several reference documents from the vector store with
+        one filtered delete per WEAVIATE_DELETE_BATCH_SIZE documents.
+
+        Args:
+            ref_doc_ids (List[str], optional): The reference document IDs to delete.
+
+        Returns:
+            int: The number of deleted objects.
+        """
+        if not ref_doc_ids:
+            return 0
+        collection = self._client.collections.get(self._index_name)
+        deleted = 0
+        for start in range(0, len(ref_doc_ids), WEAVIATE_DELETE_BATCH_SIZE):
+            batch = ref_doc_ids[start:start + WEAVIATE_DELETE_BATCH_SIZE]
+            while True:
+                result = collection.data.delete_many(
+                    where=Filter.by_property("ref_doc_id").contains_any(batch)
+                )
+                deleted += result.successful
+                if result.failed:
+                    print(f"Failed to delete {result.failed} objects from "
+                          f"{self._index_name}")
+                # A delete removes at most QUERY_MAXIMUM_RESULTS objects, repeat until
+                # a delete matches fewer than that
+                if (result.matches < WEAVIATE_QUERY_MAXIMUM_RESULTS
+                        or result.successful == 0):
+                    break
+        return deleted
+
     def insert_docstore(
         self,
         nodes: List[TextNode]
@@ -436,6 +913,183 @@ class WeaviateDB:
                 ref_doc_id=ref_doc_id
             )
 
+    def delete_docstore_many(
+        self,
+        ref_doc_ids: List[str] = None
+    ) -> None:
+        """
+        Deletes several reference documents and their nodes from the document store
+        with one delete per collection of the MongoDB key-value store.
+
+        Falls back to deleting the documents one by one when the document store is
+        not backed by MongoDB.
+
+        Args:
+            ref_doc_ids (List[str], optional): The reference document IDs to delete.
+
+        Returns:
+            None
+        """
+        if not ref_doc_ids:
+            return
+        docstore = self._storage_context.docstore
+        database = getattr(getattr(docstore, "_kvstore", None), "_db", None)
+        if database is None:
+            for ref_doc_id in ref_doc_ids:
+                self.delete_docstore(ref_doc_id=ref_doc_id)
+            return
+        ref_doc_collection = database[docstore._ref_doc_collection]
+        node_ids = []
+        for ref_doc_info in ref_doc_collection.find(
+            {"_id": {"$in": ref_doc_ids}},
+            {"node_ids": 1}
+        ):
+            node_ids.extend(ref_doc_info.get("node_ids", []))
+        database[docstore._node_collection].delete_many(
+            {"_id": {"$in": node_ids}})
+        database[docstore._metadata_collection].delete_many(
+            {"_id": {"$in": node_ids + ref_doc_ids}})
+        ref_doc_collection.delete_many({"_id": {"$in": ref_doc_ids}})
+
+    def build_knowledge_nodes(
+        self,
+        url: str = None,
+        file_type: str = None,
+        public_id: str = None,
+        file_name: str = None,
+        documents: List[Document] = None,
+    ) -> List[TextNode]:
+        """
+        Configures the metadata of a file's documents and splits them into session nodes.
+
+        Args:
+            url (str, optional): The URL of the file.
+            file_type (str, optional): The type of the file.
+            public_id (str, optional): The public ID of the file.
+            file_name (str, optional): The name of the file associated with the documents.
+            documents (List[Document], optional): The documents loaded from the file.
+
+        Returns:
+            List[TextNode]: The nodes to insert, or an empty list if there are no documents.
+        """
+        if not documents:
+            return []
+        processed_documents = self.configure_documents(
+            url=url,
+            file_type=file_type,
+            file_name=file_name,
+            public_id=public_id,
+            documents=documents,
+        )
+        # nodes = self.documents_to_nodes(documents=processed_documents)
+        return self.documents_to_nodes_by_sessions(
+            documents=processed_documents)
+
+    @staticmethod
+    def node_content_hash(
+        node: TextNode
+    ) -> str:
+        """
+        Hashes the text and metadata of a node, leaving out the file system metadata
+        that changes every time a file is downloaded.
+
+        Args:
+            node (TextNode): The node to hash.
+
+        Returns:
+            str: The hex digest of the node content.
+        """
+        metadata = {key: value for key, value in node.metadata.items()
+                    if key not in VOLATILE_METADATA_KEYS}
+        payload = json.dumps([node.text, metadata], ensure_ascii=False,
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def record_nodes(
+        self,
+        nodes: List[TextNode]
+    ) -> None:
+        """
+        Records the reference document ID and content hash of each node in the
+        knowledge reference index of its file.
+
+        Args:
+            nodes (List[TextNode]): The nodes about to be inserted.
+
+        Returns:
+            None
+        """
+        entries = {}
+        for node in nodes:
+            entries.setdefault(node.metadata.get("public_id"), {})[node.node_id] = {
+                "hash": self.node_content_hash(node),
+                "ref_doc_id": node.ref_doc_id
+            }
+        for public_id, file_nodes in entries.items():
+            self._knowledge_refs.add(
+                public_id=public_id,
+                ref_doc_ids={entry["ref_doc_id"] for entry in file_nodes.values()},
+                nodes=file_nodes
+            )
+
+    def insert_knowledge(
+        self,
+        nodes: List[TextNode] = None
+    ) -> None:
+        """
+        Inserts the nodes of a file into the vector store and the document store.
+
+        Args:
+            nodes (List[TextNode], optional): The nodes built by build_knowledge_nodes.
+
+        Returns:
+            None
+        """
+        if not nodes:
+            return
+        try:
+            print("Sucess!")
+            # Record the nodes of each file first, so that a file whose
+            # insert was interrupted can still be deleted by public_id
+            self.record_nodes(nodes=nodes)
+            try:
+                self.insert_nodes(nodes=nodes)
+            except Exception:
+                self.discard_nodes(nodes=nodes)
+                raise
+            self.insert_docstore(nodes=nodes)
+        except ConnectionError as e:
+            print("Error!")
+            print(e)
+
+    def discard_nodes(
+        self,
+        nodes: List[TextNode]
+    ) -> None:
+        """
+        Removes nodes whose import failed from the vector store and forgets them in
+        the knowledge reference index, so a later update does not take them for
+        indexed nodes.
+
+        Args:
+            nodes (List[TextNode]): The nodes passed to insert_nodes.
+
+        Returns:
+            None
+        """
+        self.delete_nodes_by_id(node_ids=[node.node_id for node in nodes])
+        node_ids = {}
+        for node in nodes:
+            node_ids.setdefault(node.metadata.get("public_id"), set()).add(node.node_id)
+        for public_id, discarded in node_ids.items():
+            stored = self._knowledge_refs.get_nodes(public_id=public_id) or {}
+            self._knowledge_refs.remove_nodes(
+                public_id=public_id,
+                node_ids=discarded,
+                ref_doc_ids={entry["ref_doc_id"] for node_id, entry in stored.items()
+                             if node_id not in discarded}
+            )
+
     def add_knowledge(
         self,
         url: str = None,
@@ -455,25 +1109,41 @@ class WeaviateDB:
         Returns:
             None
         """
-        if documents:
-            processed_documents = self.configure_documents(
-                url=url,
-                file_type=file_type,
-                file_name=file_name,
-                public_id=public_id,
-                documents=documents,
-            )
-            # nodes = self.documents_to_nodes(documents=processed_documents)
-            nodes = self.documents_to_nodes_by_sessions(
-                documents=processed_documents)
-            # print(nodes)
-            try:
-                print("Sucess!")
-                self.insert_nodes(nodes=nodes)
-                self.insert_docstore(nodes=nodes)
-            except ConnectionError as e:
-                print("Error!")
-                print(e)
+        nodes = self.build_knowledge_nodes(
+            url=url,
+            file_type=file_type,
+            public_id=public_id,
+            file_name=file_name,
+            documents=documents,
+        )
+        self.insert_knowledge(nodes=nodes)
+
+    def find_ref_doc_ids(
+        self,
+        public_id: str = None
+    ) -> List[str]:
+        """
+        Finds the reference document IDs of a file.
+
+        They are read from the knowledge reference index. Files indexed before the
+        index existed are not in it, so for them the document store is scanned.
+
+        Args:
+            public_id (str, optional): The public ID of the file.
+
+        Returns:
+            List[str]: The reference document IDs of the file's nodes.
+        """
+        ref_doc_ids = self._knowledge_refs.get(public_id=public_id)
+        if ref_doc_ids is not None:
+            return ref_doc_ids
+        print(f"public_id {public_id} is not in the knowledge reference index, "
+              f"scanning the document store")
+        ref_doc_ids = set()
+        for _, node in self._storage_context.docstore.docs.items():
+            if node.metadata.get("public_id") == public_id:
+                ref_doc_ids.add(node.ref_doc_id)
+        return list(ref_doc_ids)
 
     def delete_knowlegde(
         self,
@@ -486,20 +1156,104 @@ class WeaviateDB:
             file_name (str, optional): The name of the file associated with the documents
                                        to be deleted. If None, no action is taken.
         """
-        ref_doc_ids = []
-        for _, node in self._storage_context.docstore.docs.items():
-            if (
-                node.metadata.get("public_id") == public_id
-                and node.ref_doc_id not in ref_doc_ids
-            ):
-                self.delete_nodes(ref_doc_id=node.ref_doc_id)
-                print(
-                    f"delete node with ref_doc_id {node.ref_doc_id} successfully ")
-                self.delete_docstore(ref_doc_id=node.ref_doc_id)
-                print(
-                    f"delete doc from docstore with ref_doc_id {node.ref_doc_id} successfully "
-                )
-                ref_doc_ids.append(node.ref_doc_id)
+        ref_doc_ids = self.find_ref_doc_ids(public_id=public_id)
+        deleted = self.delete_nodes_many(ref_doc_ids=ref_doc_ids)
+        print(f"delete {deleted} nodes of {len(ref_doc_ids)} ref_doc_ids successfully")
+        self.delete_docstore_many(ref_doc_ids=ref_doc_ids)
+        print(f"delete {len(ref_doc_ids)} docs from docstore successfully")
+        self._knowledge_refs.remove(public_id=public_id)
+
+    def delete_nodes_by_id(
+        self,
+        node_ids: List[str] = None
+    ) -> None:
+        """
+        Deletes single nodes from the vector store and the document store.
+
+        Args:
+            node_ids (List[str], optional): The IDs of the nodes to delete.
+
+        Returns:
+            None
+        """
+        if not node_ids:
+            return
+        collection = self._client.collections.get(self._index_name)
+        for start in range(0, len(node_ids), WEAVIATE_DELETE_BATCH_SIZE):
+            batch = node_ids[start:start + WEAVIATE_DELETE_BATCH_SIZE]
+            result = collection.data.delete_many(
+                where=Filter.by_id().contains_any(batch)
+            )
+            if result.failed:
+                print(f"Failed to delete {result.failed} objects from "
+                      f"{self._index_name}")
+        for node_id in node_ids:
+            self._storage_context.docstore.delete_document(
+                node_id, raise_error=False)
+
+    def sync_knowledge(
+        self,
+        public_id: str = None,
+        nodes: List[TextNode] = None,
+        indexed: bool = True
+    ) -> Dict[str, int]:
+        """
+        Brings the indexed nodes of a re-uploaded file up to date with its new nodes.
+
+        Nodes whose content hash is already indexed are kept as they are. Only new or
+        changed nodes are embedded and inserted, and nodes that are no longer in the
+        file are deleted. The PREVIOUS/NEXT links of the inserted nodes are pointed at
+        the kept nodes; the kept nodes keep the links they were indexed with.
+
+        Files indexed before node hashes were recorded are fully re-indexed.
+        Concurrent syncs of the same file must be serialized by the caller.
+
+        Args:
+            public_id (str, optional): The public ID of the file.
+            nodes (List[TextNode], optional): The nodes built by build_knowledge_nodes.
+            indexed (bool, optional): Whether the file may be indexed. If not, and no
+                nodes are recorded for it, the nodes are inserted without looking for
+                old ones to delete, which would scan the whole document store.
+
+        Returns:
+            Dict[str, int]: The number of kept, inserted and deleted nodes.
+        """
+        nodes = nodes or []
+        stored = self._knowledge_refs.get_nodes(public_id=public_id)
+        if stored is None:
+            if indexed:
+                self.delete_knowlegde(public_id=public_id)
+            self.insert_knowledge(nodes=nodes)
+            return {"kept": 0, "inserted": len(nodes), "deleted": 0}
+        stored_by_hash = {}
+        for node_id, entry in stored.items():
+            stored_by_hash.setdefault(entry["hash"], []).append(node_id)
+        kept, new_nodes = {}, []
+        for node in nodes:
+            same_nodes = stored_by_hash.get(self.node_content_hash(node))
+            if same_nodes:
+                kept[node.node_id] = same_nodes.pop()
+            else:
+                new_nodes.append(node)
+        vanished = [node_id for node_ids in stored_by_hash.values()
+                    for node_id in node_ids]
+        for node in new_nodes:
+            for relationship in (NodeRelationship.PREVIOUS, NodeRelationship.NEXT):
+                related = node.relationships.get(relationship)
+                if related is not None and related.node_id in kept:
+                    related.node_id = kept[related.node_id]
+        self.insert_knowledge(nodes=new_nodes)
+        self.delete_nodes_by_id(node_ids=vanished)
+        remaining = set(kept.values())
+        self._knowledge_refs.remove_nodes(
+            public_id=public_id,
+            node_ids=vanished,
+            ref_doc_ids={stored[node_id]["ref_doc_id"] for node_id in remaining}
+            | {node.ref_doc_id for node in new_nodes}
+        )
+        print(f"Synced {public_id}: kept {len(kept)}, inserted {len(new_nodes)}, "
+              f"deleted {len(vanished)} nodes")
+        return {"kept": len(kept), "inserted": len(new_nodes), "deleted": len(vanished)}
 
     def delete_collection(
         self,
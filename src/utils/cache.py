@@ -0,0 +1,135 @@
+"""
+This module provides an in-memory LRU cache with optional expiry and invalidation.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """
+    A thread-safe least-recently-used cache with an optional time-to-live.
+
+    When a version function is given, it is polled at most every
+    ``check_interval`` seconds and the cache is cleared whenever the
+    returned value changes.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: Optional[float] = None,
+        version_func: Optional[Callable[[], Hashable]] = None,
+        check_interval: float = 60
+    ) -> None:
+        """
+        Initializes the cache.
+
+        Args:
+            max_size (int, optional): The maximum number of entries.
+            ttl (Optional[float], optional): Seconds after which an entry expires.
+                                             None keeps entries until evicted.
+            version_func (Optional[Callable[[], Hashable]], optional): Returns a value
+                that changes whenever the cached data becomes stale.
+            check_interval (float, optional): Minimum seconds between two version checks.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._version_func = version_func
+        self._check_interval = check_interval
+        self._version = version_func() if version_func else None
+        self._checked_at = time.monotonic()
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _check_version(self) -> None:
+        """
+        Clears the cache if the version has changed since the last check.
+        """
+        now = time.monotonic()
+        if self._version_func is None or now - self._checked_at < self._check_interval:
+            return
+        self._checked_at = now
+        version = self._version_func()
+        if version != self._version:
+            self._version = version
+            self._data.clear()
+            self.invalidations += 1
+
+    def get(
+        self,
+        key: Hashable,
+        default: Any = None
+    ) -> Any:
+        """
+        Retrieves an entry and marks it as recently used.
+
+        Args:
+            key (Hashable): The key of the entry.
+            default (Any, optional): The value returned on a miss.
+
+        Returns:
+            Any: The cached value, or default.
+        """
+        with self._lock:
+            self._check_version()
+            item = self._data.get(key)
+            if item is not None:
+                value, expires_at = item
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any
+    ) -> None:
+        """
+        Stores an entry, evicting the least recently used ones when full.
+
+        Args:
+            key (Hashable): The key of the entry.
+            value (Any): The value to store.
+        """
+        if self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Removes every entry.
+        """
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the size and the hit, miss and invalidation counters.
+        """
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations
+        }
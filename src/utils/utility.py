@@ -2,8 +2,10 @@
 this module provides utility functions
 """
 
+import os
 import json
-from typing import Optional, List
+import hashlib
+from typing import Any, Optional, List
 from datetime import datetime
 import uuid
 import time
@@ -124,3 +126,41 @@ def format_document(
         source=cleaned_source
     )
     return cleaned_document
+
+
+def compute_fingerprint(
+    paths: List[str],
+    *objects: Any
+) -> str:
+    """
+    Computes a fingerprint that changes when a file or a configuration object changes.
+
+    Args:
+        paths (List[str]): Files or directories whose size and modification time are hashed.
+                           For a directory, every file inside it is hashed, so replacing
+                           e.g. a weight file is detected. Paths that do not exist
+                           (e.g. hub model ids) are hashed as strings.
+        *objects (Any): JSON-serializable objects hashed by content.
+
+    Returns:
+        str: The hexadecimal SHA-256 fingerprint.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(str(path).encode("utf-8"))
+        if not path or not os.path.exists(path):
+            continue
+        files = [path]
+        if os.path.isdir(path):
+            files = sorted(os.path.join(root, name)
+                           for root, _, names in os.walk(path)
+                           for name in names)
+        for file_path in files:
+            stat = os.stat(file_path)
+            digest.update(f"{os.path.relpath(file_path, path)}:"
+                          f"{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+    digest.update(json.dumps(objects,
+                             sort_keys=True,
+                             ensure_ascii=False,
+                             default=str).encode("utf-8"))
+    return digest.hexdigest()
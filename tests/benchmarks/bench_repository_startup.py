@@ -0,0 +1,187 @@
+"""
+Measures repository startup time and RSS against a chat collection seeded with 1M records.
+
+Every measurement runs in a fresh interpreter. "construct" builds ChatRepository,
+FileRepository and SuggestionRepository the way the service does. "load_all_data"
+also loads every document from each one, which is what their constructors did
+before they stopped scanning the collections at startup.
+
+Seeding needs pymongo, measuring needs the service dependencies (motor, python-dotenv,
+requests), and both need a MongoDB at --url. Use a database of its own: the chats are
+seeded into its chat_collection, which is kept between runs unless --reseed is given.
+
+Run from the repository root:
+    python tests/benchmarks/bench_repository_startup.py --count 1000000 --db dsc_bench
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+import subprocess
+from datetime import datetime, timedelta, timezone
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT_DIR)
+
+MODES = ("construct", "load_all_data")
+
+
+def rss_mb() -> float:
+    """
+    Returns the current resident set size of this process, in MiB.
+    """
+    with open("/proc/self/status", encoding="utf-8") as file:
+        for line in file:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def peak_rss_mb() -> float:
+    """
+    Returns the peak resident set size of this process, in MiB.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def chat_document(idx: int, nodes: int, start: datetime) -> dict:
+    """
+    Builds a chat document shaped like the ones ChatRepository.add_one_record inserts.
+    """
+    created_at = start + timedelta(seconds=idx)
+    return {
+        "Id": f"chatdomain-bench-{idx:08d}",
+        "query": f"Điều kiện xét tuyển ngành {idx % 120} năm {2020 + idx % 5} là gì?",
+        "answer": ("Theo quy chế tuyển sinh của trường, thí sinh cần đạt điểm chuẩn "
+                   f"của ngành {idx % 120} và nộp hồ sơ đúng hạn. ") * 3,
+        "retrieved_nodes": [f"node-{(idx * 7 + node) % 50000:05d}" for node in range(nodes)],
+        "time": created_at.strftime("%Y-%m-%d %H:%M:%S"),
+        "is_outdomain": idx % 10 == 0,
+        "created_at": created_at
+    }
+
+
+def seed(args) -> int:
+    """
+    Inserts chat documents until the chat collection holds args.count of them.
+
+    Returns:
+        int: The number of chat documents in the collection.
+    """
+    from pymongo import MongoClient  # pylint: disable=import-outside-toplevel
+    client = MongoClient(args.url)
+    collection = client[args.db].chat_collection
+    if args.reseed:
+        collection.drop()
+    existing = collection.count_documents({})
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    began = time.perf_counter()
+    for first in range(existing, args.count, args.batch):
+        last = min(first + args.batch, args.count)
+        collection.insert_many([chat_document(idx, args.nodes, start)
+                                for idx in range(first, last)], ordered=False)
+        print(f"\rseeded {last}/{args.count}", end="", flush=True)
+    if existing < args.count:
+        print(f"\nseeding:         {time.perf_counter() - began:.1f} s")
+    count = collection.count_documents({})
+    client.close()
+    return count
+
+
+async def load_all(repositories) -> int:
+    """
+    Loads every document of the repositories, like their constructors used to.
+
+    Returns:
+        int: The number of documents loaded.
+    """
+    loaded = [await repository.load_all_data() for repository in repositories]
+    return sum(len(documents) for documents in loaded)
+
+
+def measure(mode: str) -> dict:
+    """
+    Builds the repositories in this process and reports the time and memory it took.
+    """
+    # pylint: disable=import-outside-toplevel
+    began = time.perf_counter()
+    from src.repositories.chat_repository import ChatRepository
+    from src.repositories.file_repository import FileRepository
+    from src.repositories.suggestion_repository import SuggestionRepository
+    import_s = time.perf_counter() - began
+    rss_before = rss_mb()
+
+    began = time.perf_counter()
+    repositories = [ChatRepository(), FileRepository(), SuggestionRepository()]
+    construct_s = time.perf_counter() - began
+    documents = 0
+    load_s = 0.0
+    if mode == "load_all_data":
+        began = time.perf_counter()
+        documents = asyncio.run(load_all(repositories))
+        load_s = time.perf_counter() - began
+    return {
+        "mode": mode,
+        "import_s": import_s,
+        "startup_s": construct_s + load_s,
+        "documents": documents,
+        "rss_growth_mb": rss_mb() - rss_before,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def run_child(mode: str, args) -> dict:
+    """
+    Runs one measurement in a fresh interpreter, so RSS is not shared between modes.
+    """
+    env = {**os.environ, "MONGODB_URL": args.url, "MONGODB_NAME": args.db}
+    # src.storage.mongodb cannot start without these
+    for name, value in {"LOG_LEVEL": "info",
+                        "WRITE_LOG_TO_FILE": "false",
+                        "FILE_NAME": "bench"}.items():
+        env.setdefault(name, value)
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--measure", mode],
+                            env=env, cwd=ROOT_DIR, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default=os.getenv("MONGODB_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="dsc_bench")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--nodes", type=int, default=5,
+                        help="retrieved nodes stored per chat")
+    parser.add_argument("--reseed", action="store_true",
+                        help="drop the chat collection before seeding")
+    parser.add_argument("--skip-load-all", action="store_true",
+                        help="only measure construction")
+    parser.add_argument("--measure", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure)))
+        return
+
+    chats = seed(args)
+    print(f"chat documents:  {chats}")
+    modes = MODES[:1] if args.skip_load_all else MODES
+    results = [run_child(mode, args) for mode in modes]
+    print(f"{'mode':<15} {'startup':>10} {'documents':>10} {'RSS growth':>11} "
+          f"{'peak RSS':>10}")
+    for result in results:
+        print(f"{result['mode']:<15} {result['startup_s']:>9.3f}s {result['documents']:>10} "
+              f"{result['rss_growth_mb']:>8.1f}MiB {result['peak_rss_mb']:>7.1f}MiB")
+    if len(results) == 2:
+        print(f"startup saved:   {results[1]['startup_s'] - results[0]['startup_s']:.3f} s, "
+              f"{results[1]['rss_growth_mb'] - results[0]['rss_growth_mb']:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Times TextNormalizer.normalize against the original PreprocessQuestion.clean_text
+on the same queries, after checking that both return the same text.
+
+Run from the repository root:
+    python tests/benchmarks/bench_text_normalizer.py --queries 2000 --repeat 5
+"""
+
+import os
+import sys
+import time
+import argparse
+
+TESTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.dirname(TESTS_DIR), TESTS_DIR]
+
+# pylint: disable=wrong-import-position
+from src.engines.normalizer_engine import TextNormalizer
+from src.prompt.preprocessing_prompt import (FILLTER_WORDS,
+                                             TERMS_DICT)
+from test_normalizer_engine import (baseline_clean_text,
+                                    sample_queries)
+
+
+def time_per_query(func, queries, repeat):
+    """
+    Returns the best time per query over repeat runs, in microseconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for query in queries:
+            func(query)
+        best = min(best, time.perf_counter() - start)
+    return best / len(queries) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    queries = sample_queries(count=args.queries)
+    start = time.perf_counter()
+    normalizer = TextNormalizer()
+    build_ms = (time.perf_counter() - start) * 1000
+
+    def baseline(query):
+        return baseline_clean_text(query, TERMS_DICT, FILLTER_WORDS)
+
+    mismatches = sum(normalizer.normalize(query) != baseline(query) for query in queries)
+    baseline_us = time_per_query(baseline, queries, args.repeat)
+    normalizer_us = time_per_query(normalizer.normalize, queries, args.repeat)
+    print(f"queries:         {len(queries)}")
+    print(f"mismatches:      {mismatches}")
+    print(f"build:           {build_ms:.1f} ms")
+    print(f"clean_text:      {baseline_us:.1f} us/query")
+    print(f"TextNormalizer:  {normalizer_us:.1f} us/query")
+    print(f"speedup:         {baseline_us / normalizer_us:.1f}x")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
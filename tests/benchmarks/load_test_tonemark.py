@@ -0,0 +1,127 @@
+"""
+Load-tests the tone-mark micro-batcher: fires concurrent predict calls and reports
+the throughput, latency and batch sizes, next to a run without batching.
+
+Without --model a fake backend is used, whose forward pass costs --base-ms plus
+--per-item-ms per query. With --model the real tokenizer and model are loaded.
+
+Run from the repository root:
+    python tests/benchmarks/load_test_tonemark.py --requests 2000 --concurrency 64
+    python tests/benchmarks/load_test_tonemark.py --model ./AIModel/tone --backend onnx \
+        --onnx-path ./AIModel/tone_model_int8.onnx
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+TESTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.dirname(TESTS_DIR), TESTS_DIR]
+
+# pylint: disable=wrong-import-position
+import numpy as np
+
+from src.engines.tonemark_engine import (ToneMarkBatcher,
+                                         TorchToneMarkBackend,
+                                         OnnxToneMarkBackend,
+                                         default_torch_device)
+from src.prompt.preprocessing_prompt import TONE_PARITY_SAMPLES
+from test_tonemark_engine import (FakeTokenizer,
+                                  FakeBackend)
+
+
+def build_runner(args):
+    """
+    Returns a function creating a batcher over the selected backend.
+    """
+    if args.model is None:
+        tokenizer = FakeTokenizer()
+        backend = FakeBackend(base_ms=args.base_ms, per_item_ms=args.per_item_ms)
+    else:
+        # pylint: disable=import-outside-toplevel
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(args.model, add_prefix_space=True)
+        if args.backend == "onnx":
+            backend = OnnxToneMarkBackend(model_path=args.onnx_path,
+                                          intra_op_num_threads=args.threads)
+        else:
+            from transformers import AutoModelForTokenClassification
+            device = default_torch_device()
+            backend = TorchToneMarkBackend(
+                model=AutoModelForTokenClassification.from_pretrained(args.model).to(device),
+                device_type=device
+            )
+
+    def runner(max_batch_size):
+        return ToneMarkBatcher(backend, tokenizer,
+                               max_batch_size=max_batch_size,
+                               max_wait_ms=args.max_wait_ms)
+    return runner
+
+
+async def load(batcher, requests, concurrency):
+    """
+    Sends the requests from concurrency clients and returns their latencies.
+    """
+    latencies = []
+    pending = iter(range(requests))
+
+    async def client():
+        for idx in pending:
+            start = time.perf_counter()
+            await batcher.predict(TONE_PARITY_SAMPLES[idx % len(TONE_PARITY_SAMPLES)])
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    return latencies
+
+
+def report(name, batcher, latencies, elapsed):
+    """
+    Prints the throughput, latency percentiles and batch sizes of a run.
+    """
+    latencies_ms = np.asarray(latencies) * 1000
+    stats = batcher.stats
+    sizes = ", ".join(f"{size}x{count}" for size, count in sorted(batcher.batch_sizes.items()))
+    print(f"{name}:")
+    print(f"  throughput:  {len(latencies) / elapsed:.1f} req/s")
+    print(f"  latency:     p50 {np.percentile(latencies_ms, 50):.1f} ms, "
+          f"p95 {np.percentile(latencies_ms, 95):.1f} ms, "
+          f"p99 {np.percentile(latencies_ms, 99):.1f} ms")
+    print(f"  batches:     {stats['batches']}, mean size {stats['mean_batch_size']:.1f}, "
+          f"max size {stats['max_batch_size']}")
+    print(f"  batch sizes: {sizes}")
+    return len(latencies) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    parser.add_argument("--base-ms", type=float, default=10,
+                        help="fake backend: fixed cost of a forward pass")
+    parser.add_argument("--per-item-ms", type=float, default=0.5,
+                        help="fake backend: cost per query of a forward pass")
+    parser.add_argument("--model", help="the TONE_MODEL directory or hub name")
+    parser.add_argument("--backend", choices=["torch", "onnx"], default="torch")
+    parser.add_argument("--onnx-path", default="./AIModel/tone_model_int8.onnx")
+    parser.add_argument("--threads", type=int, default=0)
+    args = parser.parse_args()
+
+    runner = build_runner(args)
+    throughputs = []
+    for name, max_batch_size in [("unbatched", 1), ("batched", args.max_batch_size)]:
+        batcher = runner(max_batch_size)
+        start = time.perf_counter()
+        latencies = asyncio.run(load(batcher, args.requests, args.concurrency))
+        throughputs.append(report(name, batcher, latencies, time.perf_counter() - start))
+        batcher.close()
+    print(f"speedup: {throughputs[1] / throughputs[0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
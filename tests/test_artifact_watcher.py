@@ -0,0 +1,76 @@
+"""
+Tests that the artifact watcher loads changed artifacts off the event loop and
+swaps them in on it.
+"""
+
+import asyncio
+import threading
+
+from src.services.artifact_watcher import ArtifactWatcher
+
+
+class Artifacts:
+    """
+    Fake artifacts whose fingerprint is changed by the tests.
+    """
+
+    def __init__(self):
+        self.on_disk = "v1"
+        self.served = "v1"
+        self.load_threads = []
+        self.apply_threads = []
+        self.fail = False
+
+    def fingerprint(self):
+        return self.on_disk
+
+    def load(self):
+        self.load_threads.append(threading.current_thread())
+        if self.fail:
+            raise OSError("artifact is being written")
+        return self.on_disk
+
+    def apply(self, loaded):
+        self.apply_threads.append(threading.current_thread())
+        self.served = loaded
+        return loaded
+
+
+def test_unchanged_artifacts_are_not_reloaded():
+    artifacts = Artifacts()
+    watcher = ArtifactWatcher(artifacts.fingerprint, artifacts.load, artifacts.apply,
+                              fingerprint="v1")
+    assert asyncio.run(watcher.check()) is False
+    assert not artifacts.load_threads and watcher.reloads == 0
+
+
+def test_changed_artifacts_are_loaded_in_a_thread_and_applied_on_the_loop():
+    artifacts = Artifacts()
+    watcher = ArtifactWatcher(artifacts.fingerprint, artifacts.load, artifacts.apply,
+                              fingerprint="v1")
+    artifacts.on_disk = "v2"
+    assert asyncio.run(watcher.check()) is True
+    assert artifacts.served == "v2" and watcher.reloads == 1
+    assert artifacts.load_threads[0] is not threading.main_thread()
+    assert artifacts.apply_threads == [threading.main_thread()]
+
+
+def test_a_failed_reload_keeps_the_artifacts_and_is_retried():
+    artifacts = Artifacts()
+    watcher = ArtifactWatcher(artifacts.fingerprint, artifacts.load, artifacts.apply,
+                              fingerprint="v1", interval=0.01)
+    artifacts.on_disk = "v2"
+    artifacts.fail = True
+
+    async def main():
+        watcher.start()
+        while len(artifacts.load_threads) < 2:
+            await asyncio.sleep(0.01)
+        assert artifacts.served == "v1" and not artifacts.apply_threads
+        artifacts.fail = False
+        while watcher.reloads == 0:
+            await asyncio.sleep(0.01)
+        await watcher.close()
+
+    asyncio.run(asyncio.wait_for(main(), 5))
+    assert artifacts.served == "v2"
@@ -0,0 +1,95 @@
+"""
+Tests the LRU cache eviction, expiry and version invalidation.
+"""
+
+import pytest
+
+from src.utils import cache
+from src.utils.cache import LRUCache
+
+
+class FakeClock:
+    """
+    A monotonic clock that only moves when told to.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache.time, "monotonic", fake)
+    return fake
+
+
+def test_evicts_the_least_recently_used_entry():
+    lru = LRUCache(max_size=2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1
+    lru.set("c", 3)
+    assert lru.get("b") is None
+    assert lru.get("a") == 1
+    assert lru.get("c") == 3
+    assert len(lru) == 2
+
+
+def test_set_refreshes_an_existing_entry():
+    lru = LRUCache(max_size=2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.set("a", 10)
+    lru.set("c", 3)
+    assert lru.get("a") == 10
+    assert lru.get("b", "missing") == "missing"
+
+
+def test_zero_size_stores_nothing():
+    lru = LRUCache(max_size=0)
+    lru.set("a", 1)
+    assert lru.get("a") is None
+    assert len(lru) == 0
+
+
+def test_entries_expire_after_ttl(clock):
+    lru = LRUCache(ttl=10)
+    lru.set("a", 1)
+    clock.now += 9.9
+    assert lru.get("a") == 1
+    clock.now += 0.2
+    assert lru.get("a") is None
+    assert len(lru) == 0
+
+
+def test_entries_without_ttl_do_not_expire(clock):
+    lru = LRUCache()
+    lru.set("a", 1)
+    clock.now += 10 ** 6
+    assert lru.get("a") == 1
+
+
+def test_version_change_clears_the_cache(clock):
+    version = ["v1"]
+    lru = LRUCache(version_func=lambda: version[0], check_interval=5)
+    lru.set("a", 1)
+    version[0] = "v2"
+    # Not checked again before check_interval has elapsed
+    assert lru.get("a") == 1
+    clock.now += 5
+    assert lru.get("a") is None
+    assert lru.stats["invalidations"] == 1
+
+
+def test_stats_count_hits_and_misses():
+    lru = LRUCache(max_size=4)
+    lru.set("a", 1)
+    lru.get("a")
+    lru.get("b")
+    lru.clear()
+    assert lru.stats == {"size": 0, "max_size": 4, "hits": 1, "misses": 1,
+                         "invalidations": 1}
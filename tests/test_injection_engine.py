@@ -0,0 +1,147 @@
+"""
+Checks that PromptInjectionScanner finds exactly the patterns that the original
+per-pattern re.search(..., re.IGNORECASE) loop found.
+"""
+
+import re
+import sys
+import random
+
+import pytest
+
+from src.engines.injection_engine import (PromptInjectionScanner,
+                                          fold_case)
+from src.prompt.preprocessing_prompt import (PROMPT_INJECTION_PATTERNS,
+                                             POTENTIAL_PROMPT_INJECTION_PATTERNS)
+
+
+def baseline_scan(text, patterns, potential_patterns):
+    """
+    The pattern loops of the original is_prompt_injection.
+    """
+    return ([pattern for pattern in patterns if re.search(pattern, text, re.IGNORECASE)],
+            [pattern for pattern in potential_patterns
+             if re.search(pattern, text, re.IGNORECASE)])
+
+
+def vary_case(text, rng):
+    """
+    Changes the case of the text, including characters that str.lower() and
+    re.IGNORECASE treat differently.
+    """
+    text = rng.choice([str.upper, str.lower, str.title, str.swapcase, str])(text)
+    swaps = {"i": ["İ", "ı", "I"], "s": ["ſ", "S"], "k": ["K"], "σ": ["ς", "Σ"]}
+    return "".join(rng.choice(swaps[char]) if char in swaps and rng.random() < 0.3 else char
+                   for char in text)
+
+
+def sample_texts(seed=0):
+    """
+    Builds texts embedding the real patterns among ordinary admission questions.
+    """
+    rng = random.Random(seed)
+    patterns = PROMPT_INJECTION_PATTERNS + POTENTIAL_PROMPT_INJECTION_PATTERNS
+    fillers = ["cho em hỏi", "điểm chuẩn ngành", "học phí", "UIT", "năm nay", "",
+               "bao nhiêu", "xét tuyển", "ký túc xá", "!", "?"]
+    texts = ["", "điểm chuẩn ngành khoa học máy tính năm nay là bao nhiêu",
+             "MÃ ĐỘC", "BỎ QUA HƯỚNG DẪN TRƯỚC", "BYPASS", "bypaſs", "HACKİNG"]
+    for _ in range(400):
+        parts = [rng.choice(fillers) for _ in range(rng.randint(0, 4))]
+        for _ in range(rng.randint(0, 3)):
+            parts.insert(rng.randint(0, len(parts)), vary_case(rng.choice(patterns), rng))
+        texts.append(rng.choice([" ", "", ", "]).join(parts))
+    return texts
+
+
+@pytest.fixture(scope="module")
+def scanner():
+    return PromptInjectionScanner()
+
+
+@pytest.mark.parametrize("text", sample_texts())
+def test_scan_equals_baseline(scanner, text):
+    assert scanner.scan(text) == baseline_scan(text, PROMPT_INJECTION_PATTERNS,
+                                               POTENTIAL_PROMPT_INJECTION_PATTERNS)
+
+
+def test_case_folding_matches_re_ignorecase():
+    # Every character of the patterns, and the ones whose case mapping is special,
+    # must match the same characters as with re.IGNORECASE
+    every_char = "".join(chr(code) for code in range(sys.maxunicode + 1)
+                         if not 0xD800 <= code <= 0xDFFF)
+    folded = fold_case(every_char)
+    assert len(folded) == len(every_char)
+    chars = set("".join(PROMPT_INJECTION_PATTERNS + POTENTIAL_PROMPT_INJECTION_PATTERNS))
+    chars |= set("aiksσβθμ") | {"İ", "ı", "ſ", "K", "ς", "ß", "ẞ", "ǅ"}
+    for char in sorted(chars):
+        expected = {match.start() for match in
+                    re.finditer(re.escape(char), every_char, re.IGNORECASE)}
+        actual = {match.start() for match in
+                  re.finditer(re.escape(fold_case(char)), folded)}
+        assert actual == expected, char
+
+
+def test_regex_patterns_are_searched_and_literals_go_to_the_automaton():
+    patterns = ["mã độc", r"ignore (all )?previous", r"\bdan\b", "a.b"]
+    potential = ["hack", r"jail\s*break"]
+    scanner = PromptInjectionScanner(patterns=patterns, potential_patterns=potential)
+    regexes = [scanner._entries[idx][1] for idx, _ in scanner._regexes]  # pylint: disable=protected-access
+    assert regexes == [r"ignore (all )?previous", r"\bdan\b", "a.b", r"jail\s*break"]
+    for text in ["Ignore previous", "IGNORE ALL PREVIOUS rules", "dan", "Dante", "aXb",
+                 "a.b", "JAILBREAK", "jail   break", "MÃ ĐỘC hack", "nothing here"]:
+        assert scanner.scan(text) == baseline_scan(text, patterns, potential)
+
+
+def test_backreferences_are_not_hidden_by_the_combined_regex():
+    # Combined, the second pattern's \1 would point at the first pattern's group
+    patterns = [r"(a)\1", r"(b)\1"]
+    scanner = PromptInjectionScanner(patterns=patterns, potential_patterns=[])
+    for text in ["aa", "bb", "ab", "xbbx", "BB"]:
+        assert scanner.scan(text) == baseline_scan(text, patterns, [])
+
+
+def test_overlapping_literals_are_all_reported():
+    patterns = ["he", "she", "his", "hers", "bỏ qua", "bỏ qua hướng dẫn trước", "qua hướng"]
+    potential = ["hướng dẫn", "dẫn trước", "e"]
+    scanner = PromptInjectionScanner(patterns=patterns, potential_patterns=potential)
+    for text in ["ushers", "SHE", "this", "bỏ qua hướng dẫn trước đó", "bỏ qu",
+                 "hướng dẫn trước", "Bỏ Qua Hướng"]:
+        assert scanner.scan(text) == baseline_scan(text, patterns, potential)
+
+
+def test_duplicate_patterns_are_reported_in_list_order():
+    patterns = ["bom", "bom"]
+    potential = ["bom"]
+    scanner = PromptInjectionScanner(patterns=patterns, potential_patterns=potential)
+    assert scanner.scan("quả BOM") == baseline_scan("quả BOM", patterns, potential)
+
+
+class CountingClassifier:
+    """
+    Records the texts it is asked to confirm.
+    """
+
+    def __init__(self, verdict):
+        self.verdict = verdict
+        self.calls = []
+
+    def __call__(self, text):
+        self.calls.append(text)
+        return self.verdict
+
+
+@pytest.mark.parametrize("verdict", [True, False])
+def test_classifier_runs_once_for_many_potential_patterns(verdict):
+    scanner = PromptInjectionScanner(patterns=["quả bom"],
+                                     potential_patterns=["hack", "bypass", "vượt qua"])
+    confirm = CountingClassifier(verdict)
+    assert scanner.is_injection("hack để bypass và vượt qua", confirm) is verdict
+    assert confirm.calls == ["hack để bypass và vượt qua"]
+
+
+def test_classifier_is_skipped_without_potential_patterns_or_with_a_hard_one():
+    scanner = PromptInjectionScanner(patterns=["quả bom"], potential_patterns=["hack"])
+    confirm = CountingClassifier(False)
+    assert scanner.is_injection("QUẢ BOM hack", confirm) is True
+    assert scanner.is_injection("học phí bao nhiêu", confirm) is False
+    assert not confirm.calls
@@ -0,0 +1,86 @@
+"""
+Checks that TextNormalizer cleans queries exactly like the original
+PreprocessQuestion.clean_text.
+"""
+
+import re
+import random
+
+import pytest
+
+from src.engines.normalizer_engine import (TextNormalizer,
+                                           EMOJI_PATTERN,
+                                           VIETNAMESE_CHARACTERS)
+from src.prompt.preprocessing_prompt import (FILLTER_WORDS,
+                                             TERMS_DICT)
+
+
+def baseline_clean_text(text, term_dict, filler_words):
+    """
+    The step-by-step cleaning that TextNormalizer replaces.
+    """
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(rf'[^{VIETNAMESE_CHARACTERS}\s]', '', text.lower()).strip()
+    text = text.lower()
+    for word in filler_words:
+        pattern = r'\b{}\b'.format(re.escape(word.strip().lower()))
+        text = re.sub(pattern, '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    text = EMOJI_PATTERN.sub(r'', text)
+    text = text.lower()
+    for keyword, synonyms in term_dict.items():
+        keyword = keyword.lower()
+        for synonym in synonyms:
+            synonym = synonym.strip().lower()
+            text = re.sub(r'\b{}\b'.format(re.escape(synonym)), keyword, text)
+    for symbol, replacement in {">": " lớn hơn ", "<": " bé hơn ", "=": " bằng ",
+                                "$": " ", "#": " ", "^": " ", "/": " ", "!": " "}.items():
+        text = text.replace(symbol, replacement)
+    text = " ".join(text.split())
+    s_new = ''
+    for word in text.split(' '):
+        word_new = ' '
+        for char in word.strip():
+            if char != word_new[-1]:
+                word_new += char
+        s_new += word_new.strip() + ' '
+    return s_new.strip()
+
+
+def sample_queries(count=500, seed=0):
+    """
+    Builds queries mixing synonyms, filler words, symbols, emojis and elongated words.
+    """
+    rng = random.Random(seed)
+    words = ([synonym for synonyms in TERMS_DICT.values() for synonym in synonyms]
+             + list(TERMS_DICT) + FILLTER_WORDS
+             + ["điểm chuẩn", "ngành", "học phí", "bao nhiêu", "nhiêuuuu", "2024",
+                ">", "<=", "a/b", "#tag", "😀", "!!", "  ", "\t", "UIT?", "Đ.H.Q.G"])
+    return ["".join(rng.choice([" ", "", "  "]) + rng.choice(words)
+                    for _ in range(rng.randint(1, 8)))
+            for _ in range(count)]
+
+
+QUERIES = [
+    "",
+    "   ",
+    "Điểm chuẩn UIT năm 2024 là bao nhiêu ạ???",
+    "dạ vâng cho em hỏi học phí trường UIT",
+    "kỳ thi ĐHQG TPHCM có khóa >= 900 không",
+    "heloooo 😀😀 ad ơi",
+    "THPT\tvà\nđgnl",
+] + sample_queries()
+
+
+@pytest.mark.parametrize("text", QUERIES)
+def test_normalize_matches_baseline(text):
+    normalizer = TextNormalizer()
+    assert normalizer.normalize(text) == baseline_clean_text(text, TERMS_DICT, FILLTER_WORDS)
+
+
+def test_cascading_synonyms_match_baseline():
+    # The second rule only matches the output of the first one
+    term_dict = {"b c": ["a"], "d": ["b c"]}
+    normalizer = TextNormalizer(term_dict=term_dict, filler_words=[])
+    for text in ["a", "x a y", "b c", "a b"]:
+        assert normalizer.normalize(text) == baseline_clean_text(text, term_dict, [])
@@ -0,0 +1,194 @@
+"""
+Tests the keyset pagination of pages and NDJSON streams against an in-memory collection.
+"""
+
+import json
+import asyncio
+import random
+
+import pytest
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from src.storage.pagination import (keyset_filter,
+                                    find_page,
+                                    iter_documents,
+                                    iter_ndjson)
+
+PROJECTION = {"_id": 0, "Id": 1, "question": 1}
+
+
+class FakeCursor:
+    """
+    The part of an AsyncIOMotorCursor used by the pagination functions.
+    """
+
+    def __init__(self, documents):
+        self._documents = documents
+
+    async def to_list(self, length):
+        return self._documents[:length]
+
+    async def __aiter__(self):
+        for document in self._documents:
+            await asyncio.sleep(0)
+            yield document
+
+
+class FakeCollection:
+    """
+    Stores documents in a list in no particular order and answers find_docs like MongoDB,
+    for the filters, projections and sorts used by the pagination functions.
+    """
+
+    def __init__(self, count=0, seed=0):
+        self.documents = []
+        self.insert(count)
+        random.Random(seed).shuffle(self.documents)
+        self.calls = []
+
+    def insert(self, count):
+        start = len(self.documents)
+        for idx in range(start, start + count):
+            self.documents.append({"_id": ObjectId(), "Id": f"sug-{idx}",
+                                   "question": f"question {idx}", "answer": "hidden"})
+
+    def ids(self):
+        return sorted(str(document["_id"]) for document in self.documents)
+
+    def find_docs(self, obj=None, projection=None, sort=None, limit=0, batch_size=None):
+        self.calls.append({"obj": obj, "sort": sort, "limit": limit, "batch_size": batch_size})
+        after = (obj or {}).get("_id", {}).get("$gt")
+        documents = [document for document in self.documents
+                     if after is None or document["_id"] > after]
+        assert sort == [("_id", 1)]
+        documents.sort(key=lambda document: document["_id"])
+        if limit:
+            documents = documents[:limit]
+        fields = [name for name, value in projection.items() if value and name != "_id"]
+        keep_id = projection.get("_id", 1)
+        return FakeCursor([{**({"_id": document["_id"]} if keep_id else {}),
+                            **{name: document[name] for name in fields}}
+                           for document in documents])
+
+
+async def read_pages(collection, limit, after=None):
+    pages = []
+    while True:
+        documents, after = await find_page(collection.find_docs, PROJECTION, limit, after)
+        pages.append(documents)
+        if after is None:
+            return pages
+
+
+async def read_stream(collection, after=None, stop=None):
+    lines = []
+    async for line in iter_ndjson(iter_documents(collection.find_docs, PROJECTION,
+                                                 batch_size=3, after=after,
+                                                 with_cursor=True)):
+        lines.append(line)
+        if len(lines) == stop:
+            break
+    return lines
+
+
+@pytest.mark.parametrize("after", [None, ""])
+def test_no_cursor_selects_everything(after):
+    assert keyset_filter(after) == {}
+
+
+def test_cursor_selects_the_following_documents():
+    after = ObjectId()
+    assert keyset_filter(str(after)) == {"_id": {"$gt": after}}
+
+
+@pytest.mark.parametrize("after", ["not-an-id", "123"])
+def test_invalid_cursor_is_rejected(after):
+    with pytest.raises(InvalidId):
+        keyset_filter(after)
+
+
+@pytest.mark.parametrize("count,limit", [(0, 5), (1, 5), (4, 5), (5, 5), (20, 5),
+                                         (23, 5), (23, 1), (23, 100)])
+def test_pages_cover_every_document_once_in_order(count, limit):
+    collection = FakeCollection(count)
+    pages = asyncio.run(read_pages(collection, limit))
+    cursors = [document["cursor"] for page in pages for document in page]
+    assert cursors == collection.ids()
+    assert all(len(page) == limit for page in pages[:-1])
+    assert len(pages) == max(1, -(-count // limit))
+    assert all(call["limit"] == limit + 1 for call in collection.calls)
+
+
+def test_page_keeps_the_projection_and_hides_the_id():
+    collection = FakeCollection(3)
+    documents, _ = asyncio.run(find_page(collection.find_docs, PROJECTION, 10))
+    assert all(set(document) == {"Id", "question", "cursor"} for document in documents)
+
+
+def test_next_after_is_the_cursor_of_the_last_document():
+    collection = FakeCollection(7)
+    documents, next_after = asyncio.run(find_page(collection.find_docs, PROJECTION, 3))
+    assert next_after == documents[-1]["cursor"]
+    documents, _ = asyncio.run(find_page(collection.find_docs, PROJECTION, 3, next_after))
+    assert documents[0]["cursor"] == collection.ids()[3]
+
+
+def test_documents_inserted_between_pages_are_read_once():
+    collection = FakeCollection(10)
+
+    async def run():
+        seen = []
+        after = None
+        while True:
+            documents, after = await find_page(collection.find_docs, PROJECTION, 4, after)
+            seen.extend(document["cursor"] for document in documents)
+            if after is None:
+                return seen
+            collection.insert(2)
+
+    seen = asyncio.run(run())
+    assert seen == collection.ids()
+
+
+@pytest.mark.parametrize("stop", [1, 2, 7, 12, 13])
+def test_resumed_stream_has_no_duplicates_or_gaps(stop):
+    collection = FakeCollection(13)
+    first = asyncio.run(read_stream(collection, stop=stop))
+    resume_from = json.loads(first[-1])["cursor"]
+    rest = asyncio.run(read_stream(collection, after=resume_from))
+    records = [json.loads(line) for line in first + rest]
+    assert [record["cursor"] for record in records] == collection.ids()
+    assert all(line.endswith("\n") and line.count("\n") == 1 for line in first + rest)
+    assert all(set(record) == {"Id", "question", "cursor"} for record in records)
+
+
+def test_stream_resumes_from_the_cursor_of_a_page():
+    collection = FakeCollection(11)
+    documents, next_after = asyncio.run(find_page(collection.find_docs, PROJECTION, 4))
+    lines = asyncio.run(read_stream(collection, after=next_after))
+    cursors = ([document["cursor"] for document in documents]
+               + [json.loads(line)["cursor"] for line in lines])
+    assert cursors == collection.ids()
+
+
+def test_stream_without_cursor_hides_the_id():
+    collection = FakeCollection(3)
+
+    async def run():
+        return [document async for document in iter_documents(collection.find_docs,
+                                                              PROJECTION, batch_size=2)]
+
+    documents = asyncio.run(run())
+    assert all(set(document) == {"Id", "question"} for document in documents)
+    assert collection.calls[0]["batch_size"] == 2
+
+
+def test_ndjson_keeps_non_ascii_text():
+    async def records():
+        yield {"question": "Tuyển sinh năm nay thế nào?"}
+
+    async def run():
+        return [line async for line in iter_ndjson(records())]
+
+    assert asyncio.run(run()) == ['{"question": "Tuyển sinh năm nay thế nào?"}\n']
@@ -0,0 +1,90 @@
+"""
+Checks that ShortChatMatcher detects short chats and picks their responses exactly
+like the original linear SequenceMatcher scans.
+"""
+
+import random
+from difflib import SequenceMatcher
+
+import pytest
+
+from src.engines.short_chat_engine import ShortChatMatcher
+from src.engines.normalizer_engine import EMOJI_PATTERN
+from src.prompt.preprocessing_prompt import (SHORT_CHAT,
+                                             RESPONSE_DICT,
+                                             RESPONSE_SHORT_CHAT_DEFAULT)
+
+
+def baseline_detect_short_chat(text_input, short_chats, threshold=0.85):
+    """
+    The short chat detection that ShortChatMatcher replaces.
+    """
+    normalized_text = text_input.lower().strip()
+    has_emoji = bool(EMOJI_PATTERN.search(normalized_text))
+    matches_pattern = any(SequenceMatcher(None, normalized_text, pattern).ratio() >= threshold
+                          for pattern in short_chats)
+    if has_emoji:
+        return matches_pattern or normalized_text == ''
+    return matches_pattern
+
+
+def baseline_get_response(input_text, short_chats, response_dict, threshold=0.9):
+    """
+    The response lookup that ShortChatMatcher replaces.
+    """
+    input_text = input_text.lower().strip()
+    best_match = None
+    best_ratio = 0.0
+    for chat in short_chats:
+        ratio = SequenceMatcher(None, input_text, chat).ratio()
+        if ratio > best_ratio and ratio >= threshold:
+            best_ratio = ratio
+            best_match = chat
+    if best_match and best_match in response_dict:
+        return response_dict[best_match]
+    return RESPONSE_SHORT_CHAT_DEFAULT
+
+
+def perturb(text, rng):
+    """
+    Deletes, duplicates or replaces one character of the text.
+    """
+    if not text:
+        return rng.choice("aàz")
+    idx = rng.randrange(len(text))
+    edit = rng.choice(["delete", "duplicate", "replace"])
+    if edit == "delete":
+        return text[:idx] + text[idx + 1:]
+    if edit == "duplicate":
+        return text[:idx] + text[idx] + text[idx:]
+    return text[:idx] + rng.choice("aăâeêioôơuưy ") + text[idx + 1:]
+
+
+def sample_queries(seed=0):
+    """
+    Builds the short chat phrases, near misses and unrelated queries.
+    """
+    rng = random.Random(seed)
+    phrases = list(SHORT_CHAT) + list(RESPONSE_DICT)
+    queries = list(phrases)
+    queries += [perturb(rng.choice(phrases), rng) for _ in range(300)]
+    queries += [rng.choice(phrases) + " " + rng.choice(phrases) for _ in range(50)]
+    queries += ["", " ", "😀", "chào 😀", "Xin Chào", "điểm chuẩn ngành khoa học máy tính",
+                "cho em hỏi học phí năm nay"]
+    return queries
+
+
+@pytest.mark.parametrize("text", sample_queries())
+def test_match_equals_baseline(text):
+    matcher = ShortChatMatcher()
+    is_short_chat, response = matcher.match(text)
+    assert is_short_chat == baseline_detect_short_chat(text, SHORT_CHAT)
+    assert response == baseline_get_response(text, SHORT_CHAT, RESPONSE_DICT)
+
+
+def test_ties_keep_the_first_phrase():
+    matcher = ShortChatMatcher(short_chats=["abcd", "abce"],
+                               response_dict={"abcd": "first", "abce": "second"},
+                               detect_threshold=0.7,
+                               response_threshold=0.7)
+    assert matcher.match("abc") == (True, "first")
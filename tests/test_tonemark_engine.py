@@ -0,0 +1,186 @@
+"""
+Tests the tone-mark micro-batcher with a fake tokenizer and backend.
+"""
+
+import time
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from src.engines.tonemark_engine import ToneMarkBatcher
+
+NUM_LABELS = 7
+
+
+class FakeTokenizer:
+    """
+    Tokenizes each word into one token between <s> and </s>, padded to the longest text.
+    """
+
+    def __init__(self):
+        self.vocab = {"<pad>": 0, "<s>": 1, "</s>": 2}
+        self.tokens = ["<pad>", "<s>", "</s>"]
+
+    def _token_id(self, word):
+        if word not in self.vocab:
+            self.vocab[word] = len(self.tokens)
+            self.tokens.append(word)
+        return self.vocab[word]
+
+    def __call__(self, texts, is_split_into_words, truncation, padding, return_tensors):
+        assert is_split_into_words and padding and return_tensors == "np"
+        rows = [[1] + [self._token_id(word) for word in words] + [2] for words in texts]
+        width = max(len(row) for row in rows)
+        return {
+            "input_ids": np.array([row + [0] * (width - len(row)) for row in rows]),
+            "attention_mask": np.array([[1] * len(row) + [0] * (width - len(row))
+                                        for row in rows])
+        }
+
+    def convert_ids_to_tokens(self, ids):
+        return [self.tokens[token_id] for token_id in ids]
+
+
+class FakeBackend:
+    """
+    Predicts label (token id + offset) % NUM_LABELS and records the size of each batch.
+    A forward pass takes base_ms plus per_item_ms per text.
+    """
+
+    return_tensors = "np"
+
+    def __init__(self, offset=0, base_ms=0.0, per_item_ms=0.0, error=None):
+        self.offset = offset
+        self.base_ms = base_ms
+        self.per_item_ms = per_item_ms
+        self.error = error
+        self.batches = []
+        self.started = threading.Event()
+        self.release = None
+
+    def logits(self, inputs):
+        input_ids = np.asarray(inputs["input_ids"])
+        self.batches.append(len(input_ids))
+        self.started.set()
+        if self.release is not None:
+            self.release.wait(5)
+        time.sleep((self.base_ms + self.per_item_ms * len(input_ids)) / 1000)
+        if self.error is not None:
+            raise self.error
+        return np.eye(NUM_LABELS)[(input_ids + self.offset) % NUM_LABELS]
+
+
+def expected_labels(tokenizer, text, offset=0):
+    return [(tokenizer.vocab[word] + offset) % NUM_LABELS for word in text.split()]
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_predict_batch_strips_special_and_padding_tokens():
+    tokenizer = FakeTokenizer()
+    batcher = ToneMarkBatcher(FakeBackend(), tokenizer)
+    (tokens_a, labels_a), (tokens_b, labels_b) = batcher.predict_batch(["a b c", " d "])
+    batcher.close()
+    assert tokens_a == ["a", "b", "c"] and tokens_b == ["d"]
+    assert list(labels_a) == expected_labels(tokenizer, "a b c")
+    assert list(labels_b) == expected_labels(tokenizer, "d")
+
+
+def test_results_are_scattered_to_their_callers():
+    tokenizer = FakeTokenizer()
+    backend = FakeBackend()
+    batcher = ToneMarkBatcher(backend, tokenizer, max_batch_size=8, max_wait_ms=50)
+    texts = [" ".join(f"w{i}x{j}" for j in range(i % 4 + 1)) for i in range(20)]
+
+    async def main():
+        return await asyncio.gather(*[batcher.predict(text) for text in texts])
+
+    results = run(main())
+    batcher.close()
+    for text, (tokens, labels) in zip(texts, results):
+        assert tokens == text.split()
+        assert list(labels) == expected_labels(tokenizer, text)
+    assert max(backend.batches) > 1
+
+
+def test_batches_never_exceed_max_batch_size():
+    backend = FakeBackend()
+    batcher = ToneMarkBatcher(backend, FakeTokenizer(), max_batch_size=4, max_wait_ms=50)
+
+    async def main():
+        await asyncio.gather(*[batcher.predict(f"word{i}") for i in range(10)])
+
+    run(main())
+    batcher.close()
+    assert backend.batches == [4, 4, 2]
+    assert batcher.stats == {"batches": 3, "predictions": 10,
+                             "mean_batch_size": 10 / 3, "max_batch_size": 4}
+
+
+def test_requests_within_max_wait_share_a_batch():
+    backend = FakeBackend()
+    batcher = ToneMarkBatcher(backend, FakeTokenizer(), max_batch_size=8, max_wait_ms=500)
+
+    async def main():
+        first = asyncio.create_task(batcher.predict("a"))
+        await asyncio.sleep(0.02)
+        await asyncio.gather(first, batcher.predict("b"))
+
+    run(main())
+    batcher.close()
+    assert backend.batches == [2]
+
+
+def test_requests_after_max_wait_get_their_own_batch():
+    backend = FakeBackend()
+    batcher = ToneMarkBatcher(backend, FakeTokenizer(), max_batch_size=8, max_wait_ms=0)
+
+    async def main():
+        await batcher.predict("a")
+        await batcher.predict("b")
+
+    run(main())
+    batcher.close()
+    assert backend.batches == [1, 1]
+
+
+def test_a_failed_batch_fails_its_callers_only():
+    tokenizer = FakeTokenizer()
+    backend = FakeBackend(error=RuntimeError("model failed"))
+    batcher = ToneMarkBatcher(backend, tokenizer, max_wait_ms=0)
+
+    async def main():
+        with pytest.raises(RuntimeError, match="model failed"):
+            await batcher.predict("a")
+        backend.error = None
+        return await batcher.predict("a")
+
+    tokens, labels = run(main())
+    batcher.close()
+    assert tokens == ["a"] and list(labels) == expected_labels(tokenizer, "a")
+
+
+def test_replace_backend_applies_to_the_next_batch():
+    tokenizer = FakeTokenizer()
+    old_backend = FakeBackend()
+    old_backend.release = threading.Event()
+    new_backend = FakeBackend(offset=1)
+    batcher = ToneMarkBatcher(old_backend, tokenizer, max_wait_ms=0)
+
+    async def main():
+        running = asyncio.create_task(batcher.predict("a"))
+        await asyncio.to_thread(old_backend.started.wait, 5)
+        batcher.replace_backend(new_backend, tokenizer)
+        old_backend.release.set()
+        return await running, await batcher.predict("a")
+
+    (_, old_labels), (_, new_labels) = run(main())
+    batcher.close()
+    # The batch running during the swap finishes with the old backend
+    assert list(old_labels) == expected_labels(tokenizer, "a")
+    assert list(new_labels) == expected_labels(tokenizer, "a", offset=1)
+    assert old_backend.batches == [1] and new_backend.batches == [1]
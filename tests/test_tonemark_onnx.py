@@ -0,0 +1,74 @@
+"""
+Checks the ONNX export of a tiny tone-mark model against PyTorch.
+Skipped unless torch, transformers and onnxruntime are installed.
+"""
+
+import os
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+pytest.importorskip("onnxruntime")
+
+from src.engines.tonemark_engine import (ToneMarkBatcher,  # pylint: disable=wrong-import-position
+                                         TorchToneMarkBackend,
+                                         OnnxToneMarkBackend,
+                                         check_parity,
+                                         export_checked_onnx_model)
+from src.prompt.preprocessing_prompt import TONE_PARITY_SAMPLES  # pylint: disable=wrong-import-position
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    """
+    A randomly initialized one-layer BERT token classifier and its tokenizer.
+    """
+    words = sorted({word for text in TONE_PARITY_SAMPLES for word in text.split()})
+    vocab_path = tmp_path_factory.mktemp("tokenizer") / "vocab.txt"
+    vocab_path.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + words),
+                          encoding="utf-8")
+    tokenizer = transformers.BertTokenizerFast(vocab_file=str(vocab_path))
+    torch.manual_seed(0)
+    config = transformers.BertConfig(vocab_size=tokenizer.vocab_size, hidden_size=32,
+                                     num_hidden_layers=1, num_attention_heads=2,
+                                     intermediate_size=64, num_labels=5)
+    model = transformers.BertForTokenClassification(config).eval()
+    return model, tokenizer
+
+
+def test_fp32_export_agrees_with_pytorch(tiny_model, tmp_path):
+    model, tokenizer = tiny_model
+    output_path = str(tmp_path / "tone.onnx")
+    report = export_checked_onnx_model(model, tokenizer, output_path,
+                                       samples=TONE_PARITY_SAMPLES,
+                                       min_agreement=0.99, quantize=False)
+    assert report["passed"] and report["agreement"] >= 0.99
+    assert os.listdir(tmp_path) == ["tone.onnx"]
+
+    reference = ToneMarkBatcher(TorchToneMarkBackend(model, model.device), tokenizer)
+    candidate = ToneMarkBatcher(OnnxToneMarkBackend(output_path), tokenizer)
+    assert check_parity(reference, candidate, TONE_PARITY_SAMPLES) == report["agreement"]
+    for (expected_tokens, _), (tokens, _) in zip(
+            reference.predict_batch(TONE_PARITY_SAMPLES),
+            candidate.predict_batch(TONE_PARITY_SAMPLES)):
+        assert tokens == expected_tokens
+    reference.close()
+    candidate.close()
+
+
+def test_quantized_export_keeps_only_the_int8_model(tiny_model, tmp_path):
+    model, tokenizer = tiny_model
+    report = export_checked_onnx_model(model, tokenizer, str(tmp_path / "tone.onnx"),
+                                       samples=TONE_PARITY_SAMPLES, min_agreement=0.0)
+    assert report["passed"] and report["quantized"]
+    assert os.listdir(tmp_path) == ["tone.onnx"]
+
+
+def test_export_below_min_agreement_is_removed(tiny_model, tmp_path):
+    model, tokenizer = tiny_model
+    report = export_checked_onnx_model(model, tokenizer, str(tmp_path / "tone.onnx"),
+                                       samples=TONE_PARITY_SAMPLES, min_agreement=1.01,
+                                       quantize=False)
+    assert not report["passed"] and report["size_bytes"] is None
+    assert not os.listdir(tmp_path)